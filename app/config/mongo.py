@@ -1,3 +1,4 @@
+import asyncio
 from pymongo import AsyncMongoClient
 from beanie import init_beanie
 # Import application settings
@@ -8,6 +9,18 @@ from app.models.meter_reading import MeterReading
 from app.models.payment import Payment
 from app.models.user import User
 from app.models.alarm import Alarm
+from app.models.raw_transaction import RawTransaction
+from app.models.consumed_payment import ConsumedPayment
+from app.models.spent_outpoint import SpentOutpoint
+from app.models.block_header import BlockHeader
+from app.models.cache_entry import CacheEntry
+from app.models.consumer_checkpoint import ConsumerCheckpoint
+from app.models.meter_rollup import MeterRollup
+from app.models.usage_counter import UsageCounter
+from app.models.scheduler_lease import SchedulerLease
+from app.models.retention_watermark import RetentionWatermark
+# Import command listener for MongoDB metrics
+from app.utils.metrics_utils import MongoCommandListener
 
 
 class MongoDbClient:
@@ -15,20 +28,38 @@ class MongoDbClient:
 
     def __init__(self, database_name: str = "hackaton_web3_db"):
         # List of document models to register with Beanie
-        self.models = [MeterReading, Payment, User, Alarm, AlarmHistory]
-        # Create asynchronous MongoDB client using settings URL
-        self.client = AsyncMongoClient(settings.MONGODB_URL)
+        self.models = [
+            MeterReading, Payment, User, Alarm, AlarmHistory, RawTransaction, ConsumedPayment, BlockHeader, CacheEntry,
+            ConsumerCheckpoint, MeterRollup, UsageCounter, SchedulerLease, RetentionWatermark, SpentOutpoint,
+        ]
+        # Models whose unique indexes guard payments and leader election (replayed x402 payments, double leaders),
+        # created before serving even when the other indexes are skipped at startup
+        self.guarded_models = [ConsumedPayment, SpentOutpoint, SchedulerLease]
+        # Create asynchronous MongoDB client using settings URL, timing every command
+        self.client = AsyncMongoClient(settings.MONGODB_URL, event_listeners=[MongoCommandListener()])
         self.database_name = database_name
 
-    async def init(self):
-        """Initialize Beanie with the database and document models."""
+    async def init(self, skip_indexes: bool = False):
+        """Initialize Beanie with the database and document models (optionally without index checks)."""
         try:
             await init_beanie(
-                database=self.client[self.database_name], document_models=self.models
+                database=self.client[self.database_name], document_models=self.models, skip_indexes=skip_indexes
             )
         except Exception as e:
             raise ValueError(f"Error initializing database: {e}")
 
+    async def ensure_indexes(self, models: list | None = None):
+        """Create the indexes declared by the document models, or some of them (no-op for existing ones)."""
+        await asyncio.gather(*[
+            model.get_pymongo_collection().create_indexes(model.Settings.indexes)
+            for model in (self.models if models is None else models)
+            if getattr(model.Settings, "indexes", None)
+        ])
+
+    async def prewarm(self, connections: int = settings.MONGODB_PREWARM_CONNECTIONS):
+        """Open pool connections with concurrent pings, so the first requests do not pay for them."""
+        await asyncio.gather(*[self.client.admin.command("ping") for _ in range(connections)])
+
     async def close(self):
         """Close the MongoDB client connection."""
         try:
@@ -14,6 +14,152 @@ class Settings(BaseSettings):
     # Destination address for payments
     DESTINATION_BSV_ADDRESS: str = "your-default-bsv-address-here"
 
+    # WhatsOnChain API (base URL can point to a local stand-in chain API)
+    WOC_API_KEY: str | None = None
+    WOC_BASE_URL: str = "https://api.whatsonchain.com/v1"
+
+    # WhatsOnChain client limits: token bucket per worker (0 disables it), so the API key tier divided by the
+    # number of workers sharing the key, priority queue, retries with exponential backoff on 429/5xx/network
+    # errors and a circuit breaker
+    WOC_RATE_LIMIT_PER_SECOND: float = 3.0
+    WOC_RATE_LIMIT_BURST: int = 3
+    WOC_RATE_LIMIT_MAX_QUEUE: int = 1000
+    WOC_MAX_RETRIES: int = 3
+    WOC_RETRY_BASE_DELAY_SECONDS: float = 0.5
+    WOC_RETRY_MAX_DELAY_SECONDS: float = 8.0
+    WOC_CIRCUIT_FAILURE_THRESHOLD: int = 5
+    WOC_CIRCUIT_RESET_SECONDS: float = 30.0
+
+    # CoinGecko API (base URL can point to a local stand-in price API)
+    COINGECKO_BASE_URL: str = "https://api.coingecko.com/api/v3"
+
+    # Source transaction cache (in-memory LRU, optionally persisted in Mongo)
+    TX_CACHE_SIZE: int = 256
+    TX_CACHE_PERSIST: bool = False
+
+    # x402 paywall (payments older than the max age are rejected, so replays are bounded)
+    X402_PAYMENT_MAX_AGE_SECONDS: int = 86400
+    X402_VERIFIED_CACHE_SIZE: int = 10000
+    # Minimum fee of SPV (BEEF) payments, their inputs must cover their outputs plus this fee
+    X402_MIN_FEE_SATOSHIS_PER_KB: float = 1.0
+
+    # Wallet balance refresh (stored balances are served, stale ones refreshed in background)
+    BALANCE_MAX_AGE_SECONDS: int = 300
+    BALANCE_REFRESH_INTERVAL_SECONDS: int = 30
+    BALANCE_REFRESH_BATCH_SIZE: int = 20
+    BALANCE_REFRESH_MAX_USERS: int = 1000
+
+    # Block header store for local SPV verification: the latest headers are synced (from SPV_START_HEIGHT when
+    # set), older headers referenced by a merkle proof are fetched on demand
+    SPV_SYNC_INTERVAL_SECONDS: int = 60
+    SPV_SYNC_MAX_HEADERS: int = 500
+    SPV_START_HEIGHT: int | None = None
+
+    # Transaction broadcast batching
+    BROADCAST_BATCH_SIZE: int = 50
+    BROADCAST_MAX_DELAY_SECONDS: float = 0.5
+
+    # Payment confirmation reconciliation
+    RECONCILE_INTERVAL_SECONDS: int = 60
+    RECONCILE_BATCH_SIZE: int = 20
+    RECONCILE_MAX_PAYMENTS: int = 500
+    RECONCILE_FAIL_AFTER_SECONDS: int = 86400
+
+    # Tracing (OpenTelemetry); exporter is "otlp", "console" or "memory" (in-memory, for tests)
+    TRACING_ENABLED: bool = False
+    TRACING_SERVICE_NAME: str = "hackaton-web3-backend"
+    TRACING_SAMPLE_RATE: float = 1.0
+    TRACING_EXPORTER: str = "otlp"
+    TRACING_OTLP_ENDPOINT: str | None = None
+
+    # On-demand request profiling (disabled unless a token is set)
+    PROFILING_TOKEN: str | None = None
+    PROFILING_MAX_CONCURRENT: int = 1
+    PROFILING_INTERVAL_SECONDS: float = 0.001
+    PROFILING_OUTPUT_DIR: str = "profiles"
+
+    # Per-request query counting (debug mode): counts in response headers, repeated query shapes logged
+    QUERY_COUNTER_ENABLED: bool = False
+    QUERY_REPEAT_THRESHOLD: int = 3
+
+    # Caches; backend is "memory" (per worker) or "mongo" (TTL collection shared by every worker)
+    CACHE_MEMORY_SIZE: int = 10000
+    PRICE_CACHE_BACKEND: str = "memory"
+    PRICE_CACHE_TTL_SECONDS: int = 300
+    USER_CACHE_BACKEND: str = "memory"
+    USER_CACHE_TTL_SECONDS: int = 60
+    ALARM_CACHE_BACKEND: str = "memory"
+    ALARM_CACHE_TTL_SECONDS: int = 60
+    CHART_CACHE_BACKEND: str = "memory"
+    CHART_CACHE_TTL_SECONDS: int = 60
+
+    # Meter ingest over WebSocket (disabled unless a token is set): max readings per frame, max frames in flight
+    INGEST_WS_TOKEN: str | None = None
+    INGEST_WS_MAX_BATCH: int = 500
+    INGEST_WS_MAX_IN_FLIGHT: int = 4
+
+    # Background job scheduler: fleet-wide jobs only run on the worker holding the MongoDB lease (renewed every
+    # third of SCHEDULER_LEASE_SECONDS). Every run starts after a random delay of up to SCHEDULER_JITTER_SECONDS
+    # and is cancelled after SCHEDULER_MAX_RUNTIME_SECONDS. SCHEDULER_CRON replaces the interval of jobs by
+    # cron expressions in UTC, by job name (needs croniter), e.g. {"reconcile_payments": "*/5 * * * *"}
+    SCHEDULER_LEASE_SECONDS: float = 30.0
+    SCHEDULER_JITTER_SECONDS: float = 5.0
+    SCHEDULER_MAX_RUNTIME_SECONDS: float = 300.0
+    SCHEDULER_CRON: dict[str, str] = {}
+
+    # Retention: raw readings older than RETENTION_RAW_MONTHS whole months (0 keeps them) are archived to gzip
+    # files in RETENTION_ARCHIVE_DIR, compacted into daily rollups, then deleted. Charts read compacted months
+    # from the rollups (workers cache the compaction watermark RETENTION_WATERMARK_CACHE_SECONDS).
+    # Alarm history expires after ALARM_HISTORY_TTL_DAYS (0 keeps it; changing it later needs a collMod)
+    RETENTION_RAW_MONTHS: int = 0
+    RETENTION_INTERVAL_SECONDS: int = 86400
+    RETENTION_MAX_RUNTIME_SECONDS: float = 3600.0
+    RETENTION_ARCHIVE_DIR: str = "archives"
+    RETENTION_ARCHIVE_CHUNK_SIZE: int = 50000
+    RETENTION_WATERMARK_CACHE_SECONDS: int = 60
+    ALARM_HISTORY_TTL_DAYS: int = 0
+
+    # Post-ingest consumers fed by a change stream on meter_readings (need a replica set).
+    # CONSUMERS lists the consumers run by this process ("alarms", "rollups", "counters"), on the partitions
+    # of CONSUMER_OWNED_PARTITIONS (all when unset; processes running the same consumer must own disjoint ones).
+    # Set ALARM_CONSUMER_ENABLED on every worker once an alarms consumer runs, ingest then skips alarm checks.
+    # Set USAGE_COUNTERS_ENABLED once a counters consumer has run since the start of the month, monthly usage is
+    # then read from the counters instead of aggregating the readings
+    CONSUMERS: list[str] = []
+    ALARM_CONSUMER_ENABLED: bool = False
+    USAGE_COUNTERS_ENABLED: bool = False
+    CONSUMER_PARTITIONS: int = 8
+    CONSUMER_OWNED_PARTITIONS: list[int] | None = None
+    CONSUMER_CHECKPOINT_EVERY: int = 100
+    CONSUMER_CHECKPOINT_SECONDS: float = 5.0
+    CONSUMER_MAX_ATTEMPTS: int = 5
+    CONSUMER_RETRY_SECONDS: float = 5.0
+    USAGE_COUNTER_DEDUPE_WINDOW: int = 500
+
+    # Live dashboard events (SSE); change streams fan them out across workers but need a replica set.
+    # Without them, readings and alarms only reach the worker that ingested them, payment confirmations are polled
+    LIVE_EVENTS_CHANGE_STREAM: bool = False
+    LIVE_EVENTS_POLL_SECONDS: float = 5.0
+    LIVE_EVENTS_QUEUE_SIZE: int = 100
+    LIVE_EVENTS_RETRY_SECONDS: float = 5.0
+
+    # Admission control: expensive routes are shed with a 503 beyond their concurrency limit (0 disables it),
+    # when the heavy lane they share is full, or while this many meter readings are being ingested
+    HEAVY_MAX_CONCURRENT: int = 16
+    CHART_MAX_CONCURRENT: int = 8
+    USERS_CHART_MAX_CONCURRENT: int = 1
+    INGEST_PRIORITY_THRESHOLD: int = 64
+    ADMISSION_RETRY_AFTER_SECONDS: int = 1
+
+    # Query limits: server-side time limit of every aggregation, and maximum points of a chart
+    MONGODB_AGGREGATION_MAX_TIME_MS: int = 5000
+    CHART_MAX_POINTS: int = 1000
+
+    # Serverless cold start: serve before most index checks (unique payment and lease indexes are still created
+    # first), import and warm up heavy parts in background
+    FAST_STARTUP: bool = False
+    MONGODB_PREWARM_CONNECTIONS: int = 4
+
     # Load environment variables from a .env file
     model_config = SettingsConfigDict(env_file=".env")
 
@@ -13,4 +13,17 @@ class ChartItem(BaseModel):
 
 # Response model for chart generation, containing a list of chart items
 class GenerateChartMeterResponse(BaseModel):
-    chart: list[ChartItem]
\ No newline at end of file
+    chart: list[ChartItem]
+
+# Live event pushed when an alarm of the user is triggered
+class AlarmTriggeredEvent(BaseModel):
+    alarm_id: str
+    value: float
+    triggered_at: datetime
+
+# Live event pushed when a payment of the user is confirmed on chain
+class PaymentConfirmedEvent(BaseModel):
+    payment_id: str
+    tx_id: str
+    block_height: int | None = None
+    confirmed_at: datetime | None = None
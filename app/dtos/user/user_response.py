@@ -1,3 +1,4 @@
+from datetime import datetime
 from pydantic import BaseModel, ConfigDict
 
 # Response model for getting user details, including wallet balance and usage
@@ -11,6 +12,8 @@ class GetUserResponse(BaseModel):
     bsv_address: str | None = None
     balance_satoshis: int | None = None
     balance_euro: float | None = None
+    # When the stored balance was last checked against the chain
+    balance_updated_at: datetime | None = None
     # Image
     profile_image_url: str | None = None
     # Monthly usage
@@ -1,27 +1,174 @@
+import asyncio
+import importlib
 from fastapi import FastAPI
 from contextlib import asynccontextmanager
 from fastapi.middleware.cors import CORSMiddleware
+from pymongo.errors import ExecutionTimeout
 
 # Import routers for different endpoints
 from app.routes.user_route import user_router
 from app.routes.meter_route import meter_router
 from app.routes.alarm_route import alarm_router
+from app.routes.metrics_route import metrics_router
 
-# Import database client
+# Import settings and database client
+from app.config.settings import settings
 from app.config.mongo import MongoDbClient
+# Import background payment services
+from app.services.broadcast_service import broadcaster
+from app.services.reconciliation_service import ReconciliationService
+from app.services.balance_service import BalanceService
+from app.services.retention_service import RetentionService
+# Import post-ingest consumers fed by a change stream
+from app.services.meter_consumers_service import build_consumer_runner
+# Import WhatsOnChain utilities to warm the price cache
+from app.utils.whatsonchain_utils import WhatsOnChainUtils
+# Import x402 paywall (background relays), payment required exception and handler
+from app.utils.x402_utils import PaymentRequiredException, X402Paywall, payment_required_handler
+# Import handler for aggregations stopped by their time limit
+from app.utils.admission_utils import query_timeout_handler
+# Import middleware recording route metrics
+from app.utils.metrics_utils import metrics_middleware
+# Import middleware profiling single requests on demand
+from app.utils.profiling_utils import profiling_middleware
+# Import middleware counting queries per request
+from app.utils.query_counter_utils import query_counter_middleware
+# Import middleware giving every request its own user identity map
+from app.services.user_cache_service import user_identity_map_middleware
+# Import live event hub, fed by a change stream across workers when enabled
+from app.utils.live_events_utils import live_events
+# Import scheduler running periodic jobs, fleet-wide ones on a single leader worker
+from app.utils.scheduler_utils import scheduler
+# Import tracing setup
+from app.utils.tracing_utils import setup_tracing, shutdown_tracing
+
+# Set up tracing (no-op unless enabled in settings); FastAPI opens a server span per request
+# once a tracer provider is set, continuing the trace of the caller (traceparent header)
+setup_tracing()
 
 # Initialize MongoDB client
 mongo_client = MongoDbClient()
 
+# Background tasks, cancelled on shutdown
+background_tasks: list[asyncio.Task] = []
+
+# Start the periodic background services
+def start_background_services():
+    # Imported here, the header store pulls in the BSV SDK (slow to import)
+    from app.utils.header_store_utils import header_store
+
+    # Fleet-wide jobs, run by the scheduler leader only
+    # Check confirmation status of broadcast payments
+    scheduler.add_job(
+        "reconcile_payments", ReconciliationService.reconcile_pending_payments,
+        interval_seconds=settings.RECONCILE_INTERVAL_SECONDS,
+    )
+    # Keep the stored block headers in sync for SPV verification of x402 payments
+    scheduler.add_job("sync_block_headers", sync_block_headers, interval_seconds=settings.SPV_SYNC_INTERVAL_SECONDS)
+    # Refresh stale wallet balances
+    scheduler.add_job(
+        "refresh_balances", BalanceService.refresh_stale_balances,
+        interval_seconds=settings.BALANCE_REFRESH_INTERVAL_SECONDS,
+    )
+    # Archive and compact old meter readings into daily rollups
+    if settings.RETENTION_RAW_MONTHS > 0:
+        scheduler.add_job(
+            "compact_readings", RetentionService.compact_readings,
+            interval_seconds=settings.RETENTION_INTERVAL_SECONDS, max_runtime_seconds=settings.RETENTION_MAX_RUNTIME_SECONDS,
+        )
+    # Jobs run by every worker
+    # Load the block headers stored by the leader into memory
+    scheduler.add_job(
+        "load_block_headers", header_store.load, interval_seconds=settings.SPV_SYNC_INTERVAL_SECONDS, leader_only=False,
+    )
+    # Fetch the older block headers asked for by proofs verified on this worker
+    scheduler.add_job(
+        "fetch_requested_block_headers", header_store.fetch_requested,
+        interval_seconds=settings.SPV_SYNC_INTERVAL_SECONDS, leader_only=False,
+    )
+    # Refresh the balances requested on this worker
+    scheduler.add_job(
+        "refresh_requested_balances", lambda: BalanceService.refresh_stale_balances(requested_only=True),
+        interval_seconds=settings.BALANCE_REFRESH_INTERVAL_SECONDS, leader_only=False,
+    )
+    # Push the payments confirmed by the leader to the dashboards subscribed on this worker
+    if not settings.LIVE_EVENTS_CHANGE_STREAM:
+        scheduler.add_job(
+            "live_payment_events", live_events.poll_payments,
+            interval_seconds=settings.LIVE_EVENTS_POLL_SECONDS, leader_only=False, jitter_seconds=0,
+        )
+    background_tasks.append(asyncio.create_task(scheduler.run()))
+    # Push the changes of every worker to the dashboards subscribed on this one
+    if settings.LIVE_EVENTS_CHANGE_STREAM:
+        background_tasks.append(asyncio.create_task(live_events.watch_changes()))
+    # Run the post-ingest consumers enabled for this process on its partitions
+    if settings.CONSUMERS:
+        background_tasks.append(asyncio.create_task(build_consumer_runner().run()))
+
+# Sync the block headers from the chain, starting from the ones already stored
+async def sync_block_headers():
+    # Imported here, the header store pulls in the BSV SDK (slow to import)
+    from app.utils.header_store_utils import header_store
+
+    await header_store.load()
+    await header_store.sync()
+
+# Import the BSV SDK in a worker thread, so the event loop keeps serving, then start background services
+async def import_and_start_background_services():
+    await asyncio.to_thread(importlib.import_module, "app.utils.header_store_utils")
+    start_background_services()
+
+# Fill the BSV price cache before the first payment needs it
+async def warm_price_cache():
+    await WhatsOnChainUtils.get_bsv_price_eur()
+
+# Warm up after a fast startup, while the first requests are already being served
+async def warm_up():
+    steps = [
+        # Open MongoDB pool connections
+        mongo_client.prewarm,
+        # Create the indexes skipped at startup, before the background jobs rely on them
+        mongo_client.ensure_indexes,
+        import_and_start_background_services,
+        warm_price_cache,
+    ]
+    for step in steps:
+        try:
+            await step()
+        except Exception as e:
+            print(f"Error warming up ({step.__name__}): {e}")
+
 # Lifespan context manager for startup and shutdown events
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup actions
     print("Starting up...")
-    await mongo_client.init()
+    if settings.FAST_STARTUP:
+        # Serverless cold start: serve as soon as Beanie is ready, everything else in background
+        await mongo_client.init(skip_indexes=True)
+        # Payment replay protection and leader election are not left to the background warm-up
+        await mongo_client.ensure_indexes(mongo_client.guarded_models)
+        background_tasks.append(asyncio.create_task(warm_up()))
+    else:
+        await mongo_client.init()
+        start_background_services()
     yield
     # Shutdown actions
+    for task in background_tasks:
+        task.cancel()
+    background_tasks.clear()
+    # Let another worker take over the fleet-wide jobs right away
+    try:
+        await scheduler.release()
+    except Exception as e:
+        print(f"Error releasing scheduler lease: {e}")
+    # Send any transaction still waiting for its batch
+    await broadcaster.close()
+    # Record the outcome of the x402 payments relayed in the background
+    await X402Paywall.close()
     await mongo_client.close()
+    # Export spans still buffered
+    shutdown_tracing()
     print("Shutting down...")
 
 # Create FastAPI application with lifespan
@@ -38,7 +185,28 @@ app.add_middleware(
     allow_methods=["*"],
 )
 
+# Load each user at most once per request
+app.middleware("http")(user_identity_map_middleware)
+
+# Count MongoDB and HTTP calls per request (debug mode, only installed when enabled)
+if settings.QUERY_COUNTER_ENABLED:
+    app.middleware("http")(query_counter_middleware)
+
+# Profile single requests on demand (authenticated with the profiling token, only installed when one is set)
+if settings.PROFILING_TOKEN:
+    app.middleware("http")(profiling_middleware)
+
+# Record latency and in-flight requests per route
+app.middleware("http")(metrics_middleware)
+
+# Return x402 payment requirements when a paywalled route is not paid
+app.add_exception_handler(PaymentRequiredException, payment_required_handler)
+
+# Shed queries stopped by maxTimeMS with a 503 instead of a 500
+app.add_exception_handler(ExecutionTimeout, query_timeout_handler)
+
 # Include routers for user, meter, and alarm endpoints
 app.include_router(user_router)
 app.include_router(meter_router)
-app.include_router(alarm_router)
\ No newline at end of file
+app.include_router(alarm_router)
+app.include_router(metrics_router)
\ No newline at end of file
@@ -1,6 +1,7 @@
 from enum import Enum
 from app.models.base_model import Model
 from beanie import PydanticObjectId
+from pydantic import BaseModel
 
 
 class AlarmType(str, Enum):
@@ -18,3 +19,14 @@ class Alarm(Model):
 
     class Settings:
         name = "alarms"
+
+
+class AlarmView(BaseModel):
+    """Projection of the alarm fields needed to check whether it is triggered."""
+    id: PydanticObjectId
+    threshold: float
+    type: AlarmType
+    active: bool
+
+    class Settings:
+        projection = {"threshold": 1, "type": 1, "active": 1}
@@ -1,14 +1,32 @@
 from datetime import datetime
 from app.models.base_model import Model
 from beanie import PydanticObjectId
+from pymongo import IndexModel
+
+# Import settings for the history retention
+from app.config.settings import settings
 
 
 class AlarmHistory(Model):
     """Alarm history document model for logging triggered alarms."""
     user_id: PydanticObjectId
     alarm_id: PydanticObjectId
+    # Reading that triggered the alarm, an alarm is logged once per reading
+    reading_id: PydanticObjectId | None = None
     value: float
     triggered_at: datetime
 
     class Settings:
         name = "alarm_histories"
+        indexes = [
+            IndexModel(
+                [("alarm_id", 1), ("reading_id", 1)],
+                unique=True,
+                partialFilterExpression={"reading_id": {"$type": "objectId"}},
+            ),
+        ]
+        # Expired by MongoDB after ALARM_HISTORY_TTL_DAYS (0 keeps it forever)
+        if settings.ALARM_HISTORY_TTL_DAYS > 0:
+            indexes.append(
+                IndexModel([("triggered_at", 1)], expireAfterSeconds=settings.ALARM_HISTORY_TTL_DAYS * 86400)
+            )
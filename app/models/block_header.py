@@ -0,0 +1,17 @@
+from app.models.base_model import Model
+from pymongo import IndexModel
+
+
+class BlockHeader(Model):
+    """Block header document model used for local SPV verification."""
+    height: int
+    hash: str
+    merkle_root: str
+    previous_hash: str | None = None
+    time: int
+
+    class Settings:
+        name = "block_headers"
+        indexes = [
+            IndexModel([("height", 1)], unique=True),
+        ]
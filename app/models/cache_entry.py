@@ -0,0 +1,18 @@
+from app.models.base_model import Model
+from datetime import datetime
+from typing import Any
+from pymongo import IndexModel
+
+
+class CacheEntry(Model):
+    """Shared cache entry document model, removed by MongoDB once expired."""
+    key: str
+    value: Any
+    expires_at: datetime
+
+    class Settings:
+        name = "cache_entries"
+        indexes = [
+            IndexModel([("key", 1)], unique=True),
+            IndexModel([("expires_at", 1)], expireAfterSeconds=0),
+        ]
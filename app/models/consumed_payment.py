@@ -0,0 +1,23 @@
+from app.models.base_model import Model
+from datetime import datetime
+from pymongo import IndexModel
+
+from app.config.settings import settings
+
+
+class ConsumedPayment(Model):
+    """Consumed x402 payment document model, used as a replay index of spent txids."""
+    tx_id: str
+    resource: str
+    consumed_at: datetime
+    access_expires_at: datetime
+    # False while an SPV payment waits for the network to accept it
+    relayed: bool = True
+
+    class Settings:
+        name = "consumed_payments"
+        indexes = [
+            IndexModel([("tx_id", 1)], unique=True),
+            # Entries expire once the transaction is too old to be accepted anyway
+            IndexModel([("consumed_at", 1)], expireAfterSeconds=settings.X402_PAYMENT_MAX_AGE_SECONDS),
+        ]
@@ -0,0 +1,18 @@
+from app.models.base_model import Model
+from datetime import datetime
+from typing import Any
+from pymongo import IndexModel
+
+
+class ConsumerCheckpoint(Model):
+    """Change stream resume token of a consumer partition, where it resumes after a restart."""
+    consumer: str
+    partition: int
+    resume_token: dict[str, Any]
+    updated_at: datetime
+
+    class Settings:
+        name = "consumer_checkpoints"
+        indexes = [
+            IndexModel([("consumer", 1), ("partition", 1)], unique=True),
+        ]
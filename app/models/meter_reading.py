@@ -1,6 +1,7 @@
 from app.models.base_model import Model
 from beanie import PydanticObjectId
 from datetime import datetime
+from pymongo import IndexModel
 
 
 class MeterReading(Model):
@@ -14,3 +15,7 @@ class MeterReading(Model):
 
     class Settings:
         name = "meter_readings"
+        indexes = [
+            # Every chart and usage query filters by user and time range
+            IndexModel([("user_id", 1), ("timestamp", 1)]),
+        ]
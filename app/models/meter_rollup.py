@@ -0,0 +1,27 @@
+from app.models.base_model import Model
+from beanie import PydanticObjectId
+from datetime import datetime
+from typing import Any
+from pymongo import IndexModel
+
+
+class MeterRollup(Model):
+    """Daily rollup of the meter readings of a user, with the consumption of each hour of the day."""
+    user_id: PydanticObjectId
+    day: datetime
+    kw_consumed: float
+    cost_euro: float
+    readings: int
+    hourly_kw: list[float]
+    # Time of the first reading of each hour (None without readings)
+    hourly_at: list[datetime | None]
+    # Time and consumption of each reading of the day, charts read them for hours cut by a range bound
+    raw_readings: list[dict[str, Any]] = []
+    # Readings backfilled after their month was compacted and added to this rollup since
+    late_reading_ids: list[PydanticObjectId] = []
+
+    class Settings:
+        name = "meter_rollups"
+        indexes = [
+            IndexModel([("user_id", 1), ("day", 1)], unique=True),
+        ]
@@ -1,6 +1,15 @@
+from enum import Enum
 from app.models.base_model import Model
 from datetime import datetime
 from beanie import PydanticObjectId
+from pymongo import IndexModel
+
+
+class PaymentStatus(str, Enum):
+    """Enumeration for payment settlement states."""
+    PENDING = "pending"
+    CONFIRMED = "confirmed"
+    FAILED = "failed"
 
 
 class Payment(Model):
@@ -10,6 +19,14 @@ class Payment(Model):
     amount_euro: float
     tx_id: str
     created_at: datetime
+    status: PaymentStatus = PaymentStatus.PENDING
+    block_height: int | None = None
+    confirmed_at: datetime | None = None
+    checked_at: datetime | None = None
 
     class Settings:
-        name = "payments"
\ No newline at end of file
+        name = "payments"
+        indexes = [
+            IndexModel([("status", 1), ("created_at", 1)]),
+            IndexModel([("user_id", 1), ("confirmed_at", 1)]),
+        ]
@@ -0,0 +1,16 @@
+from app.models.base_model import Model
+from datetime import datetime
+from pymongo import IndexModel
+
+
+class RawTransaction(Model):
+    """Raw transaction document model, keyed by txid, used as a persistent transaction cache."""
+    tx_id: str
+    raw_hex: str
+    created_at: datetime
+
+    class Settings:
+        name = "raw_transactions"
+        indexes = [
+            IndexModel([("tx_id", 1)], unique=True),
+        ]
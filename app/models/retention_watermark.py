@@ -0,0 +1,18 @@
+from app.models.base_model import Model
+from datetime import datetime
+from pymongo import IndexModel
+
+
+class RetentionWatermark(Model):
+    """Compaction progress of a collection: data before `before` is read from rollups, not raw documents."""
+    collection: str
+    before: datetime
+    updated_at: datetime
+    # Months archived and rolled up whose raw documents are not deleted yet (YYYY-MM)
+    archived_months: list[str] = []
+
+    class Settings:
+        name = "retention_watermarks"
+        indexes = [
+            IndexModel([("collection", 1)], unique=True),
+        ]
@@ -0,0 +1,16 @@
+from app.models.base_model import Model
+from datetime import datetime
+from pymongo import IndexModel
+
+
+class SchedulerLease(Model):
+    """Lease held by the scheduler leader, the only worker running fleet-wide jobs until it expires."""
+    name: str
+    owner: str
+    expires_at: datetime
+
+    class Settings:
+        name = "scheduler_leases"
+        indexes = [
+            IndexModel([("name", 1)], unique=True),
+        ]
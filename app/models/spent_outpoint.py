@@ -0,0 +1,20 @@
+from app.models.base_model import Model
+from datetime import datetime
+from pymongo import IndexModel
+
+
+class SpentOutpoint(Model):
+    """Outpoint (txid:vout) spent by an accepted x402 SPV payment, so an output pays for access only once.
+
+    Kept without TTL: unlike consumed payments, a BEEF carries no age check, it must never be accepted twice.
+    """
+    outpoint: str
+    tx_id: str
+    spent_at: datetime
+
+    class Settings:
+        name = "spent_outpoints"
+        indexes = [
+            IndexModel([("outpoint", 1)], unique=True),
+            IndexModel([("tx_id", 1)]),
+        ]
@@ -0,0 +1,21 @@
+from app.models.base_model import Model
+from beanie import PydanticObjectId
+from datetime import datetime
+from pymongo import IndexModel
+
+
+class UsageCounter(Model):
+    """Running consumption totals of a user for a month."""
+    user_id: PydanticObjectId
+    month: datetime
+    kw_consumed: float
+    cost_euro: float
+    readings: int
+    # Last readings counted, so a reading delivered twice is only counted once
+    recent_reading_ids: list[PydanticObjectId] = []
+
+    class Settings:
+        name = "usage_counters"
+        indexes = [
+            IndexModel([("user_id", 1), ("month", 1)], unique=True),
+        ]
@@ -1,6 +1,7 @@
 from app.models.base_model import Model
 from datetime import datetime
 from pydantic import BaseModel, EmailStr
+from pymongo import IndexModel
 
 
 class UserWallet(BaseModel):
@@ -10,6 +11,7 @@ class UserWallet(BaseModel):
     encrypted_wif: str
     balance_satoshis: int = 0
     balance_euro: float = 0.0
+    balance_updated_at: datetime | None = None
 
 
 class User(Model):
@@ -24,3 +26,65 @@ class User(Model):
 
     class Settings:
         name = "users"
+        indexes = [
+            IndexModel([("user_wallet.balance_updated_at", 1)]),
+        ]
+
+
+class UserProfileView(BaseModel):
+    """Projection of the user fields returned by the user endpoints (no keys)."""
+    name: str
+    email: str
+    profile_image_url: str | None = None
+    bsv_address: str | None = None
+    balance_satoshis: int | None = None
+    balance_euro: float | None = None
+    balance_updated_at: datetime | None = None
+
+    class Settings:
+        projection = {
+            "name": 1,
+            "email": 1,
+            "profile_image_url": 1,
+            "bsv_address": "$user_wallet.bsv_address",
+            "balance_satoshis": "$user_wallet.balance_satoshis",
+            "balance_euro": "$user_wallet.balance_euro",
+            "balance_updated_at": "$user_wallet.balance_updated_at",
+        }
+
+    @staticmethod
+    def from_user(user: User) -> "UserProfileView":
+        return UserProfileView(
+            name=user.name,
+            email=user.email,
+            profile_image_url=user.profile_image_url,
+            bsv_address=user.user_wallet.bsv_address,
+            balance_satoshis=user.user_wallet.balance_satoshis,
+            balance_euro=user.user_wallet.balance_euro,
+            balance_updated_at=user.user_wallet.balance_updated_at,
+        )
+
+
+class UserHotFields(BaseModel):
+    """Projection of the user fields read on every ingest and chart request."""
+    tariff: float = 0.15
+    preferred_currency: str = "EUR"
+    bsv_address: str = ""
+    encrypted_wif: str = ""
+
+    class Settings:
+        projection = {
+            "tariff": 1,
+            "preferred_currency": 1,
+            "bsv_address": "$user_wallet.bsv_address",
+            "encrypted_wif": "$user_wallet.encrypted_wif",
+        }
+
+    @staticmethod
+    def from_user(user: User) -> "UserHotFields":
+        return UserHotFields(
+            tariff=user.tariff,
+            preferred_currency=user.preferred_currency,
+            bsv_address=user.user_wallet.bsv_address,
+            encrypted_wif=user.user_wallet.encrypted_wif,
+        )
@@ -43,30 +43,12 @@ async def toggle_alarm_active(alarm_id: str):
 # Endpoint to get all alarms for a specific user
 @alarm_router.get("/user/{user_id}", response_model=list[GetAlarmResponse])
 async def get_alarms_by_user(user_id: str):
-    alarms = await AlarmService.get_alarms_by_user(user_id)
-    return [
-        GetAlarmResponse(
-            id=str(alarm.id),
-            user_id=str(alarm.user_id),
-            type=alarm.type,
-            threshold=alarm.threshold,
-            active=alarm.active,
-        ) for alarm in alarms
-    ]
+    return await AlarmService.get_alarm_responses_by_user(user_id)
 
 # Endpoint to get alarm history for a user
 @alarm_router.get("/history/{user_id}", response_model=list[AlarmHistoryResponse])
 async def get_alarms_history(user_id: str):
-    history = await AlarmService.get_alarms_history(user_id)
-    return [
-        AlarmHistoryResponse(
-            id=str(h.id),
-            user_id=str(h.user_id),
-            alarm_id=str(h.alarm_id),
-            value=h.value,
-            triggered_at=h.triggered_at
-        ) for h in history
-    ]
+    return await AlarmService.get_alarm_history_responses(user_id)
 
 # Endpoint to delete a specific alarm history entry
 @alarm_router.delete("/history/{history_id}")
@@ -1,5 +1,6 @@
-from fastapi import APIRouter, HTTPException, Request
-from fastapi.responses import JSONResponse
+from typing import AsyncIterable
+from fastapi import APIRouter, Depends, HTTPException, Request, WebSocket
+from fastapi.sse import EventSourceResponse, ServerSentEvent
 
 # Import DTOs for meter request and response models
 from app.dtos.meter.meter_request import CreateMeterRequest
@@ -10,23 +11,38 @@ from app.dtos.meter.meter_response import CreateMeterResponse
 from app.models.user import User
 # Import meter service for business logic
 from app.services.meter_service import MeterService
-# Import utilities for BSV operations
-from app.utils.whatsonchain_utils import WhatsOnChainUtils
-# Import for manual x402 payment decoding
-import json
-from x402.encoding import safe_base64_decode
+from app.services.meter_ingest_service import MeterIngestService
+# Import balance service, stored balances are refreshed in background
+from app.services.balance_service import BalanceService
+# Import x402 paywall dependency
+from app.utils.x402_utils import X402Paywall
+# Import settings and admission control for expensive routes
+from app.config.settings import settings
+from app.utils.admission_utils import AdmissionControl, cancel_on_disconnect, ingest_admission
+# Import live event hub for dashboard streams
+from app.utils.live_events_utils import live_events
 
 # Create router for meter-related endpoints with prefix and tags
 meter_router = APIRouter(prefix="/meter", tags=["meter"])
 
-# Endpoint to create a new meter reading
-@meter_router.post("", response_model=CreateMeterResponse)
+# Endpoint to create a new meter reading (ingest lane, never shed)
+@meter_router.post("", response_model=CreateMeterResponse, dependencies=[Depends(ingest_admission)])
 async def create_meter(request: CreateMeterRequest):
     return await MeterService.create_meter(request)
 
+# WebSocket endpoint for meters streaming their readings as msgpack frames over one connection
+@meter_router.websocket("/ingest")
+async def ingest_meter_readings(websocket: WebSocket):
+    await MeterIngestService.serve(websocket)
+
 # Endpoint to generate consumption chart for a user with optional date range and step
-@meter_router.get("/chart", response_model=GenerateChartMeterResponse)
+@meter_router.get(
+    "/chart",
+    response_model=GenerateChartMeterResponse,
+    dependencies=[Depends(AdmissionControl("chart", settings.CHART_MAX_CONCURRENT))],
+)
 async def generate_chart(
+    http_request: Request,
     user_id: str,
     start_date: str | None = None,
     end_date: str | None = None,
@@ -37,69 +53,57 @@ async def generate_chart(
     except ValueError:
         raise HTTPException(status_code=400, detail="Invalid step value")
     
-    return await MeterService.generate_chart(
+    return await cancel_on_disconnect(http_request, MeterService.generate_chart(
         user_id=user_id,
         start_date=start_date,
         end_date=end_date,
         step=step_enum
-    )
+    ))
 
-# Paywalled endpoint to get aggregated chart data for all users using manual x402 for BSV payments
-@meter_router.get("/chart/users")
-async def get_users_chart(request: Request):
-    # Define payment requirements for x402 protocol
-    payment_requirements = {
-        "scheme": "exact",
-        "network": "bsv",  # Custom for BSV
-        "asset": "BSV",
-        "maxAmountRequired": "100 satoshis",
-        "resource": str(request.url),
-        "description": "",
-        "mimeType": "",
-        "payTo": "12HKnZrJ8Fcx2F8SgJHUrV9uvGNo4eoveD",
-        "maxTimeoutSeconds": 60,
-    }
-    
-    # Check for X-PAYMENT header
-    payment_header = request.headers.get("X-PAYMENT", "")
-    if payment_header == "":
-        return JSONResponse(
-            content={
-                "x402Version": 1,
-                "accepts": [payment_requirements],
-                "error": "X-PAYMENT header not provided"
-            },
-            status_code=402
-        )
-    
-    # Decode and validate payment header
+# Dependency validating the user ID of a stream before the stream starts
+def valid_stream_user_id(user_id: str) -> str:
+    if not User.is_valid_id(user_id):
+        raise HTTPException(status_code=400, detail="Invalid user ID format")
+    return user_id
+
+# Dependency validating the chart step of a stream before the stream starts
+def valid_stream_step(step: str = "daily") -> StepEnum:
     try:
-        payment_data = json.loads(safe_base64_decode(payment_header))
-        txid = payment_data.get("txid")
-        if not txid:
-            raise ValueError("No txid in payment data")
-    except Exception as e:
-        return JSONResponse(
-            content={
-                "x402Version": 1,
-                "accepts": [payment_requirements],
-                "error": "Invalid payment header format"
-            },
-            status_code=402
-        )
-    
-    # Validate the BSV transaction
-    if not await WhatsOnChainUtils.validate_transaction(txid, "12HKnZrJ8Fcx2F8SgJHUrV9uvGNo4eoveD", 100):
-        return JSONResponse(
-            content={
-                "x402Version": 1,
-                "accepts": [payment_requirements],
-                "error": "Invalid or unconfirmed transaction"
-            },
-            status_code=402
-        )
-    
-    # Aggregate data across all users
+        return StepEnum(step)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid step value")
+
+# Endpoint streaming live events of a user to a dashboard (Server-Sent Events): "reading" with the ChartItem
+# delta every new reading adds to its point of the chart (same step and point timestamps as GET /meter/chart),
+# "alarm" and "payment" when confirmed
+@meter_router.get("/stream/{user_id}", response_class=EventSourceResponse)
+async def stream_events(
+    user_id: str = Depends(valid_stream_user_id),
+    step: StepEnum = Depends(valid_stream_step),
+) -> AsyncIterable[ServerSentEvent]:
+    with live_events.subscribe(user_id, step) as queue:
+        while True:
+            event, data = await queue.get()
+            yield ServerSentEvent(event=event, data=data)
+
+# Paywall for the aggregated users chart, 100 satoshis per access
+users_chart_paywall = X402Paywall(
+    price_satoshis=100,
+    pay_to="12HKnZrJ8Fcx2F8SgJHUrV9uvGNo4eoveD",
+)
+
+# Paywalled endpoint to get aggregated chart data for all users using x402 for BSV payments
+# (admission is checked before the paywall, so a shed request does not consume its payment)
+@meter_router.get("/chart/users")
+async def get_users_chart(
+    http_request: Request,
+    _admission: None = Depends(AdmissionControl("users_chart", settings.USERS_CHART_MAX_CONCURRENT)),
+    txid: str = Depends(users_chart_paywall),
+):
+    return await cancel_on_disconnect(http_request, _aggregate_users_chart())
+
+# Helper function to aggregate data across all users
+async def _aggregate_users_chart() -> dict:
     users = await User.find_all().to_list()
     
     total_users = len(users)
@@ -107,10 +111,11 @@ async def get_users_chart(request: Request):
     total_monthly_kwh = 0.0
     
     for user in users:
+        # Stored wallet balances, the stale ones are refreshed in background (no chain call per user)
         if user.user_wallet and user.user_wallet.bsv_address:
-            balance_satoshis = await WhatsOnChainUtils.get_balance(user.user_wallet.bsv_address)
-            balance_euro = await WhatsOnChainUtils.convert_satoshis_to_euro(balance_satoshis)
-            total_balance_euro += balance_euro
+            total_balance_euro += user.user_wallet.balance_euro
+            if BalanceService.is_stale(user.user_wallet.balance_updated_at):
+                BalanceService.request_refresh(user.id)
         
         monthly_kwh = await MeterService.get_monthly_usage_kwh(str(user.id))
         total_monthly_kwh += monthly_kwh
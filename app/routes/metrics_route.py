@@ -0,0 +1,10 @@
+from fastapi import APIRouter, Response
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+
+# Create router for the Prometheus metrics endpoint
+metrics_router = APIRouter(tags=["metrics"])
+
+# Endpoint exposing route, MongoDB, chain API and payment metrics in Prometheus format
+@metrics_router.get("/metrics", include_in_schema=False)
+async def get_metrics():
+    return Response(content=generate_latest(), media_type=CONTENT_TYPE_LATEST)
@@ -1,19 +1,33 @@
 from datetime import datetime
 from fastapi import HTTPException
 from beanie import PydanticObjectId
-from cachetools import TTLCache
+from opentelemetry import trace
+
+# Import settings
+from app.config.settings import settings
 
 # Import alarm and history models, and alarm type enum
 from app.models.alarm import Alarm
 from app.models.alarm_history import AlarmHistory
 from app.models.alarm import AlarmType
+from app.models.alarm import AlarmView
 
 # Import DTOs for request and response
 from app.dtos.alarm.alarm_request import CreateAlarmRequest
 from app.dtos.alarm.alarm_response import CreateAlarmResponse
+from app.dtos.alarm.alarm_response import GetAlarmResponse
+from app.dtos.alarm.alarm_response import AlarmHistoryResponse
+
+# Import versioned cache, active alarms are read on every meter reading
+from app.utils.cache_utils import VersionedCache
+# Import live event hub and payload, triggered alarms are pushed to open dashboards
+from app.utils.live_events_utils import live_events
+from app.dtos.meter.meter_response import AlarmTriggeredEvent
+# Import tracer for alarm history spans
+from app.utils.tracing_utils import tracer
 
-# Cache for temporary storage with TTL
-cache = TTLCache(maxsize=100, ttl=300)
+# Active alarms of each user, by user id
+active_alarms_cache = VersionedCache("alarms", ttl=settings.ALARM_CACHE_TTL_SECONDS, backend=settings.ALARM_CACHE_BACKEND)
 
 # AlarmService class handles all alarm-related business logic
 class AlarmService:
@@ -31,6 +45,7 @@ class AlarmService:
             active=request.active,
         )
         await new_alarm.insert()
+        await active_alarms_cache.invalidate(request.user_id)
 
         return CreateAlarmResponse(id=str(new_alarm.id))
 
@@ -45,6 +60,7 @@ class AlarmService:
             raise HTTPException(status_code=404, detail="Alarm not found")
 
         await alarm.delete()
+        await active_alarms_cache.invalidate(str(alarm.user_id))
 
     # Retrieve an alarm by ID
     @staticmethod
@@ -70,6 +86,7 @@ class AlarmService:
 
         alarm.active = not alarm.active
         await alarm.save()
+        await active_alarms_cache.invalidate(str(alarm.user_id))
 
     # Get all alarms for a specific user
     @staticmethod
@@ -79,10 +96,53 @@ class AlarmService:
             raise HTTPException(status_code=400, detail="Invalid user ID format")
 
         return await Alarm.find({"user_id": PydanticObjectId(user_id)}).to_list()
+
+    # Get all alarms for a user as responses, read raw from Mongo without document hydration
+    @staticmethod
+    async def get_alarm_responses_by_user(user_id: str) -> list[GetAlarmResponse]:
+        if not Alarm.is_valid_id(user_id):
+            raise HTTPException(status_code=400, detail="Invalid user ID format")
+
+        alarms = await Alarm.get_pymongo_collection().find(
+            {"user_id": PydanticObjectId(user_id)},
+            {"user_id": 1, "type": 1, "threshold": 1, "active": 1},
+        ).to_list()
+        # Trusted data written by this service, no need to validate it again
+        return [
+            GetAlarmResponse.model_construct(
+                id=str(alarm["_id"]),
+                user_id=str(alarm["user_id"]),
+                type=AlarmType(alarm["type"]),
+                threshold=alarm["threshold"],
+                active=alarm["active"],
+            ) for alarm in alarms
+        ]
+
+    # Get the active alarms of a user, only the fields needed to check them (cached)
+    @staticmethod
+    async def get_active_alarm_views_by_user(user_id: str) -> list[AlarmView]:
+        if not Alarm.is_valid_id(user_id):
+            raise HTTPException(status_code=400, detail="Invalid user ID format")
+
+        alarms, version = await active_alarms_cache.get(user_id)
+        if alarms is None:
+            alarms = await Alarm.get_pymongo_collection().find(
+                {"user_id": PydanticObjectId(user_id), "active": True},
+                AlarmView.Settings.projection,
+            ).to_list()
+            await active_alarms_cache.set(user_id, "", alarms, version)
+        return [
+            AlarmView.model_construct(
+                id=alarm["_id"],
+                threshold=alarm["threshold"],
+                type=AlarmType(alarm["type"]),
+                active=alarm["active"],
+            ) for alarm in alarms
+        ]
     
     # Check if an alarm is triggered based on price or energy values
     @staticmethod
-    async def is_triggered(alarm: Alarm, price: float, kw: float) -> bool:
+    async def is_triggered(alarm: Alarm | AlarmView, price: float, kw: float) -> bool:
         if not alarm.active:
             return False
         
@@ -98,6 +158,22 @@ class AlarmService:
         
         return False
     
+    # Check the active alarms of a user against a new reading, logging the triggered ones
+    @staticmethod
+    async def check_reading(user_id: str, reading_id: str, kw: float, price: float) -> None:
+        alarms = await AlarmService.get_active_alarm_views_by_user(user_id)
+        # Recorded on the span of the caller (meter.check_alarms during ingest)
+        trace.get_current_span().set_attribute("alarm.count", len(alarms))
+        for alarm in alarms:
+            if await AlarmService.is_triggered(alarm, price=price, kw=kw):
+                with tracer.start_as_current_span("alarm.log_history"):
+                    await AlarmService.log_alarm_history(
+                        user_id=user_id,
+                        alarm_id=str(alarm.id),
+                        value=kw if alarm.type == AlarmType.ENERGY else price,
+                        reading_id=reading_id,
+                    )
+
     # Get alarm history for a user
     @staticmethod
     async def get_alarms_history(user_id: str) -> list[AlarmHistory]:
@@ -106,22 +182,57 @@ class AlarmService:
 
         return await AlarmHistory.find({"user_id": PydanticObjectId(user_id)}).to_list()
 
+    # Get alarm history for a user as responses, read raw from Mongo without document hydration
+    @staticmethod
+    async def get_alarm_history_responses(user_id: str) -> list[AlarmHistoryResponse]:
+        if not Alarm.is_valid_id(user_id):
+            raise HTTPException(status_code=400, detail="Invalid user ID format")
+
+        history = await AlarmHistory.get_pymongo_collection().find(
+            {"user_id": PydanticObjectId(user_id)},
+        ).to_list()
+        return [
+            AlarmHistoryResponse.model_construct(
+                id=str(h["_id"]),
+                user_id=str(h["user_id"]),
+                alarm_id=str(h["alarm_id"]),
+                value=h["value"],
+                triggered_at=h["triggered_at"],
+            ) for h in history
+        ]
+
     # Log a new alarm trigger event in history
     @staticmethod
-    async def log_alarm_history(user_id: str, alarm_id: str, value: float) -> None:
+    async def log_alarm_history(user_id: str, alarm_id: str, value: float, reading_id: str | None = None) -> None:
         if not Alarm.is_valid_id(user_id):
             raise HTTPException(status_code=400, detail="Invalid user ID format")
         
         if not Alarm.is_valid_id(alarm_id):
             raise HTTPException(status_code=400, detail="Invalid alarm ID format")
 
-        new_history = AlarmHistory(
-            user_id=PydanticObjectId(user_id),
-            alarm_id=PydanticObjectId(alarm_id),
+        triggered_at = datetime.now()
+        if reading_id:
+            # Logged once per reading, the same reading can be checked again (at-least-once consumers)
+            result = await AlarmHistory.get_pymongo_collection().update_one(
+                {"alarm_id": PydanticObjectId(alarm_id), "reading_id": PydanticObjectId(reading_id)},
+                {"$setOnInsert": {"user_id": PydanticObjectId(user_id), "value": value, "triggered_at": triggered_at}},
+                upsert=True,
+            )
+            if result.upserted_id is None:
+                return
+        else:
+            new_history = AlarmHistory(
+                user_id=PydanticObjectId(user_id),
+                alarm_id=PydanticObjectId(alarm_id),
+                value=value,
+                triggered_at=triggered_at,
+            )
+            await new_history.insert()
+        live_events.publish(user_id, "alarm", AlarmTriggeredEvent(
+            alarm_id=alarm_id,
             value=value,
-            triggered_at=datetime.now(),
-        )
-        await new_history.insert()
+            triggered_at=triggered_at,
+        ))
 
     # Delete a specific alarm history entry
     @staticmethod
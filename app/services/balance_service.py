@@ -0,0 +1,103 @@
+from datetime import datetime, timedelta
+from beanie import PydanticObjectId
+from pymongo import UpdateOne
+
+from app.config.settings import settings
+from app.models.user import User
+
+# Import WhatsOnChain utilities for BSV operations
+from app.utils.whatsonchain_utils import WhatsOnChainUtils
+
+
+# BalanceService keeps stored wallet balances fresh in the background, so reads never hit the chain
+class BalanceService:
+
+    # Users whose balance was requested while stale, refreshed first on the next run
+    _pending: set[PydanticObjectId] = set()
+
+    # Check whether a stored balance is too old to be trusted
+    @staticmethod
+    def is_stale(balance_updated_at: datetime | None) -> bool:
+        if balance_updated_at is None:
+            return True
+        return datetime.now() - balance_updated_at > timedelta(seconds=settings.BALANCE_MAX_AGE_SECONDS)
+
+    # Ask for a background refresh of a user balance
+    @staticmethod
+    def request_refresh(user_id: PydanticObjectId) -> None:
+        BalanceService._pending.add(user_id)
+
+    # Refresh requested and stale balances, several addresses per chain request
+    @staticmethod
+    async def refresh_stale_balances(limit: int = settings.BALANCE_REFRESH_MAX_USERS, requested_only: bool = False) -> int:
+        pending = list(BalanceService._pending)
+        BalanceService._pending.clear()
+
+        stale_before = datetime.now() - timedelta(seconds=settings.BALANCE_MAX_AGE_SECONDS)
+        projection = {"user_wallet.bsv_address": 1, "user_wallet.balance_satoshis": 1}
+        collection = User.get_pymongo_collection()
+
+        # Requested users first, then the stalest ones (unless only the requested ones are refreshed)
+        users = await collection.find({"_id": {"$in": pending}}, projection).to_list()
+        if not requested_only:
+            users += await collection.find(
+                {
+                    "_id": {"$nin": pending},
+                    # Users without an address are never refreshed, so they would stay the stalest forever
+                    "user_wallet.bsv_address": {"$nin": [None, ""]},
+                    "$or": [
+                        {"user_wallet.balance_updated_at": None},
+                        {"user_wallet.balance_updated_at": {"$lt": stale_before}},
+                    ],
+                },
+                projection,
+            ).sort("user_wallet.balance_updated_at", 1).limit(max(limit - len(pending), 0)).to_list()
+
+        updated = 0
+        batch_size = settings.BALANCE_REFRESH_BATCH_SIZE
+        for start in range(0, len(users), batch_size):
+            updated += await BalanceService._refresh_batch(users[start:start + batch_size])
+        return updated
+
+    # Fetch the balances of a batch of users and write only what changed
+    @staticmethod
+    async def _refresh_batch(users: list[dict]) -> int:
+        wallets = {user["_id"]: user.get("user_wallet") or {} for user in users}
+        addresses = [wallet["bsv_address"] for wallet in wallets.values() if wallet.get("bsv_address")]
+        if not addresses:
+            return 0
+
+        balances = await WhatsOnChainUtils.get_balances(addresses)
+        now = datetime.now()
+
+        operations = []
+        for user_id, wallet in wallets.items():
+            balance_satoshis = balances.get(wallet.get("bsv_address"))
+            if balance_satoshis is None:
+                continue
+
+            # The euro value follows the price, so it is recomputed even when the balance did not change
+            balance_euro = await WhatsOnChainUtils.convert_satoshis_to_euro(balance_satoshis)
+            if balance_satoshis == wallet.get("balance_satoshis"):
+                # Unchanged, record that the balance was checked at the current price
+                operations.append(UpdateOne(
+                    {"_id": user_id},
+                    {"$set": {"user_wallet.balance_euro": balance_euro, "user_wallet.balance_updated_at": now}},
+                ))
+                continue
+
+            # Changed, the filter skips the write if another worker already stored this balance
+            operations.append(UpdateOne(
+                {"_id": user_id, "user_wallet.balance_satoshis": {"$ne": balance_satoshis}},
+                {"$set": {
+                    "user_wallet.balance_satoshis": balance_satoshis,
+                    "user_wallet.balance_euro": balance_euro,
+                    "user_wallet.balance_updated_at": now,
+                }},
+            ))
+
+        if not operations:
+            return 0
+
+        result = await User.get_pymongo_collection().bulk_write(operations, ordered=False)
+        return result.modified_count
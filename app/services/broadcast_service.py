@@ -0,0 +1,111 @@
+import asyncio
+from typing import TYPE_CHECKING
+
+from app.config.settings import settings
+
+# Import WhatsOnChain utilities for BSV operations
+from app.utils.whatsonchain_utils import WhatsOnChainUtils
+# Import tracer for batch broadcast spans
+from app.utils.tracing_utils import tracer
+
+if TYPE_CHECKING:
+    from bsv import Transaction
+
+
+# TransactionBroadcaster collects signed transactions and submits them in batches
+# through the WhatsOnChain bulk broadcast endpoint
+class TransactionBroadcaster:
+
+    def __init__(
+        self,
+        batch_size: int = settings.BROADCAST_BATCH_SIZE,
+        max_delay_seconds: float = settings.BROADCAST_MAX_DELAY_SECONDS,
+    ):
+        self.batch_size = batch_size
+        self.max_delay_seconds = max_delay_seconds
+        # Pending (txid, raw hex, future) entries waiting for the next flush
+        self._pending: list[tuple[str, str, asyncio.Future]] = []
+        # Task sending the queued batches (callers only wait for their own future, so cancelling a caller
+        # never interrupts a batch) and the future completing its window early when the batch is full
+        self._flush_task: asyncio.Task | None = None
+        self._batch_full: asyncio.Future | None = None
+
+    # Queue a signed transaction and wait until its batch has been broadcast
+    async def broadcast(self, tx: "Transaction") -> str:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((tx.txid(), tx.hex(), future))
+
+        if self._flush_task is None or self._flush_task.done():
+            # First transaction of a new batch, flush it after the max delay
+            self._batch_full = loop.create_future()
+            self._flush_task = asyncio.create_task(self._flush_later())
+        if len(self._pending) >= self.batch_size:
+            # Batch is full, send it right away
+            self._close_window()
+
+        return await future
+
+    # Broadcast every queued transaction, batch by batch
+    async def flush(self) -> None:
+        while self._pending:
+            batch = self._pending[:self.batch_size]
+            del self._pending[:self.batch_size]
+            await self._send_batch(batch)
+
+    # Flush everything still queued before shutting down
+    async def close(self) -> None:
+        if self._flush_task is not None and not self._flush_task.done():
+            # A batch being sent finishes first, so its callers get its outcome
+            self._close_window()
+            await self._flush_task
+        await self.flush()
+
+    # Wait for the batch window to close (or the batch to fill) and flush the queue
+    async def _flush_later(self) -> None:
+        await asyncio.wait([self._batch_full], timeout=self.max_delay_seconds)
+        await self.flush()
+
+    # Helper function to end the batch window of the running flush
+    def _close_window(self) -> None:
+        if self._batch_full is not None and not self._batch_full.done():
+            self._batch_full.set_result(None)
+
+    # Send a single batch and resolve the future of each transaction with its outcome
+    @staticmethod
+    async def _send_batch(batch: list[tuple[str, str, asyncio.Future]]) -> None:
+        # A transaction queued twice (payment retried before its batch was sent) is sent once
+        raw_hexes = list(dict.fromkeys(raw_hex for _, raw_hex, _ in batch))
+        try:
+            with tracer.start_as_current_span("broadcast.send_batch", attributes={"bsv.batch_size": len(raw_hexes)}):
+                results = await WhatsOnChainUtils.broadcast_transactions(raw_hexes)
+        except Exception as e:
+            TransactionBroadcaster._fail(batch, ValueError(f"Error broadcasting transactions: {e}"))
+            return
+        except BaseException:
+            # Cancelled mid-request (shutdown), the outcome is unknown but no caller may wait forever
+            TransactionBroadcaster._fail(batch, ValueError("Broadcast interrupted, transaction status unknown"))
+            raise
+
+        outcomes = {result.get("txid"): result for result in results}
+        for txid, _, future in batch:
+            if future.done():
+                continue
+            outcome = outcomes.get(txid)
+            if outcome is None:
+                future.set_exception(ValueError(f"Transaction {txid} missing from broadcast response, status unknown"))
+            elif outcome.get("error"):
+                future.set_exception(ValueError(f"Transaction {txid} rejected: {outcome['error']}"))
+            else:
+                future.set_result(txid)
+
+    # Helper function to fail every caller of a batch still waiting
+    @staticmethod
+    def _fail(batch: list[tuple[str, str, asyncio.Future]], error: Exception) -> None:
+        for _, _, future in batch:
+            if not future.done():
+                future.set_exception(error)
+
+
+# Shared broadcaster instance for the application
+broadcaster = TransactionBroadcaster()
@@ -0,0 +1,87 @@
+from datetime import timedelta
+from pymongo.errors import DuplicateKeyError
+
+# Import settings
+from app.config.settings import settings
+# Import usage counter model maintained by the counters consumer
+from app.models.usage_counter import UsageCounter
+# Import alarm service, alarms are checked the same way as during ingest
+from app.services.alarm_service import AlarmService
+# Import retention service, rollups are built the same way as during compaction
+from app.services.retention_service import RetentionService
+# Import consumer framework
+from app.utils.change_consumer_utils import ChangeConsumer, ConsumerRunner
+
+
+# AlarmConsumer checks the alarms of the user of every new reading (instead of ingest, with ALARM_CONSUMER_ENABLED).
+# Alarms are logged once per reading, so a reading handled twice does not log them twice.
+class AlarmConsumer(ChangeConsumer):
+
+    name = "alarms"
+
+    async def handle(self, reading: dict) -> None:
+        await AlarmService.check_reading(
+            str(reading["user_id"]),
+            str(reading["_id"]),
+            kw=reading["kw_consumed"],
+            price=reading.get("cost_euro") or 0.0,
+        )
+
+
+# RollupConsumer keeps the daily rollup of the user of every new reading up to date.
+# The day is recomputed from its readings (at most one per hour), so handling a reading twice is harmless.
+# Days of months past retention are left to compaction, their raw readings are not all kept.
+class RollupConsumer(ChangeConsumer):
+
+    name = "rollups"
+
+    async def handle(self, reading: dict) -> None:
+        day = reading["timestamp"].replace(hour=0, minute=0, second=0, microsecond=0)
+        if settings.RETENTION_RAW_MONTHS > 0 and day < RetentionService.get_compaction_cutoff():
+            return
+        await RetentionService.rollup(
+            {"user_id": reading["user_id"], "timestamp": {"$gte": day, "$lt": day + timedelta(days=1)}}
+        )
+
+
+# UsageCounterConsumer adds every new reading to the monthly usage counter of its user.
+# The last readings counted are kept on the counter, so a reading delivered twice is only counted once.
+class UsageCounterConsumer(ChangeConsumer):
+
+    name = "counters"
+
+    async def handle(self, reading: dict) -> None:
+        month = reading["timestamp"].replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+        try:
+            await UsageCounter.get_pymongo_collection().update_one(
+                {"user_id": reading["user_id"], "month": month, "recent_reading_ids": {"$ne": reading["_id"]}},
+                {
+                    "$inc": {
+                        "kw_consumed": reading["kw_consumed"],
+                        "cost_euro": reading.get("cost_euro") or 0.0,
+                        "readings": 1,
+                    },
+                    "$push": {"recent_reading_ids": {
+                        "$each": [reading["_id"]],
+                        "$slice": -settings.USAGE_COUNTER_DEDUPE_WINDOW,
+                    }},
+                },
+                upsert=True,
+            )
+        except DuplicateKeyError:
+            # The counter exists and already counted this reading
+            pass
+
+
+# Available consumers, by name
+CONSUMERS: dict[str, ChangeConsumer] = {
+    consumer.name: consumer for consumer in (AlarmConsumer(), RollupConsumer(), UsageCounterConsumer())
+}
+
+
+# Build the runner of the consumers enabled for this process
+def build_consumer_runner(names: list[str] = settings.CONSUMERS) -> ConsumerRunner:
+    unknown = [name for name in names if name not in CONSUMERS]
+    if unknown:
+        raise ValueError(f"Unknown consumers {unknown}, expected some of {list(CONSUMERS)}")
+    return ConsumerRunner([CONSUMERS[name] for name in names])
@@ -0,0 +1,166 @@
+import asyncio
+import hmac
+import math
+import msgpack
+from fastapi import HTTPException, WebSocket, status
+
+# Import settings
+from app.config.settings import settings
+# Import meter service, readings go through the same ingest logic as POST /meter
+from app.services.meter_service import MeterService
+# Import ingest lane, readings received over WebSocket count as ingest too
+from app.utils.admission_utils import ingest_lane
+# Import tracer and ingest metrics
+from app.utils.tracing_utils import tracer
+from app.utils.metrics_utils import INGEST_WS_CONNECTIONS, INGEST_WS_READINGS
+
+
+# MeterIngestService serves meters keeping one WebSocket open to stream their readings.
+#
+# Every frame is a binary msgpack map {"s": sequence number, "r": [[user_id, meter_id, reading], ...]}.
+# The server answers every frame with {"s": sequence number, "r": [[status, id or error detail], ...]},
+# one result per reading in the same order (status codes as returned by POST /meter), or with
+# {"s": sequence number or None, "e": error} when the whole frame is invalid. Several frames can be sent
+# without waiting for their acknowledgements (up to INGEST_WS_MAX_IN_FLIGHT), acknowledgements may
+# arrive in any order.
+class MeterIngestService:
+
+    # Serve an ingest connection until the meter disconnects
+    @staticmethod
+    async def serve(websocket: WebSocket) -> None:
+        if not MeterIngestService._is_authorized(websocket):
+            await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+            return
+
+        await websocket.accept()
+        INGEST_WS_CONNECTIONS.inc()
+        # Stop reading frames while too many are being ingested (backpressure on the meter)
+        slots = asyncio.Semaphore(settings.INGEST_WS_MAX_IN_FLIGHT)
+        send_lock = asyncio.Lock()
+        # One lock per user, so readings of a user run in arrival order even across frames in flight
+        user_locks: dict[str, asyncio.Lock] = {}
+        tasks: set[asyncio.Task] = set()
+        try:
+            while True:
+                message = await websocket.receive()
+                if message["type"] == "websocket.disconnect":
+                    break
+                await slots.acquire()
+                task = asyncio.create_task(
+                    MeterIngestService._handle_frame(websocket, message.get("bytes"), slots, send_lock, user_locks)
+                )
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+        finally:
+            # Readings already received are still ingested, only their acknowledgements are lost
+            if tasks:
+                await asyncio.gather(*tasks, return_exceptions=True)
+            INGEST_WS_CONNECTIONS.dec()
+
+    # Ingest the readings of a frame and acknowledge it
+    @staticmethod
+    async def _handle_frame(
+        websocket: WebSocket,
+        data: bytes | None,
+        slots: asyncio.Semaphore,
+        send_lock: asyncio.Lock,
+        user_locks: dict[str, asyncio.Lock],
+    ) -> None:
+        try:
+            sequence = None
+            try:
+                frame = MeterIngestService._decode(data)
+                sequence = frame.get("s")
+                readings = MeterIngestService._check_readings(frame["r"])
+            except ValueError as e:
+                ack = {"s": sequence, "e": str(e)}
+            else:
+                with tracer.start_as_current_span("meter.ingest_batch", attributes={"batch.size": len(readings)}):
+                    ack = {"s": sequence, "r": await MeterIngestService._ingest_batch(readings, user_locks)}
+
+            async with send_lock:
+                await websocket.send_bytes(msgpack.packb(ack))
+        except Exception as e:
+            # The meter disconnected before its acknowledgement was sent
+            print(f"Error acknowledging ingest frame: {e}")
+        finally:
+            slots.release()
+
+    # Ingest a batch: readings of different users run concurrently, readings of the same user in order
+    # (each payment spends the change of the previous one). The user locks are shared by the frames of a
+    # connection and taken in arrival order (asyncio locks are fair), so later frames wait for earlier ones
+    @staticmethod
+    async def _ingest_batch(readings: list[list], user_locks: dict[str, asyncio.Lock]) -> list[list]:
+        results: list = [None] * len(readings)
+        indexes_by_user: dict[str, list[int]] = {}
+        for index, reading in enumerate(readings):
+            indexes_by_user.setdefault(reading[0], []).append(index)
+
+        async def ingest_user(user_id: str, indexes: list[int]) -> None:
+            async with user_locks.setdefault(user_id, asyncio.Lock()):
+                for index in indexes:
+                    _, meter_id, kw = readings[index]
+                    results[index] = await MeterIngestService._ingest_one(user_id, meter_id, float(kw))
+
+        await asyncio.gather(*[ingest_user(user_id, indexes) for user_id, indexes in indexes_by_user.items()])
+        return results
+
+    # Ingest a single reading, returns its [status, id or error detail] result
+    @staticmethod
+    async def _ingest_one(user_id: str, meter_id: str, kw: float) -> list:
+        ingest_lane.try_acquire()
+        try:
+            response = await MeterService.ingest_reading(user_id, meter_id, kw)
+            INGEST_WS_READINGS.labels("accepted").inc()
+            return [200, response.id]
+        except HTTPException as e:
+            INGEST_WS_READINGS.labels("rejected").inc()
+            return [e.status_code, e.detail]
+        except Exception as e:
+            print(f"Error ingesting reading: {e}")
+            INGEST_WS_READINGS.labels("failed").inc()
+            return [500, "Internal server error"]
+        finally:
+            ingest_lane.release()
+
+    # Helper function to decode a frame
+    @staticmethod
+    def _decode(data: bytes | None) -> dict:
+        if data is None:
+            raise ValueError("Only binary frames are accepted")
+        try:
+            frame = msgpack.unpackb(data)
+        except Exception:
+            raise ValueError("Invalid msgpack frame")
+        if not isinstance(frame, dict) or not isinstance(frame.get("r"), list):
+            raise ValueError("Frame must be a map with a list of readings under 'r'")
+        return frame
+
+    # Helper function to check the readings of a frame
+    @staticmethod
+    def _check_readings(readings: list) -> list[list]:
+        if len(readings) > settings.INGEST_WS_MAX_BATCH:
+            raise ValueError(f"Too many readings in a frame (max {settings.INGEST_WS_MAX_BATCH})")
+        for index, reading in enumerate(readings):
+            if not (
+                isinstance(reading, list)
+                and len(reading) == 3
+                and isinstance(reading[0], str)
+                and isinstance(reading[1], str)
+                and isinstance(reading[2], (int, float))
+                and not isinstance(reading[2], bool)
+                and math.isfinite(reading[2])
+            ):
+                raise ValueError(f"Invalid reading at index {index}, expected [user_id, meter_id, reading]")
+        return readings
+
+    # Helper function to check the ingest token (Authorization: Bearer <token> or ?token=<token>)
+    @staticmethod
+    def _is_authorized(websocket: WebSocket) -> bool:
+        if not settings.INGEST_WS_TOKEN:
+            return False
+        token = websocket.query_params.get("token")
+        authorization = websocket.headers.get("authorization", "")
+        if authorization.startswith("Bearer "):
+            token = authorization[len("Bearer "):]
+        return token is not None and hmac.compare_digest(token.encode(), settings.INGEST_WS_TOKEN.encode())
@@ -9,13 +9,39 @@ from app.dtos.meter.meter_response import GenerateChartMeterResponse
 from app.dtos.meter.meter_response import ChartItem
 from app.dtos.meter.meter_request import CreateMeterRequest
 from app.dtos.meter.meter_request import StepEnum
-# Import models for meter readings, users, and alarm types
+# Import meter reading and rollup models
 from app.models.meter_reading import MeterReading
-from app.models.user import User
-from app.models.alarm import AlarmType
+from app.models.meter_rollup import MeterRollup
+# Import usage counters, monthly totals kept by the counters consumer
+from app.models.usage_counter import UsageCounter
 # Import services for alarms and payments
 from app.services.alarm_service import AlarmService
 from app.services.payment_service import PaymentService
+from app.services.user_cache_service import UserCacheService
+from app.services.retention_service import RetentionService
+# Import tracer for ingest step spans
+from app.utils.tracing_utils import tracer
+# Import settings and versioned cache for chart data
+from app.config.settings import settings
+from app.utils.cache_utils import VersionedCache
+# Import single-flight, identical concurrent chart requests share one aggregation
+from app.utils.single_flight_utils import SingleFlight
+# Import live event hub, new readings are pushed to open dashboards
+from app.utils.live_events_utils import live_events
+
+# Aggregated chart data of each user, by user id, invalidated by every new reading
+chart_cache = VersionedCache("chart", ttl=settings.CHART_CACHE_TTL_SECONDS, backend=settings.CHART_CACHE_BACKEND)
+
+# In-flight chart generations, by user, range and step
+chart_flight = SingleFlight("generate_chart")
+
+# Approximate duration of a chart point for each step, used to cap the requested range
+STEP_DURATIONS = {
+    StepEnum.HOURLY: timedelta(hours=1),
+    StepEnum.DAILY: timedelta(days=1),
+    StepEnum.WEEKLY: timedelta(weeks=1),
+    StepEnum.MONTHLY: timedelta(days=30),
+}
 
 # MeterService class handles meter reading creation, chart generation, and usage calculations
 class MeterService:
@@ -23,49 +49,54 @@ class MeterService:
     # Create a new meter reading, process payment, calculate cost, and check alarms
     @staticmethod
     async def create_meter(request: CreateMeterRequest) -> CreateMeterResponse:
+        return await MeterService.ingest_reading(request.user_id, request.meter_id, request.reading)
+
+    # Ingest a single reading, shared by the HTTP and WebSocket ingest channels
+    @staticmethod
+    async def ingest_reading(user_id: str, meter_id: str, reading: float) -> CreateMeterResponse:
         # Check if ID format is valid
-        if not MeterReading.is_valid_id(request.user_id):
+        if not MeterReading.is_valid_id(user_id):
             raise HTTPException(status_code=400, detail="Invalid user ID format")
         
         # Process payment using PaymentService
-        payment_id = (await PaymentService.make_payment(request.user_id, amount_satoshis=100)).id  #TODO Calculate satoshis
+        with tracer.start_as_current_span("meter.payment"):
+            payment_id = (await PaymentService.make_payment(user_id, amount_satoshis=100)).id  #TODO Calculate satoshis
 
-        # Get user for tariff
-        user = await User.find_one({"_id": PydanticObjectId(request.user_id)})
+        # Get user for tariff (cached, already loaded by the payment)
+        with tracer.start_as_current_span("meter.get_user"):
+            user = await UserCacheService.get_hot_fields(user_id)
         if not user:
             raise HTTPException(status_code=404, detail="User not found")
 
         # Calculate cost based on tariff
-        kw_consumed = request.reading
+        kw_consumed = reading
         cost_euro = kw_consumed * user.tariff
 
         # Create and save new meter reading
         new_meter = MeterReading(
-            user_id=PydanticObjectId(request.user_id),
+            user_id=PydanticObjectId(user_id),
             kw_consumed=kw_consumed,
             cost_euro=cost_euro,
-            meter_id=request.meter_id,
+            meter_id=meter_id,
             payment_id=PydanticObjectId(payment_id),
             timestamp=datetime.now()
         )
-        await new_meter.insert()
-
-        # Check if alarms are triggered
-        alarms = await AlarmService.get_alarms_by_user(request.user_id)
-        for alarm in alarms:
-            price = kw_consumed * user.tariff
-            if await AlarmService.is_triggered(alarm, price=price, kw=kw_consumed):
-                # Log alarm if triggered
-                await AlarmService.log_alarm_history(
-                    user_id=request.user_id,
-                    alarm_id=str(alarm.id),
-                    value=kw_consumed if alarm.type == AlarmType.ENERGY else price
+        with tracer.start_as_current_span("meter.insert"):
+            await new_meter.insert()
+            await chart_cache.invalidate(user_id)
+        live_events.publish_reading(user_id, new_meter.timestamp, kw_consumed, cost_euro)
+
+        # Check if alarms are triggered (unless the alarms consumer does it from the change stream)
+        if not settings.ALARM_CONSUMER_ENABLED:
+            with tracer.start_as_current_span("meter.check_alarms"):
+                await AlarmService.check_reading(
+                    user_id, str(new_meter.id), kw=kw_consumed, price=kw_consumed * user.tariff
                 )
 
         # Return response with new meter reading ID
         return CreateMeterResponse(id=str(new_meter.id))
     
-    # Generate consumption chart with aggregation based on time step
+    # Generate consumption chart with aggregation based on time step (identical concurrent calls are coalesced)
     @staticmethod
     async def generate_chart(
         user_id: str,
@@ -73,6 +104,22 @@ class MeterService:
         end_date: str | None = None,
         step: StepEnum = StepEnum.DAILY
     ) -> GenerateChartMeterResponse:
+        return await chart_flight.do(
+            (user_id, start_date, end_date, step),
+            lambda: MeterService._generate_chart(user_id, start_date, end_date, step),
+        )
+
+    # Helper function to generate a chart
+    @staticmethod
+    async def _generate_chart(
+        user_id: str,
+        start_date: str | None,
+        end_date: str | None,
+        step: StepEnum,
+    ) -> GenerateChartMeterResponse:
+        # Cache key from the requested range, a default range is cached until the next reading or the TTL
+        cache_key = f"{step.value}:{start_date}:{end_date}"
+
         # Default date range if not provided to generate based on a standard period range
         now = datetime.now()
         if start_date is None:
@@ -90,17 +137,87 @@ class MeterService:
         # Default end date to now if not provided
         if end_date is None:
             end_date = now.isoformat()
+
+        # Reject unbounded ranges, they would scan a large part of the collection
+        MeterService._check_chart_range(start_date, end_date, step)
         
-        # Get user from database to access tariff
-        user = await User.find_one({"_id": PydanticObjectId(user_id)})
+        # Get user tariff (cached)
+        user = await UserCacheService.get_hot_fields(user_id)
         
         # Check if user exists
         if not user:
             raise HTTPException(status_code=404, detail="User not found")
         tariff = user.tariff
         
-        # Build query to consult database to generate chart
+        # Aggregated consumption is cached without prices, so a tariff change does not invalidate it
+        results, version = await chart_cache.get(user_id, cache_key)
+        if results is None:
+            # Build query to consult database to generate chart (compacted months are read from rollups)
+            compacted_before = await RetentionService.get_compacted_before()
+            pipeline = MeterService.build_chart_pipeline(user_id, start_date, end_date, step, compacted_before)
+
+            # Execute aggregation (raw pymongo, results are plain dicts)
+            cursor = await MeterReading.get_pymongo_collection().aggregate(
+                pipeline, maxTimeMS=settings.MONGODB_AGGREGATION_MAX_TIME_MS
+            )
+            results = await cursor.to_list()
+            await chart_cache.set(user_id, cache_key, results, version)
+        
+        # Convert to ChartItem with price from user's tariff (trusted aggregation output, not validated)
+        chart_data = [
+            ChartItem.model_construct(timestamp=result["timestamp"], kw=result["kw"], price=result["kw"] * tariff)
+            for result in results
+        ]
+        
+        return GenerateChartMeterResponse(chart=chart_data)
+
+    # Calculate total kWh usage for the current month
+    @staticmethod
+    async def get_monthly_usage_kwh(user_id: str) -> float:
+        # Check if ID format is valid
+        if not MeterReading.is_valid_id(user_id):
+            raise HTTPException(status_code=400, detail="Invalid user ID format")
 
+        # Running total kept by the counters consumer
+        if settings.USAGE_COUNTERS_ENABLED:
+            counter = await UsageCounter.get_pymongo_collection().find_one(
+                {"user_id": PydanticObjectId(user_id), "month": MeterService._current_month()},
+                {"kw_consumed": 1},
+            )
+            return counter["kw_consumed"] if counter else 0.0
+
+        pipeline = MeterService.build_monthly_usage_pipeline(user_id)
+        cursor = await MeterReading.get_pymongo_collection().aggregate(
+            pipeline, maxTimeMS=settings.MONGODB_AGGREGATION_MAX_TIME_MS
+        )
+        result = await cursor.to_list()
+        
+        return result[0]["total_kwh"] if result else 0.0
+
+    # Check that a chart range is valid and does not have more than CHART_MAX_POINTS points
+    @staticmethod
+    def _check_chart_range(start_date: str, end_date: str, step: StepEnum) -> None:
+        try:
+            duration = datetime.fromisoformat(end_date) - datetime.fromisoformat(start_date)
+        except (ValueError, TypeError):
+            raise HTTPException(status_code=400, detail="Invalid date range")
+        if duration < timedelta(0):
+            raise HTTPException(status_code=400, detail="start_date must be before end_date")
+        if duration / STEP_DURATIONS[step] > settings.CHART_MAX_POINTS:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Date range too large for step {step.value} (max {settings.CHART_MAX_POINTS} points)",
+            )
+
+    # Pipeline maker to build the full chart aggregation pipeline for a date range and step
+    @staticmethod
+    def build_chart_pipeline(
+        user_id: str,
+        start_date: str | None,
+        end_date: str | None,
+        step: StepEnum,
+        compacted_before: datetime | None = None,
+    ) -> list[dict[str, Any]]:
         # Build match stage for date filtering
         match_stage = MeterService._build_match_stage(
             start_date, 
@@ -110,6 +227,11 @@ class MeterService:
         
         # Start pipeline with match
         pipeline = [{"$match": match_stage}]
+
+        # Readings before the compaction watermark only exist in daily rollups
+        if compacted_before is not None and (start_date is None or datetime.fromisoformat(start_date) < compacted_before):
+            pipeline.extend(MeterService._build_rollup_union_stages(match_stage, compacted_before))
+            match_stage["timestamp"] = {**match_stage.get("timestamp", {}), "$gte": compacted_before}
         
         # Build group stage based on step time
         if step == StepEnum.MONTHLY:
@@ -120,42 +242,25 @@ class MeterService:
             MeterService._build_weekly_pipeline(pipeline)
         elif step == StepEnum.HOURLY:
             MeterService._build_hourly_pipeline(pipeline)
-        
-        # Execute aggregation
-        results = await MeterReading.aggregate(pipeline).to_list()
-        
-        # Calculate price using user's tariff
-        for result in results:
-            result["price"] = result["kw"] * tariff
-        
-        # Convert to ChartItem
-        chart_data = [
-            ChartItem(timestamp=result["timestamp"], kw=result["kw"], price=result["price"])
-            for result in results
-        ]
-        
-        return GenerateChartMeterResponse(chart=chart_data)
+        return pipeline
 
-    # Calculate total kWh usage for the current month
+    # Pipeline maker to build the current month usage aggregation pipeline
     @staticmethod
-    async def get_monthly_usage_kwh(user_id: str) -> float:
-        # Check if ID format is valid
-        if not MeterReading.is_valid_id(user_id):
-            raise HTTPException(status_code=400, detail="Invalid user ID format")
-
+    def build_monthly_usage_pipeline(user_id: str) -> list[dict[str, Any]]:
         # Calculate start and end of current month
-        current_month = datetime.now().month
-        current_year = datetime.now().year
-        start_of_month = datetime(current_year, current_month, 1)
+        start_of_month = MeterService._current_month()
+        current_month, current_year = start_of_month.month, start_of_month.year
         next_month = datetime(current_year if current_month < 12 else current_year + 1, current_month % 12 + 1, 1)
         
-        pipeline = [
+        return [
             {"$match": {"user_id": PydanticObjectId(user_id), "timestamp": {"$gte": start_of_month, "$lt": next_month}}},
             {"$group": {"_id": None, "total_kwh": {"$sum": "$kw_consumed"}}}
         ]
-        result = await MeterReading.aggregate(pipeline).to_list()
-        
-        return result[0]["total_kwh"] if result else 0.0
+
+    # Helper function to get the first day of the current month (the month key of usage counters)
+    @staticmethod
+    def _current_month() -> datetime:
+        return datetime.now().replace(day=1, hour=0, minute=0, second=0, microsecond=0)
 
     # Pipeline maker to build monthly aggregation pipeline
     @staticmethod
@@ -237,6 +342,74 @@ class MeterService:
             }}
         ])
 
+    # Pipeline maker to build the stages adding the compacted readings of a chart range, shaped as readings.
+    # Whole hours are read from the hourly consumption, placed at the start of the hour (chart points never split
+    # an hour). Hours cut by the range bounds are read from the readings kept in the rollups of their day.
+    @staticmethod
+    def _build_rollup_union_stages(match_stage: dict[str, Any], compacted_before: datetime) -> list[dict[str, Any]]:
+        timestamp_range = match_stage.get("timestamp", {})
+        start, end = timestamp_range.get("$gte"), timestamp_range.get("$lte")
+        hour = timedelta(hours=1)
+
+        # Whole hours of the range before the watermark
+        hours_start = MeterService._hour_start(start) if start else None
+        if hours_start is not None and hours_start < start:
+            hours_start += hour
+        hours_end = min(MeterService._hour_start(end), compacted_before) if end else compacted_before
+        hours_range: dict[str, Any] = {"$lt": hours_end}
+        day_range: dict[str, Any] = {"$lt": hours_end}
+        if hours_start is not None:
+            hours_range["$gte"] = hours_start
+            day_range["$gte"] = hours_start.replace(hour=0)
+        stages = [{"$unionWith": {
+            "coll": MeterRollup.Settings.name,
+            "pipeline": [
+                {"$match": {"user_id": match_stage["user_id"], "day": day_range}},
+                {"$project": {"_id": 0, "day": 1, "hour": {
+                    "$zip": {"inputs": [{"$range": [0, 24]}, "$hourly_at", "$hourly_kw"]},
+                }}},
+                {"$unwind": "$hour"},
+                {"$project": {
+                    "timestamp": {"$add": ["$day", {"$multiply": [{"$arrayElemAt": ["$hour", 0]}, 3600000]}]},
+                    "first_at": {"$arrayElemAt": ["$hour", 1]},
+                    "kw_consumed": {"$arrayElemAt": ["$hour", 2]},
+                }},
+                # Hours without readings have no first reading, the range excludes them
+                {"$match": {"first_at": {"$ne": None}, "timestamp": hours_range}},
+            ],
+        }}]
+
+        # Hours cut by the range bounds, the bounds apply to each reading
+        edge_ranges = []
+        for edge in {MeterService._hour_start(bound) for bound in (start, end) if bound is not None}:
+            if edge >= compacted_before or (hours_start is not None and hours_start <= edge < hours_end):
+                continue
+            edge_range: dict[str, Any] = {"$gte": max(edge, start) if start else edge}
+            if end is not None and end < edge + hour:
+                edge_range["$lte"] = end
+            else:
+                edge_range["$lt"] = edge + hour
+            edge_ranges.append(edge_range)
+        if edge_ranges:
+            stages.append({"$unionWith": {
+                "coll": MeterRollup.Settings.name,
+                "pipeline": [
+                    {"$match": {
+                        "user_id": match_stage["user_id"],
+                        "day": {"$in": list({edge["$gte"].replace(hour=0, minute=0, second=0, microsecond=0) for edge in edge_ranges})},
+                    }},
+                    {"$unwind": "$raw_readings"},
+                    {"$replaceRoot": {"newRoot": "$raw_readings"}},
+                    {"$match": {"$or": [{"timestamp": edge_range} for edge_range in edge_ranges]}},
+                ],
+            }})
+        return stages
+
+    # Helper function to get the start of the hour of a date
+    @staticmethod
+    def _hour_start(date: datetime) -> datetime:
+        return date.replace(minute=0, second=0, microsecond=0)
+
     # Pipeline maker to build match stage for date filtering
     @staticmethod
     def _build_match_stage(
@@ -1,14 +1,26 @@
 from datetime import datetime
 from beanie import PydanticObjectId
-from bsv import PrivateKey, P2PKH, Transaction, TransactionInput, TransactionOutput
+from typing import TYPE_CHECKING
+from fastapi import HTTPException
 
 from app.config.settings import settings
 from app.models.payment import Payment
 from app.utils.encryption_utils import EncryptionUtils
-from app.models.user import User
+from app.services.user_cache_service import UserCacheService
 
 # Import WhatsOnChain utilities for BSV operations
 from app.utils.whatsonchain_utils import WhatsOnChainUtils
+# Import shared broadcaster for batched transaction broadcasting
+from app.services.broadcast_service import broadcaster
+# Import cache of parsed source transactions
+from app.utils.tx_cache_utils import transaction_cache
+# Import payment metrics
+from app.utils.metrics_utils import PAYMENT_BROADCAST_DURATION, PAYMENT_SIGN_DURATION
+# Import tracer for payment step spans
+from app.utils.tracing_utils import tracer
+
+if TYPE_CHECKING:
+    from bsv import PrivateKey, Transaction
 
 # Fee model for transaction fees - fixed fee of 100 satoshis
 # This is because python sdk does not support dynamic fee calculation yet
@@ -29,24 +41,58 @@ class PaymentService:
         user_id: str,
         amount_satoshis: int,
     ) -> Payment:
-        # Get user
-        user = await User.find_one(User.id == PydanticObjectId(user_id))
+        # Get user wallet (cached)
+        with tracer.start_as_current_span("payment.get_user"):
+            user = await UserCacheService.get_hot_fields(user_id)
+        if not user:
+            raise HTTPException(status_code=404, detail="User not found")
         
         # Decrypt user's private key
-        user_wif = EncryptionUtils.decrypt_wif(user.user_wallet.encrypted_wif)
+        with tracer.start_as_current_span("payment.decrypt_wif"):
+            user_wif = EncryptionUtils.decrypt_wif(user.encrypted_wif)
 
-        # Get recipient electricity provider address
-        recipient_address = settings.DESTINATION_BSV_ADDRESS
-        
-        # Create user private key
-        sender_key = PrivateKey(user_wif)
+            # Create user private key (BSV SDK imported lazily, it is slow to import)
+            from bsv import PrivateKey
+            sender_key = PrivateKey(user_wif)
 
-        # Get source transaction (utxo) and output index for payment
-        source_tx, source_output_index = await WhatsOnChainUtils.get_source_tx_and_index_for_payment(
-            address=sender_key.address(),
+        # Pay the electricity provider address
+        tx = await PaymentService.send_payment(
+            sender_key=sender_key,
+            recipient_address=settings.DESTINATION_BSV_ADDRESS,
             amount_satoshis=amount_satoshis,
         )
 
+        # Convert the amount to euros at the current BSV price
+        with tracer.start_as_current_span("payment.price"):
+            amount_euro = await WhatsOnChainUtils.convert_satoshis_to_euro(amount_satoshis)
+
+        # Save payment in database
+        with tracer.start_as_current_span("payment.insert"):
+            return await Payment(
+                user_id=PydanticObjectId(user_id),
+                amount_sats=amount_satoshis,
+                amount_euro=amount_euro,
+                tx_id=tx.txid(),
+                created_at=datetime.now()
+            ).insert()
+
+    # Build, sign and broadcast a payment transaction from a sender key
+    @staticmethod
+    async def send_payment(
+        sender_key: "PrivateKey",
+        recipient_address: str,
+        amount_satoshis: int,
+    ) -> "Transaction":
+        # Imported lazily, the BSV SDK is slow to import (serverless cold start)
+        from bsv import P2PKH, Transaction, TransactionInput, TransactionOutput
+
+        # Get source transaction (utxo) and output index for payment
+        with tracer.start_as_current_span("payment.get_source_tx"):
+            source_tx, source_output_index = await WhatsOnChainUtils.get_source_tx_and_index_for_payment(
+                address=sender_key.address(),
+                amount_satoshis=amount_satoshis,
+            )
+
         # Create transaction input
         tx_input = TransactionInput(
             source_transaction=source_tx,
@@ -78,16 +124,15 @@ class PaymentService:
         tx.fee(FixedFeeModel(100))
 
         # Sign transaction
-        tx.sign()
+        with tracer.start_as_current_span("payment.sign"), PAYMENT_SIGN_DURATION.time():
+            tx.sign()
 
-        # Broadcast transaction to BSV network
-        await tx.broadcast()
+        # Broadcast transaction to BSV network (batched with other payments)
+        with tracer.start_as_current_span("payment.broadcast") as span, PAYMENT_BROADCAST_DURATION.time():
+            span.set_attribute("bsv.txid", tx.txid())
+            await broadcaster.broadcast(tx)
 
-        # Save payment in database
-        return await Payment(
-            user_id=PydanticObjectId(user_id),
-            amount_sats=amount_satoshis,
-            amount_euro= await WhatsOnChainUtils.convert_satoshis_to_euro(amount_satoshis),
-            tx_id=tx.txid(),
-            created_at=datetime.now()
-        ).insert()
\ No newline at end of file
+        # Cache the broadcast transaction, its change output funds the next payment
+        await transaction_cache.put(tx)
+
+        return tx
\ No newline at end of file
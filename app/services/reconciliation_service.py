@@ -0,0 +1,65 @@
+from datetime import datetime
+from pymongo import UpdateOne
+
+from app.config.settings import settings
+from app.models.payment import Payment, PaymentStatus
+
+# Import WhatsOnChain utilities for BSV operations
+from app.utils.whatsonchain_utils import WhatsOnChainUtils
+
+
+# ReconciliationService checks whether broadcast payments confirmed and records it on each Payment.
+# It runs on the scheduler leader only, so dashboards get confirmations from MongoDB (LiveEventHub).
+class ReconciliationService:
+
+    # Check the confirmation status of pending payments, several txids per request
+    @staticmethod
+    async def reconcile_pending_payments(limit: int = settings.RECONCILE_MAX_PAYMENTS) -> int:
+        # Oldest unsettled payments first (documents without status are treated as pending)
+        payments = await Payment.find(
+            {"status": {"$nin": [PaymentStatus.CONFIRMED.value, PaymentStatus.FAILED.value]}}
+        ).sort("+created_at").limit(limit).to_list()
+
+        updated = 0
+        batch_size = settings.RECONCILE_BATCH_SIZE
+        for start in range(0, len(payments), batch_size):
+            batch = payments[start:start + batch_size]
+            statuses = await WhatsOnChainUtils.get_transactions_status([p.tx_id for p in batch])
+            updated += await ReconciliationService._apply_statuses(batch, statuses)
+
+        return updated
+
+    # Record the returned statuses on the payments with a single bulk write
+    @staticmethod
+    async def _apply_statuses(payments: list[Payment], statuses: list[dict]) -> int:
+        now = datetime.now()
+        by_txid = {status.get("txid"): status for status in statuses}
+
+        operations = []
+        for payment in payments:
+            status = by_txid.get(payment.tx_id)
+            if status is None:
+                continue
+
+            block_height = status.get("blockheight") or 0
+            if block_height > 0:
+                changes = {
+                    "status": PaymentStatus.CONFIRMED.value,
+                    "block_height": block_height,
+                    "confirmed_at": now,
+                    "checked_at": now,
+                }
+            elif status.get("error") and (now - payment.created_at).total_seconds() > settings.RECONCILE_FAIL_AFTER_SECONDS:
+                # The network never saw this transaction, it will not settle anymore
+                changes = {"status": PaymentStatus.FAILED.value, "checked_at": now}
+            else:
+                # Still in mempool or not yet propagated, keep it pending
+                changes = {"status": PaymentStatus.PENDING.value, "checked_at": now}
+
+            operations.append(UpdateOne({"_id": payment.id}, {"$set": changes}))
+
+        if not operations:
+            return 0
+
+        result = await Payment.get_pymongo_collection().bulk_write(operations, ordered=False)
+        return result.modified_count
@@ -0,0 +1,302 @@
+import asyncio
+import gzip
+import os
+from datetime import datetime
+from typing import Any
+from bson import json_util
+
+# Import settings
+from app.config.settings import settings
+# Import raw readings, their rollups and the compaction watermark
+from app.models.meter_reading import MeterReading
+from app.models.meter_rollup import MeterRollup
+from app.models.retention_watermark import RetentionWatermark
+# Import cache backend, every chart reads the watermark
+from app.utils.cache_utils import get_cache_backend
+# Import retention metrics
+from app.utils.metrics_utils import RETENTION_COMPACTED_BEFORE, RETENTION_READINGS
+
+# Cache key of the compaction watermark of meter readings
+WATERMARK_CACHE_KEY = "retention:meter_readings"
+
+
+# RetentionService keeps the raw meter readings of recent months only. Older months are archived to compressed
+# files, compacted into daily rollups (one document per user and day instead of one per reading) and deleted.
+# The watermark splits the two tiers: charts read raw readings after it and rollups before it.
+# Only archived readings are deleted: readings backfilled into a compacted month are archived, added to the
+# rollups and deleted by the next run.
+class RetentionService:
+
+    # Archive, compact and delete the raw readings older than RETENTION_RAW_MONTHS, one month at a time
+    @staticmethod
+    async def compact_readings(now: datetime | None = None) -> int:
+        if settings.RETENTION_RAW_MONTHS <= 0:
+            return 0
+
+        watermark = await RetentionWatermark.get_pymongo_collection().find_one(
+            {"collection": MeterReading.Settings.name}
+        )
+        compacted_before = watermark["before"] if watermark else None
+
+        # Readings archived by a previous run, once every worker reads their months from the rollups
+        deleted = 0
+        if watermark and (datetime.now() - watermark["updated_at"]).total_seconds() > 2 * settings.RETENTION_WATERMARK_CACHE_SECONDS:
+            for key in sorted(watermark.get("archived_months", [])):
+                deleted += await RetentionService._delete_archived(datetime.strptime(key, "%Y-%m"))
+                await RetentionWatermark.get_pymongo_collection().update_one(
+                    {"collection": MeterReading.Settings.name}, {"$pull": {"archived_months": key}}
+                )
+            # Readings of compacted months that arrived after their month was archived
+            deleted += await RetentionService._compact_late_readings(compacted_before)
+
+        cutoff = RetentionService.get_compaction_cutoff(now)
+        month = compacted_before
+        if month is None:
+            oldest = await MeterReading.get_pymongo_collection().find_one({}, {"timestamp": 1}, sort=[("timestamp", 1)])
+            if oldest is None:
+                return deleted
+            month = RetentionService._month_start(oldest["timestamp"], 0)
+
+        while month < cutoff:
+            next_month = RetentionService._month_start(month, 1)
+            await RetentionService._archive({"timestamp": {"$gte": month, "$lt": next_month}}, month)
+            await RetentionWatermark.get_pymongo_collection().update_one(
+                {"collection": MeterReading.Settings.name},
+                {
+                    "$set": {"before": next_month, "updated_at": datetime.now()},
+                    "$addToSet": {"archived_months": month.strftime("%Y-%m")},
+                },
+                upsert=True,
+            )
+            RETENTION_COMPACTED_BEFORE.set(next_month.timestamp())
+            month = next_month
+        return deleted
+
+    # Get the start of the first month kept raw, older readings are rolled up by compaction only
+    @staticmethod
+    def get_compaction_cutoff(now: datetime | None = None) -> datetime:
+        return RetentionService._month_start(now or datetime.now(), -settings.RETENTION_RAW_MONTHS)
+
+    # Recompute the daily rollups of the readings matching a filter (idempotent)
+    @staticmethod
+    async def rollup(match: dict[str, Any]) -> None:
+        cursor = await MeterReading.get_pymongo_collection().aggregate(
+            RetentionService.build_rollup_pipeline(match), allowDiskUse=True
+        )
+        await cursor.to_list()
+
+    # Get the time before which readings are compacted, None before the first compaction (cached)
+    @staticmethod
+    async def get_compacted_before() -> datetime | None:
+        backend = get_cache_backend("memory")
+        cached = await backend.get(WATERMARK_CACHE_KEY)
+        if cached is None:
+            watermark = await RetentionWatermark.get_pymongo_collection().find_one(
+                {"collection": MeterReading.Settings.name}
+            )
+            cached = {"before": watermark["before"] if watermark else None}
+            await backend.set(WATERMARK_CACHE_KEY, cached, settings.RETENTION_WATERMARK_CACHE_SECONDS)
+        return cached["before"]
+
+    # Pipeline maker to build the daily rollups of the readings matching a filter, merged into meter_rollups
+    @staticmethod
+    def build_rollup_pipeline(match: dict[str, Any]) -> list[dict[str, Any]]:
+        # Entry of an hour of the day in the hours of a rollup (missing without readings)
+        hour_entry = {"$arrayElemAt": [{"$filter": {"input": "$hours", "cond": {"$eq": ["$$this.hour", "$$hour"]}}}, 0]}
+        return [
+            {"$match": match},
+            {"$group": {
+                "_id": {
+                    "user_id": "$user_id",
+                    "year": {"$year": "$timestamp"},
+                    "month": {"$month": "$timestamp"},
+                    "day": {"$dayOfMonth": "$timestamp"},
+                    "hour": {"$hour": "$timestamp"},
+                },
+                "kw_consumed": {"$sum": "$kw_consumed"},
+                "cost_euro": {"$sum": {"$ifNull": ["$cost_euro", 0]}},
+                "readings": {"$sum": 1},
+                "first_at": {"$min": "$timestamp"},
+                "raw_readings": {"$push": {"timestamp": "$timestamp", "kw_consumed": "$kw_consumed"}},
+            }},
+            {"$group": {
+                "_id": {
+                    "user_id": "$_id.user_id",
+                    "day": {"$dateFromParts": {"year": "$_id.year", "month": "$_id.month", "day": "$_id.day"}},
+                },
+                "kw_consumed": {"$sum": "$kw_consumed"},
+                "cost_euro": {"$sum": "$cost_euro"},
+                "readings": {"$sum": "$readings"},
+                "hours": {"$push": {"hour": "$_id.hour", "kw": "$kw_consumed", "at": "$first_at"}},
+                "raw_readings": {"$push": "$raw_readings"},
+            }},
+            {"$project": {
+                "_id": 0,
+                "user_id": "$_id.user_id",
+                "day": "$_id.day",
+                "kw_consumed": 1,
+                "cost_euro": 1,
+                "readings": 1,
+                "hourly_kw": {"$map": {"input": {"$range": [0, 24]}, "as": "hour", "in": {
+                    "$let": {"vars": {"entry": hour_entry}, "in": {"$ifNull": ["$$entry.kw", 0]}},
+                }}},
+                "hourly_at": {"$map": {"input": {"$range": [0, 24]}, "as": "hour", "in": {
+                    "$let": {"vars": {"entry": hour_entry}, "in": {"$ifNull": ["$$entry.at", None]}},
+                }}},
+                "raw_readings": {"$reduce": {
+                    "input": "$raw_readings", "initialValue": [], "in": {"$concatArrays": ["$$value", "$$this"]},
+                }},
+            }},
+            {"$merge": {
+                "into": MeterRollup.Settings.name,
+                "on": ["user_id", "day"],
+                "whenMatched": "replace",
+                "whenNotMatched": "insert",
+            }},
+        ]
+
+    # Helper function to archive the readings matching a filter to gzip files of JSON lines, in chunks of whole
+    # user days. Each chunk is rolled up from the readings written, so the rollups count exactly what is archived.
+    @staticmethod
+    async def _archive(match: dict[str, Any], month: datetime) -> None:
+        directory = RetentionService._archive_directory(month)
+        cursor = MeterReading.get_pymongo_collection().find(match).sort([("user_id", 1), ("timestamp", 1)])
+        chunk: list[dict] = []
+        part = 0
+        async for reading in cursor:
+            if len(chunk) >= settings.RETENTION_ARCHIVE_CHUNK_SIZE and (
+                reading["user_id"] != chunk[-1]["user_id"] or reading["timestamp"].date() != chunk[-1]["timestamp"].date()
+            ):
+                part += 1
+                await RetentionService._archive_chunk(directory, part, chunk)
+                chunk = []
+            chunk.append(reading)
+        if chunk:
+            part += 1
+            await RetentionService._archive_chunk(directory, part, chunk)
+        # Parts left by an interrupted run with other chunk bounds
+        for name in await asyncio.to_thread(RetentionService._list_parts, directory):
+            if int(name[len("part-"):-len(".jsonl.gz")]) > part:
+                await asyncio.to_thread(os.remove, os.path.join(directory, name))
+
+    # Helper function to archive a chunk of readings and recompute the rollups of its days
+    @staticmethod
+    async def _archive_chunk(directory: str, part: int, readings: list[dict]) -> None:
+        await asyncio.to_thread(RetentionService._write_archive, directory, f"part-{part:05d}", readings)
+        await RetentionService.rollup({"_id": {"$in": [reading["_id"] for reading in readings]}})
+
+    # Helper function to delete the raw readings archived in the parts of a month (readings missing from the
+    # archive are left for _compact_late_readings)
+    @staticmethod
+    async def _delete_archived(month: datetime) -> int:
+        directory = RetentionService._archive_directory(month)
+        deleted = 0
+        for name in await asyncio.to_thread(RetentionService._list_parts, directory):
+            ids = await asyncio.to_thread(RetentionService._read_archive_ids, os.path.join(directory, name))
+            result = await MeterReading.get_pymongo_collection().delete_many({"_id": {"$in": ids}})
+            deleted += result.deleted_count
+        RETENTION_READINGS.labels("deleted").inc(deleted)
+        return deleted
+
+    # Helper function to archive, add to the rollups and delete the readings of compacted months (late backfills)
+    @staticmethod
+    async def _compact_late_readings(compacted_before: datetime) -> int:
+        deleted = 0
+        while True:
+            readings = await MeterReading.get_pymongo_collection().find(
+                {"timestamp": {"$lt": compacted_before}}
+            ).sort("_id", 1).limit(settings.RETENTION_ARCHIVE_CHUNK_SIZE).to_list()
+            if not readings:
+                return deleted
+            by_month: dict[datetime, list[dict]] = {}
+            for reading in readings:
+                by_month.setdefault(RetentionService._month_start(reading["timestamp"], 0), []).append(reading)
+            for month, month_readings in by_month.items():
+                await asyncio.to_thread(
+                    RetentionService._write_archive,
+                    RetentionService._archive_directory(month),
+                    f"late-{month_readings[0]['_id']}",
+                    month_readings,
+                )
+            for reading in readings:
+                await RetentionService._add_to_rollup(reading)
+            result = await MeterReading.get_pymongo_collection().delete_many(
+                {"_id": {"$in": [reading["_id"] for reading in readings]}}
+            )
+            deleted += result.deleted_count
+            RETENTION_READINGS.labels("deleted").inc(result.deleted_count)
+
+    # Helper function to add a reading to the rollup of its day, once (the ids added are kept on the rollup)
+    @staticmethod
+    async def _add_to_rollup(reading: dict) -> None:
+        rollups = MeterRollup.get_pymongo_collection()
+        day = reading["timestamp"].replace(hour=0, minute=0, second=0, microsecond=0)
+        hour = reading["timestamp"].hour
+        kw = reading["kw_consumed"]
+        await rollups.update_one(
+            {"user_id": reading["user_id"], "day": day},
+            {"$setOnInsert": {
+                "kw_consumed": 0.0, "cost_euro": 0.0, "readings": 0, "hourly_kw": [0.0] * 24, "hourly_at": [None] * 24,
+                "raw_readings": [],
+            }},
+            upsert=True,
+        )
+
+        # Value of the hour of the reading in an hourly array, updated with an expression of the current value
+        def at_hour(field: str, update: dict[str, Any]) -> dict[str, Any]:
+            current = {"$arrayElemAt": [f"${field}", "$$hour"]}
+            return {"$map": {"input": {"$range": [0, 24]}, "as": "hour", "in": {
+                "$cond": [{"$eq": ["$$hour", hour]}, {"$let": {"vars": {"current": current}, "in": update}}, current],
+            }}}
+
+        await rollups.update_one(
+            {"user_id": reading["user_id"], "day": day, "late_reading_ids": {"$ne": reading["_id"]}},
+            [{"$set": {
+                "kw_consumed": {"$add": ["$kw_consumed", kw]},
+                "cost_euro": {"$add": ["$cost_euro", reading.get("cost_euro") or 0.0]},
+                "readings": {"$add": ["$readings", 1]},
+                "hourly_kw": at_hour("hourly_kw", {"$add": ["$$current", kw]}),
+                "hourly_at": at_hour("hourly_at", {"$min": ["$$current", reading["timestamp"]]}),
+                "raw_readings": {"$concatArrays": [
+                    "$raw_readings", [{"timestamp": reading["timestamp"], "kw_consumed": kw}],
+                ]},
+                "late_reading_ids": {"$concatArrays": [{"$ifNull": ["$late_reading_ids", []]}, [reading["_id"]]]},
+            }}],
+        )
+
+    # Helper function to get the archive directory of a month
+    @staticmethod
+    def _archive_directory(month: datetime) -> str:
+        return os.path.join(settings.RETENTION_ARCHIVE_DIR, MeterReading.Settings.name, month.strftime("%Y-%m"))
+
+    # Helper function to list the archive parts of a month (none if it was never archived)
+    @staticmethod
+    def _list_parts(directory: str) -> list[str]:
+        if not os.path.isdir(directory):
+            return []
+        return sorted(name for name in os.listdir(directory) if name.startswith("part-") and name.endswith(".jsonl.gz"))
+
+    # Helper function to read the ids of the readings of an archive file
+    @staticmethod
+    def _read_archive_ids(path: str) -> list:
+        with gzip.open(path, "rt", encoding="utf-8") as file:
+            return [json_util.loads(line)["_id"] for line in file if line.strip()]
+
+    # Helper function to write a chunk of readings (canonical extended JSON, so types survive a restore)
+    @staticmethod
+    def _write_archive(directory: str, name: str, readings: list[dict]) -> None:
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"{name}.jsonl.gz")
+        # Written aside then renamed, an interrupted run never leaves a truncated archive
+        with gzip.open(f"{path}.tmp", "wt", encoding="utf-8") as file:
+            for reading in readings:
+                file.write(json_util.dumps(reading, json_options=json_util.CANONICAL_JSON_OPTIONS))
+                file.write("\n")
+        os.replace(f"{path}.tmp", path)
+        RETENTION_READINGS.labels("archived").inc(len(readings))
+
+    # Helper function to get the first day of the month `months` months after the month of a date
+    @staticmethod
+    def _month_start(date: datetime, months: int) -> datetime:
+        index = date.year * 12 + date.month - 1 + months
+        return datetime(index // 12, index % 12 + 1, 1)
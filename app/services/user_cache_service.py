@@ -0,0 +1,94 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator
+from beanie import PydanticObjectId
+from fastapi import Request
+
+from app.config.settings import settings
+from app.models.user import User, UserHotFields, UserProfileView
+from app.utils.cache_utils import VersionedCache
+
+# Users already loaded by the current request, by id (None outside a request)
+_identity_map: ContextVar[dict[str, User] | None] = ContextVar("user_identity_map", default=None)
+
+
+# UserCacheService is the read-through cache for users: a request-scoped identity map of full
+# documents plus a TTL cache of the hot fields shared across requests (and workers, with a shared backend)
+class UserCacheService:
+
+    # Hot fields (tariff, wallet address, encrypted WIF) by user id
+    _hot_fields = VersionedCache("user", ttl=settings.USER_CACHE_TTL_SECONDS, backend=settings.USER_CACHE_BACKEND)
+
+    # Get the full user document, at most once per request
+    @staticmethod
+    async def get_user(user_id: str) -> User | None:
+        identity_map = _identity_map.get()
+        if identity_map is not None and user_id in identity_map:
+            return identity_map[user_id]
+
+        user = await User.find_one({"_id": PydanticObjectId(user_id)})
+        if user is not None and identity_map is not None:
+            identity_map[user_id] = user
+        return user
+
+    # Get the profile fields of a user, read raw from Mongo without document hydration
+    @staticmethod
+    async def get_profile(user_id: str) -> UserProfileView | None:
+        identity_map = _identity_map.get()
+        if identity_map is not None and user_id in identity_map:
+            return UserProfileView.from_user(identity_map[user_id])
+
+        document = await User.get_pymongo_collection().find_one(
+            {"_id": PydanticObjectId(user_id)},
+            UserProfileView.Settings.projection,
+        )
+        if document is None:
+            return None
+        # Trusted data written by this application, no need to validate it again
+        document.pop("_id")
+        return UserProfileView.model_construct(**document)
+
+    # Get the hot fields of a user, usually without hitting Mongo
+    @staticmethod
+    async def get_hot_fields(user_id: str) -> UserHotFields | None:
+        identity_map = _identity_map.get()
+        if identity_map is not None and user_id in identity_map:
+            return UserHotFields.from_user(identity_map[user_id])
+
+        cached, version = await UserCacheService._hot_fields.get(user_id)
+        if cached is not None:
+            return UserHotFields.model_construct(**cached)
+
+        hot_fields = await User.find_one(
+            {"_id": PydanticObjectId(user_id)},
+            projection_model=UserHotFields,
+        )
+        if hot_fields is not None:
+            # Stored under the version read above, so a concurrent invalidation is not overwritten
+            await UserCacheService._hot_fields.set(user_id, "", hot_fields.model_dump(), version)
+        return hot_fields
+
+    # Drop a user from both caches, call after every write to its cached fields
+    @staticmethod
+    async def invalidate(user_id: str) -> None:
+        await UserCacheService._hot_fields.invalidate(user_id)
+        identity_map = _identity_map.get()
+        if identity_map is not None:
+            identity_map.pop(user_id, None)
+
+
+# Give the code inside the block its own identity map
+@contextmanager
+def user_identity_map() -> Iterator[dict[str, User]]:
+    identity_map: dict[str, User] = {}
+    token = _identity_map.set(identity_map)
+    try:
+        yield identity_map
+    finally:
+        _identity_map.reset(token)
+
+
+# Middleware giving every request its own identity map
+async def user_identity_map_middleware(request: Request, call_next):
+    with user_identity_map():
+        return await call_next(request)
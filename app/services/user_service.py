@@ -1,57 +1,69 @@
 from datetime import datetime
+from beanie import PydanticObjectId
 from fastapi import HTTPException
+from pymongo import ReturnDocument
 
 # Import DTOs for user requests and responses
 from app.dtos.user.user_response import GetUserResponse
 from app.dtos.user.user_response import CreateUserResponse
 from app.dtos.user.user_request import CreateUserRequest
 from app.dtos.user.user_request import PatchUserRequest
-# Import User model
-from app.models.user import User
-# Import Beanie for ObjectId
-from beanie import PydanticObjectId
-# Import services for wallet, meter, and WhatsOnChain
+# Import User model and its profile projection
+from app.models.user import User, UserProfileView
+# Import services for wallet, meter, and balances
 from app.services.wallet_service import WalletService
 from app.services.meter_service import MeterService
-from app.utils.whatsonchain_utils import WhatsOnChainUtils
+from app.services.balance_service import BalanceService
+from app.services.user_cache_service import UserCacheService
+# Import single-flight, identical concurrent user requests share one lookup
+from app.utils.single_flight_utils import SingleFlight
+
+# In-flight user lookups, by user id
+user_flight = SingleFlight("get_user")
 
 
 class UserService:
 
-    # Retrieve user details including wallet balance and monthly usage
+    # Retrieve user details including wallet balance and monthly usage (identical concurrent calls are coalesced)
     @staticmethod
     async def get_user(user_id: str) -> GetUserResponse:
         # Check if ID format is valid
         if not User.is_valid_id(user_id):
             raise HTTPException(status_code=400, detail="Invalid user ID format")
-        
-        # Get user from database
-        user = await User.find_one(User.id == PydanticObjectId(user_id))
+
+        return await user_flight.do(user_id, lambda: UserService._get_user(user_id))
+
+    # Helper function to retrieve user details
+    @staticmethod
+    async def _get_user(user_id: str) -> GetUserResponse:
+        # Get only the profile fields of the user
+        user = await UserCacheService.get_profile(user_id)
         if not user:
             raise HTTPException(status_code=404, detail="User not found")
 
-        # Get wallet balance
+        # Serve the stored wallet balance, refreshing it in background when stale
         balance_satoshis = None
         balance_euro = None
-        if user.user_wallet and user.user_wallet.bsv_address:
-            balance_satoshis = await WhatsOnChainUtils.get_balance(user.user_wallet.bsv_address)
-            balance_euro = await WhatsOnChainUtils.convert_satoshis_to_euro(balance_satoshis)
-            # Update the user wallet
-            user.user_wallet.balance_satoshis = balance_satoshis
-            user.user_wallet.balance_euro = balance_euro
-            await user.save()
+        balance_updated_at = None
+        if user.bsv_address:
+            balance_satoshis = user.balance_satoshis
+            balance_euro = user.balance_euro
+            balance_updated_at = user.balance_updated_at
+            if BalanceService.is_stale(balance_updated_at):
+                BalanceService.request_refresh(PydanticObjectId(user_id))
 
         # Calculate monthly usage
         monthly_usage_kwh = await MeterService.get_monthly_usage_kwh(user_id)
         
         # Return user details in response model
         return GetUserResponse(
-            id=str(user.id),
+            id=user_id,
             name=user.name,
             email=user.email,
-            bsv_address=user.user_wallet.bsv_address if user.user_wallet else None,
+            bsv_address=user.bsv_address,
             balance_satoshis=balance_satoshis,
             balance_euro=balance_euro,
+            balance_updated_at=balance_updated_at,
             monthly_usage_kwh=monthly_usage_kwh,
             profile_image_url=user.profile_image_url,
         )
@@ -78,27 +90,41 @@ class UserService:
         if not User.is_valid_id(user_id):
             raise HTTPException(status_code=400, detail="Invalid user ID format")
         
-        # Get user from database
-        user = await User.find_one(User.id == PydanticObjectId(user_id))
-        if not user:
-            raise HTTPException(status_code=404, detail="User not found")
-
         # Update user tariff and preferred currency
+        changes = {}
         if request.tariff is not None:
-            user.tariff = request.tariff
+            changes["tariff"] = request.tariff
         if request.preferred_currency is not None:
-            user.preferred_currency = request.preferred_currency
+            changes["preferred_currency"] = request.preferred_currency
 
-        # Save changes to database
-        await user.save()
+        if changes:
+            # Save only the changed fields and read back the profile in the same round-trip,
+            # so balances refreshed in background are not overwritten
+            document = await User.get_pymongo_collection().find_one_and_update(
+                {"_id": PydanticObjectId(user_id)},
+                {"$set": changes},
+                projection=UserProfileView.Settings.projection,
+                return_document=ReturnDocument.AFTER,
+            )
+            await UserCacheService.invalidate(user_id)
+            if document is not None:
+                document.pop("_id")
+                user = UserProfileView.model_construct(**document)
+            else:
+                user = None
+        else:
+            user = await UserCacheService.get_profile(user_id)
+        if not user:
+            raise HTTPException(status_code=404, detail="User not found")
 
         # Return updated user details
         return GetUserResponse(
-            id=str(user.id),
+            id=user_id,
             name=user.name,
             email=user.email,
-            bsv_address=user.user_wallet.bsv_address,
-            balance_satoshis=user.user_wallet.balance_satoshis if user.user_wallet else None,
-            balance_euro=user.user_wallet.balance_euro if user.user_wallet else None,
+            bsv_address=user.bsv_address,
+            balance_satoshis=user.balance_satoshis,
+            balance_euro=user.balance_euro,
+            balance_updated_at=user.balance_updated_at,
             profile_image_url=user.profile_image_url,
         )
\ No newline at end of file
@@ -1,6 +1,3 @@
-# Import BSV library for private key generation
-from bsv import PrivateKey
-
 # Import UserWallet model and encryption utilities
 from app.models.user import UserWallet
 from app.utils.encryption_utils import EncryptionUtils
@@ -11,6 +8,9 @@ class WalletService:
     # Generate a new BSV wallet with encrypted private key
     @staticmethod
     def create_wallet() -> UserWallet:
+        # Import BSV library for private key generation (lazily, it is slow to import)
+        from bsv import PrivateKey
+
         private_key = PrivateKey()
         bsv_address = private_key.public_key().address()
         bsv_public_key = private_key.public_key().hex()
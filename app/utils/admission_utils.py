@@ -0,0 +1,117 @@
+import asyncio
+from typing import Awaitable, TypeVar
+from fastapi import HTTPException, Request
+from fastapi.responses import JSONResponse
+from pymongo.errors import ExecutionTimeout
+
+# Import settings
+from app.config.settings import settings
+# Import admission metrics
+from app.utils.metrics_utils import ADMISSION_REJECTIONS, CANCELLED_REQUESTS
+
+T = TypeVar("T")
+
+
+# ConcurrencyLimiter caps how many requests of a lane run at the same time, without queueing
+class ConcurrencyLimiter:
+
+    def __init__(self, name: str, limit: int):
+        self.name = name
+        # A limit of 0 or less disables it
+        self.limit = limit
+        self.in_flight = 0
+
+    # Take a slot if one is free
+    def try_acquire(self) -> bool:
+        if 0 < self.limit <= self.in_flight:
+            return False
+        self.in_flight += 1
+        return True
+
+    def release(self) -> None:
+        self.in_flight -= 1
+
+
+# Ingest lane: readings are never shed, heavy routes give way while many of them are in flight
+ingest_lane = ConcurrencyLimiter("ingest", 0)
+# Heavy lane: shared by every expensive read route, so together they cannot take every worker
+heavy_lane = ConcurrencyLimiter("heavy", settings.HEAVY_MAX_CONCURRENT)
+
+
+# Dependency tracking the meter readings being ingested
+async def ingest_admission():
+    ingest_lane.try_acquire()
+    try:
+        yield
+    finally:
+        ingest_lane.release()
+
+
+# AdmissionControl is a FastAPI dependency shedding an expensive route with a fast 503 when it is at its
+# concurrency limit, when the heavy lane is full or while ingest is busy. Declare it before any dependency
+# doing paid or expensive work (e.g. an x402 paywall), so a shed request has not consumed anything.
+class AdmissionControl:
+
+    def __init__(self, route: str, limit: int):
+        self.limiter = ConcurrencyLimiter(route, limit)
+
+    async def __call__(self):
+        if ingest_lane.in_flight >= settings.INGEST_PRIORITY_THRESHOLD > 0:
+            self._reject("ingest_busy")
+        if not heavy_lane.try_acquire():
+            self._reject("heavy_lane_full")
+        if not self.limiter.try_acquire():
+            heavy_lane.release()
+            self._reject("route_limit")
+        try:
+            yield
+        finally:
+            self.limiter.release()
+            heavy_lane.release()
+
+    # Helper function to shed the request
+    def _reject(self, reason: str):
+        ADMISSION_REJECTIONS.labels(self.limiter.name, reason).inc()
+        raise HTTPException(
+            status_code=503,
+            detail="Server busy, retry later",
+            headers={"Retry-After": str(settings.ADMISSION_RETRY_AFTER_SECONDS)},
+        )
+
+
+# Run the work of a request, cancelling it if the client disconnects before it is done
+async def cancel_on_disconnect(request: Request, work: Awaitable[T]) -> T:
+    task = asyncio.ensure_future(work)
+    disconnected = asyncio.create_task(_wait_for_disconnect(request))
+    try:
+        done, _ = await asyncio.wait({task, disconnected}, return_when=asyncio.FIRST_COMPLETED)
+    except asyncio.CancelledError:
+        task.cancel()
+        raise
+    finally:
+        disconnected.cancel()
+
+    if task not in done:
+        task.cancel()
+        route = request.scope.get("route")
+        CANCELLED_REQUESTS.labels(route.path if route else "unmatched").inc()
+        # Nobody reads the response (nginx convention for a client closed request)
+        raise HTTPException(status_code=499, detail="Client disconnected")
+    return task.result()
+
+
+# Exception handler for MongoDB queries stopped by maxTimeMS
+async def query_timeout_handler(request: Request, exc: ExecutionTimeout) -> JSONResponse:
+    return JSONResponse(
+        content={"detail": "Query took too long, narrow the date range"},
+        status_code=503,
+        headers={"Retry-After": str(settings.ADMISSION_RETRY_AFTER_SECONDS)},
+    )
+
+
+# Helper function to wait until the client disconnects (only for routes without a request body)
+async def _wait_for_disconnect(request: Request) -> None:
+    while True:
+        message = await request.receive()
+        if message["type"] == "http.disconnect":
+            return
@@ -0,0 +1,169 @@
+from abc import ABC, abstractmethod
+from datetime import datetime, timedelta, timezone
+from typing import Any
+from cachetools import TLRUCache
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+# Import settings
+from app.config.settings import settings
+# Import cache entry model of the shared backend
+from app.models.cache_entry import CacheEntry
+# Import cache metrics
+from app.utils.metrics_utils import CACHE_REQUESTS
+
+# Version counters outlive every entry, so a counter never restarts while entries of an older version are alive
+VERSION_TTL_SECONDS = 7 * 86400
+
+
+# CacheBackend is the storage of a cache: values by key, each with its own time to live.
+# Values must be BSON compatible (dicts, lists, numbers, strings, datetimes) to work with every backend.
+class CacheBackend(ABC):
+
+    # Get the values of several keys in a single round-trip, missing and expired keys are left out
+    @abstractmethod
+    async def get_many(self, keys: list[str]) -> dict[str, Any]: ...
+
+    # Store a value for `ttl` seconds
+    @abstractmethod
+    async def set(self, key: str, value: Any, ttl: float) -> None: ...
+
+    # Remove a key
+    @abstractmethod
+    async def delete(self, key: str) -> None: ...
+
+    # Atomically increment a counter (starting at 0) and return its new value
+    @abstractmethod
+    async def incr(self, key: str, ttl: float) -> int: ...
+
+    # Get the value of a single key
+    async def get(self, key: str) -> Any | None:
+        return (await self.get_many([key])).get(key)
+
+
+# MemoryCacheBackend keeps values in this process (fastest, but every worker has its own copy)
+class MemoryCacheBackend(CacheBackend):
+
+    def __init__(self, maxsize: int = settings.CACHE_MEMORY_SIZE):
+        # Entries are (value, ttl) tuples, each expiring after its own ttl
+        self._entries: TLRUCache = TLRUCache(maxsize=maxsize, ttu=lambda key, entry, now: now + entry[1])
+
+    async def get_many(self, keys: list[str]) -> dict[str, Any]:
+        values = {}
+        for key in keys:
+            entry = self._entries.get(key)
+            if entry is not None:
+                values[key] = entry[0]
+        return values
+
+    async def set(self, key: str, value: Any, ttl: float) -> None:
+        self._entries[key] = (value, ttl)
+
+    async def delete(self, key: str) -> None:
+        self._entries.pop(key, None)
+
+    async def incr(self, key: str, ttl: float) -> int:
+        value = (await self.get(key) or 0) + 1
+        self._entries[key] = (value, ttl)
+        return value
+
+
+# MongoCacheBackend keeps values in a MongoDB TTL collection, shared by every worker and instance
+class MongoCacheBackend(CacheBackend):
+
+    async def get_many(self, keys: list[str]) -> dict[str, Any]:
+        # Expired entries are removed by MongoDB about once a minute, skip them until then
+        entries = await CacheEntry.get_pymongo_collection().find(
+            {"key": {"$in": keys}, "expires_at": {"$gt": datetime.now(timezone.utc)}},
+            {"_id": 0, "key": 1, "value": 1},
+        ).to_list()
+        return {entry["key"]: entry["value"] for entry in entries}
+
+    async def set(self, key: str, value: Any, ttl: float) -> None:
+        try:
+            await CacheEntry.get_pymongo_collection().update_one(
+                {"key": key},
+                {"$set": {"value": value, "expires_at": self._expires_at(ttl)}},
+                upsert=True,
+            )
+        except DuplicateKeyError:
+            # Another worker inserted the same key at the same time, its value is as good as ours
+            pass
+
+    async def delete(self, key: str) -> None:
+        await CacheEntry.get_pymongo_collection().delete_one({"key": key})
+
+    async def incr(self, key: str, ttl: float) -> int:
+        entry = await CacheEntry.get_pymongo_collection().find_one_and_update(
+            {"key": key},
+            {"$inc": {"value": 1}, "$set": {"expires_at": self._expires_at(ttl)}},
+            projection={"_id": 0, "value": 1},
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+        )
+        return entry["value"]
+
+    # Helper function to get the expiry date of an entry stored now
+    @staticmethod
+    def _expires_at(ttl: float) -> datetime:
+        return datetime.now(timezone.utc) + timedelta(seconds=ttl)
+
+
+# Backend instances by name, created on first use
+_backends: dict[str, CacheBackend] = {}
+
+
+# Get the cache backend with the given name ("memory" or "mongo")
+def get_cache_backend(name: str) -> CacheBackend:
+    if name not in _backends:
+        if name == "memory":
+            _backends[name] = MemoryCacheBackend()
+        elif name == "mongo":
+            _backends[name] = MongoCacheBackend()
+        else:
+            raise ValueError(f"Unknown cache backend: {name}")
+    return _backends[name]
+
+
+# VersionedCache stores derived values in groups (usually one per user). Invalidating a group bumps its
+# version instead of deleting keys, so every key of the group is dropped at once, on every worker.
+class VersionedCache:
+
+    def __init__(self, namespace: str, ttl: float, backend: str):
+        self.namespace = namespace
+        self.ttl = ttl
+        self.backend_name = backend
+
+    @property
+    def backend(self) -> CacheBackend:
+        return get_cache_backend(self.backend_name)
+
+    # Get a cached value and the current version of its group, pass the version back to `set`
+    async def get(self, group: str, key: str = "") -> tuple[Any | None, int]:
+        version_key, entry_key = self._version_key(group), self._entry_key(group, key)
+        # Version and entry are read in a single round-trip
+        values = await self.backend.get_many([version_key, entry_key])
+        version = values.get(version_key, 0)
+        entry = values.get(entry_key)
+        if entry is not None and entry["version"] == version:
+            CACHE_REQUESTS.labels(self.namespace, "hit").inc()
+            return entry["value"], version
+        CACHE_REQUESTS.labels(self.namespace, "miss").inc()
+        return None, version
+
+    # Store a value computed after `get` returned `version`. If the group was invalidated in between,
+    # the value is stored under the old version and never served.
+    async def set(self, group: str, key: str, value: Any, version: int) -> None:
+        await self.backend.set(self._entry_key(group, key), {"version": version, "value": value}, self.ttl)
+
+    # Drop every key of a group, call after every write to the data it is derived from
+    async def invalidate(self, group: str) -> None:
+        await self.backend.incr(self._version_key(group), VERSION_TTL_SECONDS)
+
+    # Helper function to build the key of the version counter of a group
+    def _version_key(self, group: str) -> str:
+        return f"{self.namespace}:{group}:version"
+
+    # Helper function to build the key of an entry
+    def _entry_key(self, group: str, key: str) -> str:
+        return f"{self.namespace}:{group}:{key}"
@@ -0,0 +1,163 @@
+import asyncio
+import time
+from abc import ABC, abstractmethod
+from datetime import datetime
+from pymongo.errors import OperationFailure
+
+# Import settings
+from app.config.settings import settings
+# Import checkpoint model, where each consumer partition resumes after a restart
+from app.models.consumer_checkpoint import ConsumerCheckpoint
+# Import meter reading model, consumers follow its inserts
+from app.models.meter_reading import MeterReading
+# Import consumer metrics
+from app.utils.metrics_utils import CONSUMER_EVENTS, CONSUMER_HANDLE_DURATION, CONSUMER_LAG
+
+# Change stream errors after which the resume token cannot be used anymore (oplog rolled over)
+HISTORY_LOST_ERROR_CODES = {136, 280, 286}
+
+# Hex digits of an ObjectId, used to compute partitions inside the change stream pipeline
+_HEX_DIGITS = "0123456789abcdef"
+# Number of trailing hex digits of the user id used as partition key (its counter bytes, well distributed)
+_PARTITION_KEY_DIGITS = 4
+
+
+# Partition of a user: readings of a user always go to the same partition, so they are handled in order
+def partition_of(user_id: str, partitions: int = settings.CONSUMER_PARTITIONS) -> int:
+    return int(str(user_id)[-_PARTITION_KEY_DIGITS:], 16) % partitions
+
+
+# Change stream pipeline of a partition: inserted readings whose user falls in it, filtered by MongoDB
+def partition_pipeline(partition: int, partitions: int = settings.CONSUMER_PARTITIONS) -> list[dict]:
+    user_id = {"$toString": "$fullDocument.user_id"}
+    key = 0
+    for position in range(24 - _PARTITION_KEY_DIGITS, 24):
+        digit = {"$indexOfBytes": [_HEX_DIGITS, {"$substrBytes": [user_id, position, 1]}]}
+        key = {"$add": [{"$multiply": [key, 16]}, digit]}
+    return [
+        {"$match": {"operationType": "insert"}},
+        {"$match": {"$expr": {"$eq": [{"$mod": [key, partitions]}, partition]}}},
+    ]
+
+
+# ChangeConsumer is a unit of post-ingest work, run on every inserted meter reading.
+# Delivery is at-least-once (a reading is handled again after a crash before its checkpoint),
+# so `handle` must be idempotent.
+class ChangeConsumer(ABC):
+
+    name: str
+
+    # Handle an inserted meter reading (raw document)
+    @abstractmethod
+    async def handle(self, reading: dict) -> None:
+        ...
+
+
+# ConsumerRunner runs consumers on the partitions owned by this process. Every (consumer, partition) pair
+# follows its own change stream and checkpoint, so a slow consumer does not hold the others back and
+# partitions can move between processes: the new owner resumes from the stored resume token.
+class ConsumerRunner:
+
+    def __init__(
+        self,
+        consumers: list[ChangeConsumer],
+        partitions: int = settings.CONSUMER_PARTITIONS,
+        owned_partitions: list[int] | None = settings.CONSUMER_OWNED_PARTITIONS,
+    ):
+        self.consumers = consumers
+        self.partitions = partitions
+        self.owned_partitions = list(range(partitions)) if owned_partitions is None else owned_partitions
+        for partition in self.owned_partitions:
+            if not 0 <= partition < partitions:
+                raise ValueError(f"Partition {partition} out of range (0 to {partitions - 1})")
+
+    # Run every consumer on every owned partition until cancelled
+    async def run(self) -> None:
+        await asyncio.gather(*[
+            self._run_partition(consumer, partition)
+            for consumer in self.consumers
+            for partition in self.owned_partitions
+        ])
+
+    # Helper function to follow the change stream of a partition, reconnecting on errors
+    async def _run_partition(self, consumer: ChangeConsumer, partition: int) -> None:
+        while True:
+            try:
+                await self._consume(consumer, partition)
+            except asyncio.CancelledError:
+                raise
+            except OperationFailure as e:
+                if e.code in HISTORY_LOST_ERROR_CODES:
+                    # Changes since the checkpoint are gone, start again from now
+                    print(f"Change history lost for consumer {consumer.name} partition {partition}, resuming from now")
+                    await ConsumerCheckpoint.get_pymongo_collection().delete_one(
+                        {"consumer": consumer.name, "partition": partition}
+                    )
+                else:
+                    print(f"Error in consumer {consumer.name} partition {partition}: {e}")
+                    await asyncio.sleep(settings.CONSUMER_RETRY_SECONDS)
+            except Exception as e:
+                print(f"Error in consumer {consumer.name} partition {partition}: {e}")
+                await asyncio.sleep(settings.CONSUMER_RETRY_SECONDS)
+
+    # Helper function to handle the changes of a partition, checkpointing every few changes or seconds
+    async def _consume(self, consumer: ChangeConsumer, partition: int) -> None:
+        lag = CONSUMER_LAG.labels(consumer.name, str(partition))
+        checkpoint = await ConsumerCheckpoint.get_pymongo_collection().find_one(
+            {"consumer": consumer.name, "partition": partition}
+        )
+        # Without a checkpoint, the consumer starts with the changes made from now on
+        resume_token = checkpoint["resume_token"] if checkpoint else None
+
+        stream = await MeterReading.get_pymongo_collection().watch(
+            partition_pipeline(partition, self.partitions), resume_after=resume_token
+        )
+        async with stream:
+            pending = 0
+            last_checkpoint = time.monotonic()
+            while stream.alive:
+                change = await stream.try_next()
+                if change is None:
+                    lag.set(0)
+                else:
+                    lag.set(max(0, time.time() - change["clusterTime"].time))
+                    await self._handle(consumer, change["fullDocument"])
+                    resume_token = change["_id"]
+                    pending += 1
+
+                if pending and (
+                    pending >= settings.CONSUMER_CHECKPOINT_EVERY
+                    or time.monotonic() - last_checkpoint >= settings.CONSUMER_CHECKPOINT_SECONDS
+                ):
+                    await self._save_checkpoint(consumer, partition, resume_token)
+                    pending = 0
+                    last_checkpoint = time.monotonic()
+
+    # Helper function to handle a reading, retried a few times before it is given up
+    async def _handle(self, consumer: ChangeConsumer, reading: dict) -> None:
+        for attempt in range(1, settings.CONSUMER_MAX_ATTEMPTS + 1):
+            start = time.perf_counter()
+            try:
+                await consumer.handle(reading)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                if attempt == settings.CONSUMER_MAX_ATTEMPTS:
+                    # Do not block the partition forever on a reading that cannot be handled
+                    print(f"Consumer {consumer.name} gave up on reading {reading['_id']}: {e}")
+                    CONSUMER_EVENTS.labels(consumer.name, "failed").inc()
+                    return
+                CONSUMER_EVENTS.labels(consumer.name, "retried").inc()
+                await asyncio.sleep(settings.CONSUMER_RETRY_SECONDS)
+            else:
+                CONSUMER_HANDLE_DURATION.labels(consumer.name).observe(time.perf_counter() - start)
+                CONSUMER_EVENTS.labels(consumer.name, "processed").inc()
+                return
+
+    # Helper function to store the resume token of a partition
+    async def _save_checkpoint(self, consumer: ChangeConsumer, partition: int, resume_token: dict) -> None:
+        await ConsumerCheckpoint.get_pymongo_collection().update_one(
+            {"consumer": consumer.name, "partition": partition},
+            {"$set": {"resume_token": resume_token, "updated_at": datetime.now()}},
+            upsert=True,
+        )
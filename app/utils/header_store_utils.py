@@ -0,0 +1,125 @@
+from bsv import ChainTracker
+from pymongo import UpdateOne
+
+from app.config.settings import settings
+from app.models.block_header import BlockHeader
+
+# Import WhatsOnChain utilities for BSV operations
+from app.utils.whatsonchain_utils import WhatsOnChainUtils
+# Import single-flight, proofs verified concurrently load a missing header once
+from app.utils.single_flight_utils import SingleFlight
+
+# Blocks below the tip reloaded on every load, headers in that range can change with a reorg
+RELOAD_DEPTH = 10
+
+
+# HeaderStore keeps block merkle roots in memory (persisted in Mongo) and verifies
+# merkle proofs locally, without calling any chain API on the request path
+class HeaderStore(ChainTracker):
+
+    def __init__(self):
+        # Merkle root of each known block, by height
+        self._merkle_roots: dict[int, str] = {}
+        self._tip_height = 0
+        # Headers being loaded from MongoDB, by height
+        self._header_flight = SingleFlight("block_header")
+        # Heights of older headers proofs asked for on this worker, fetched in the background
+        self._requested_heights: set[int] = set()
+
+    # Check a merkle root against the stored header at that height. A header missing from memory is read
+    # from MongoDB (stored by another worker), never from the chain API: unknown headers fail the proof and
+    # are fetched in the background, so the payment can be retried
+    async def is_valid_root_for_height(self, root: str, height: int) -> bool:
+        merkle_root = self._merkle_roots.get(height)
+        if merkle_root is None and 0 <= height <= self._tip_height:
+            merkle_root = await self._header_flight.do(height, lambda: self._load_header(height))
+            if merkle_root is None and len(self._requested_heights) < settings.SPV_SYNC_MAX_HEADERS:
+                self._requested_heights.add(height)
+        return merkle_root == root
+
+    # Get the height of the latest stored header
+    async def current_height(self) -> int:
+        return self._tip_height
+
+    # Load the stored headers into memory: all of them the first time, then the ones stored since (by any
+    # worker), from a few blocks below the tip to follow shallow reorgs
+    async def load(self) -> None:
+        from_height = max(self._tip_height - RELOAD_DEPTH, 0) if self._tip_height else 0
+        headers = await BlockHeader.get_pymongo_collection().find(
+            {"height": {"$gte": from_height}}, {"_id": 0, "height": 1, "merkle_root": 1}
+        ).to_list()
+        for header in headers:
+            self._remember(header["height"], header["merkle_root"])
+
+    # Fetch headers added since the last sync and store them
+    async def sync(self) -> int:
+        latest = await WhatsOnChainUtils.get_latest_block_headers()
+        if not latest:
+            return 0
+
+        # Latest headers always overwrite stored ones, this also follows shallow reorgs
+        headers = {header["height"]: header for header in latest}
+        oldest_latest = min(headers)
+
+        # Fill the gap between the last stored header and the latest ones, a bounded number per sync
+        first_missing = self._tip_height + 1 if self._tip_height else settings.SPV_START_HEIGHT
+        if first_missing is not None and first_missing < oldest_latest:
+            last_missing = min(oldest_latest - 1, first_missing + settings.SPV_SYNC_MAX_HEADERS - 1)
+            for height in range(first_missing, last_missing + 1):
+                headers[height] = await WhatsOnChainUtils.get_block_header(height)
+
+        operations = []
+        for height, header in headers.items():
+            if self._merkle_roots.get(height) == header["merkleroot"]:
+                continue
+            operations.append(UpdateOne(
+                {"height": height},
+                {"$set": {
+                    "hash": header["hash"],
+                    "merkle_root": header["merkleroot"],
+                    "previous_hash": header.get("previousblockhash"),
+                    "time": header.get("time", 0),
+                }},
+                upsert=True,
+            ))
+            self._remember(height, header["merkleroot"])
+
+        if operations:
+            await BlockHeader.get_pymongo_collection().bulk_write(operations, ordered=False)
+        return len(operations)
+
+    # Fetch and store the older headers proofs asked for on this worker
+    async def fetch_requested(self) -> int:
+        heights = sorted(self._requested_heights)
+        for height in heights:
+            header = await WhatsOnChainUtils.get_block_header(height)
+            await BlockHeader.get_pymongo_collection().update_one(
+                {"height": height},
+                {"$set": {
+                    "hash": header["hash"],
+                    "merkle_root": header["merkleroot"],
+                    "previous_hash": header.get("previousblockhash"),
+                    "time": header.get("time", 0),
+                }},
+                upsert=True,
+            )
+            self._remember(height, header["merkleroot"])
+            self._requested_heights.discard(height)
+        return len(heights)
+
+    # Helper function to get a header missing from memory from MongoDB (None when not stored)
+    async def _load_header(self, height: int) -> str | None:
+        stored = await BlockHeader.get_pymongo_collection().find_one({"height": height}, {"_id": 0, "merkle_root": 1})
+        if stored is None:
+            return None
+        self._remember(height, stored["merkle_root"])
+        return stored["merkle_root"]
+
+    # Keep a merkle root in memory and advance the tip
+    def _remember(self, height: int, merkle_root: str) -> None:
+        self._merkle_roots[height] = merkle_root
+        self._tip_height = max(self._tip_height, height)
+
+
+# Shared header store instance for the application
+header_store = HeaderStore()
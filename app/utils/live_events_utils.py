@@ -0,0 +1,183 @@
+import asyncio
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import Iterator
+from bson import ObjectId
+from pydantic import BaseModel
+
+# Import settings
+from app.config.settings import settings
+# Import models whose changes are pushed to dashboards
+from app.models.alarm_history import AlarmHistory
+from app.models.meter_reading import MeterReading
+from app.models.payment import Payment, PaymentStatus
+# Import live event payloads and chart steps
+from app.dtos.meter.meter_request import StepEnum
+from app.dtos.meter.meter_response import AlarmTriggeredEvent, ChartItem, PaymentConfirmedEvent
+# Import live event metrics
+from app.utils.metrics_utils import LIVE_EVENTS_DROPPED, LIVE_EVENTS_PUBLISHED, LIVE_SUBSCRIBERS
+
+# Changes pushed to dashboards: new readings, triggered alarms and confirmed payments
+CHANGE_STREAM_PIPELINE = [
+    {"$match": {"$or": [
+        {"operationType": "insert", "ns.coll": {"$in": [MeterReading.Settings.name, AlarmHistory.Settings.name]}},
+        {
+            "operationType": "update",
+            "ns.coll": Payment.Settings.name,
+            "updateDescription.updatedFields.status": PaymentStatus.CONFIRMED.value,
+        },
+    ]}},
+]
+
+
+# LiveEventHub fans out the events of each user to the dashboards subscribed on this worker.
+# Without change streams, readings and alarms are published by the worker that produced them, and every worker
+# polls the payments confirmed by the reconciliation job (which only runs on the scheduler leader).
+# With change streams, every worker gets every event from MongoDB, whichever worker produced it.
+class LiveEventHub:
+
+    def __init__(self, queue_size: int = settings.LIVE_EVENTS_QUEUE_SIZE):
+        self.queue_size = queue_size
+        # Queues of the subscribed dashboards, by user id, and the chart step of each queue
+        self._subscribers: dict[str, set[asyncio.Queue]] = {}
+        self._steps: dict[asyncio.Queue, StepEnum] = {}
+        # Confirmation time of the last payments polled, and the ids already delivered at that time
+        self._payments_since: datetime | None = None
+        self._payments_delivered: set = set()
+
+    # Subscribe to the events of a user for the duration of the block, readings as deltas of the chart points
+    # of a step
+    @contextmanager
+    def subscribe(self, user_id: str, step: StepEnum = StepEnum.DAILY) -> Iterator[asyncio.Queue]:
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        self._subscribers.setdefault(user_id, set()).add(queue)
+        self._steps[queue] = step
+        LIVE_SUBSCRIBERS.inc()
+        try:
+            yield queue
+        finally:
+            LIVE_SUBSCRIBERS.dec()
+            self._steps.pop(queue, None)
+            queues = self._subscribers.get(user_id)
+            if queues is not None:
+                queues.discard(queue)
+                if not queues:
+                    del self._subscribers[user_id]
+
+    # Publish an event produced by this worker
+    def publish(self, user_id: str, event: str, data: BaseModel) -> None:
+        # With change streams the event comes back from MongoDB, to this worker too
+        if settings.LIVE_EVENTS_CHANGE_STREAM:
+            return
+        self._deliver(user_id, event, data)
+
+    # Publish a reading produced by this worker
+    def publish_reading(self, user_id: str, timestamp: datetime, kw: float, price: float) -> None:
+        if settings.LIVE_EVENTS_CHANGE_STREAM:
+            return
+        self._deliver_reading(user_id, timestamp, kw, price)
+
+    # Deliver the payments confirmed since the last poll to the dashboards subscribed on this worker
+    async def poll_payments(self) -> None:
+        user_ids = [ObjectId(user_id) for user_id in self._subscribers if ObjectId.is_valid(user_id)]
+        if not user_ids:
+            # Dashboards opened later start from their first poll, not from older confirmations
+            self._payments_since = None
+            return
+        if self._payments_since is None:
+            self._payments_since = datetime.now() - timedelta(seconds=settings.LIVE_EVENTS_POLL_SECONDS)
+
+        # Payments of a reconciliation batch share their confirmation time, the last one is polled again
+        payments = await Payment.get_pymongo_collection().find({
+            "user_id": {"$in": user_ids},
+            "status": PaymentStatus.CONFIRMED.value,
+            "confirmed_at": {"$gte": self._payments_since},
+        }).sort("confirmed_at", 1).to_list()
+        for payment in payments:
+            if payment["_id"] in self._payments_delivered:
+                continue
+            if payment["confirmed_at"] > self._payments_since:
+                self._payments_since = payment["confirmed_at"]
+                self._payments_delivered = set()
+            self._payments_delivered.add(payment["_id"])
+            self._deliver_change({"ns": {"coll": Payment.Settings.name}, "fullDocument": payment})
+
+    # Deliver the changes of every worker from a MongoDB change stream, until cancelled
+    async def watch_changes(self) -> None:
+        database = MeterReading.get_pymongo_collection().database
+        while True:
+            try:
+                async with await database.watch(CHANGE_STREAM_PIPELINE, full_document="updateLookup") as stream:
+                    async for change in stream:
+                        self._deliver_change(change)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # Dashboards only show live changes, events missed while reconnecting are not replayed
+                print(f"Error watching live events: {e}")
+                await asyncio.sleep(settings.LIVE_EVENTS_RETRY_SECONDS)
+
+    # Helper function to convert a change into an event and deliver it
+    def _deliver_change(self, change: dict) -> None:
+        document = change.get("fullDocument")
+        if document is None:
+            return
+        user_id = str(document["user_id"])
+        # Most changes concern users without an open dashboard on this worker
+        if user_id not in self._subscribers:
+            return
+
+        collection = change["ns"]["coll"]
+        if collection == MeterReading.Settings.name:
+            self._deliver_reading(user_id, document["timestamp"], document["kw_consumed"], document.get("cost_euro") or 0.0)
+        elif collection == AlarmHistory.Settings.name:
+            self._deliver(user_id, "alarm", AlarmTriggeredEvent(
+                alarm_id=str(document["alarm_id"]),
+                value=document["value"],
+                triggered_at=document["triggered_at"],
+            ))
+        elif collection == Payment.Settings.name:
+            self._deliver(user_id, "payment", PaymentConfirmedEvent(
+                payment_id=str(document["_id"]),
+                tx_id=document["tx_id"],
+                block_height=document.get("block_height"),
+                confirmed_at=document.get("confirmed_at"),
+            ))
+
+    # Helper function to put an event in the queue of every subscriber of a user
+    def _deliver(self, user_id: str, event: str, data: BaseModel) -> None:
+        LIVE_EVENTS_PUBLISHED.labels(event).inc()
+        for queue in self._subscribers.get(user_id, ()):
+            LiveEventHub._put(queue, event, data)
+
+    # Helper function to deliver a reading as the ChartItem it adds to the chart point of each subscriber's step
+    def _deliver_reading(self, user_id: str, timestamp: datetime, kw: float, price: float) -> None:
+        LIVE_EVENTS_PUBLISHED.labels("reading").inc()
+        for queue in self._subscribers.get(user_id, ()):
+            point = LiveEventHub.chart_point(timestamp, self._steps.get(queue, StepEnum.DAILY))
+            LiveEventHub._put(queue, "reading", ChartItem(timestamp=point, kw=kw, price=price))
+
+    # Get the timestamp of the chart point of a time for a step, as the chart aggregation computes it
+    # (weekly points: Sunday-based week of the year, placed on the Monday of that ISO week number)
+    @staticmethod
+    def chart_point(timestamp: datetime, step: StepEnum) -> datetime:
+        if step == StepEnum.HOURLY:
+            return timestamp.replace(minute=0, second=0, microsecond=0)
+        if step == StepEnum.WEEKLY:
+            week = int(timestamp.strftime("%U"))
+            return datetime.fromisocalendar(timestamp.year, 1, 1) + timedelta(weeks=week - 1)
+        if step == StepEnum.MONTHLY:
+            return datetime(timestamp.year, timestamp.month, 1)
+        return datetime(timestamp.year, timestamp.month, timestamp.day)
+
+    # Helper function to put an event in a queue, a slow dashboard loses its oldest events instead of growing it
+    @staticmethod
+    def _put(queue: asyncio.Queue, event: str, data: BaseModel) -> None:
+        if queue.full():
+            queue.get_nowait()
+            LIVE_EVENTS_DROPPED.inc()
+        queue.put_nowait((event, data))
+
+
+# Shared live event hub instance for the application
+live_events = LiveEventHub()
@@ -0,0 +1,243 @@
+import time
+from fastapi import Request
+from opentelemetry.trace import SpanKind, Status, StatusCode
+from prometheus_client import Counter, Gauge, Histogram
+from pymongo import monitoring
+from starlette.routing import Match
+
+# Import tracer, MongoDB commands are traced as child spans of the current request
+from app.utils.tracing_utils import tracer
+# Import per-request query counter
+from app.utils.query_counter_utils import record_mongo_command
+
+# HTTP routes
+HTTP_REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds",
+    "Duration of HTTP requests by route",
+    ["method", "route", "status"],
+)
+HTTP_REQUESTS_IN_FLIGHT = Gauge(
+    "http_requests_in_flight",
+    "HTTP requests currently being served by route",
+    ["method", "route"],
+)
+ADMISSION_REJECTIONS = Counter(
+    "http_admission_rejections_total",
+    "Requests shed with a 503 by route and reason",
+    ["route", "reason"],
+)
+CANCELLED_REQUESTS = Counter(
+    "http_cancelled_requests_total",
+    "Requests whose work was cancelled because the client disconnected, by route",
+    ["route"],
+)
+
+# MongoDB commands
+MONGO_COMMAND_DURATION = Histogram(
+    "mongo_command_duration_seconds",
+    "Duration of MongoDB commands by operation and collection",
+    ["command", "collection"],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0),
+)
+MONGO_COMMAND_FAILURES = Counter(
+    "mongo_command_failures_total",
+    "Failed MongoDB commands by operation and collection",
+    ["command", "collection"],
+)
+
+# Chain and price APIs
+CHAIN_REQUEST_DURATION = Histogram(
+    "chain_request_duration_seconds",
+    "Duration of WhatsOnChain and CoinGecko requests by endpoint",
+    ["endpoint"],
+)
+CHAIN_REQUEST_ERRORS = Counter(
+    "chain_request_errors_total",
+    "Failed WhatsOnChain and CoinGecko requests by endpoint and reason",
+    ["endpoint", "reason"],
+)
+CHAIN_REQUEST_RETRIES = Counter(
+    "chain_request_retries_total",
+    "Retried WhatsOnChain requests by endpoint and reason",
+    ["endpoint", "reason"],
+)
+CHAIN_REQUEST_REJECTIONS = Counter(
+    "chain_request_rejections_total",
+    "WhatsOnChain requests rejected before being sent by endpoint and reason (circuit_open or queue_full)",
+    ["endpoint", "reason"],
+)
+CHAIN_QUEUE_DEPTH = Gauge(
+    "chain_rate_limit_queue_depth",
+    "Requests waiting for the client-side rate limiter by API and priority",
+    ["api", "priority"],
+)
+CHAIN_CIRCUIT_STATE = Gauge(
+    "chain_circuit_breaker_state",
+    "Circuit breaker state by API (1 for the current state)",
+    ["api", "state"],
+)
+PRICE_CACHE_REQUESTS = Counter(
+    "price_cache_requests_total",
+    "BSV price cache lookups by result (hit or miss)",
+    ["result"],
+)
+
+# Caches
+CACHE_REQUESTS = Counter(
+    "cache_requests_total",
+    "Cache lookups by cache and result (hit or miss)",
+    ["cache", "result"],
+)
+SINGLE_FLIGHT_CALLS = Counter(
+    "single_flight_calls_total",
+    "Coalesced calls by operation and role (leader runs the call, shared joins it)",
+    ["operation", "role"],
+)
+
+# Meter ingest over WebSocket
+INGEST_WS_CONNECTIONS = Gauge(
+    "ingest_ws_connections",
+    "Meters connected to the WebSocket ingest channel on this worker",
+)
+INGEST_WS_READINGS = Counter(
+    "ingest_ws_readings_total",
+    "Readings received over WebSocket by result (accepted, rejected or failed)",
+    ["result"],
+)
+
+# Change stream consumers
+CONSUMER_EVENTS = Counter(
+    "consumer_events_total",
+    "Changes handled by consumer and result (processed, retried or failed)",
+    ["consumer", "result"],
+)
+CONSUMER_HANDLE_DURATION = Histogram(
+    "consumer_handle_duration_seconds",
+    "Duration of handling a change by consumer",
+    ["consumer"],
+)
+CONSUMER_LAG = Gauge(
+    "consumer_lag_seconds",
+    "Time between a change and its handling by consumer and partition (0 when idle)",
+    ["consumer", "partition"],
+)
+
+# Scheduled jobs
+SCHEDULER_LEADER = Gauge(
+    "scheduler_leader",
+    "1 while this worker holds the scheduler lease and runs the fleet-wide jobs",
+)
+SCHEDULER_JOB_DURATION = Histogram(
+    "scheduler_job_duration_seconds",
+    "Duration of scheduled job runs by job and result (success, error, timeout or cancelled)",
+    ["job", "result"],
+)
+SCHEDULER_JOB_LAST_SUCCESS = Gauge(
+    "scheduler_job_last_success_timestamp_seconds",
+    "Time of the last successful run of a job on this worker",
+    ["job"],
+)
+
+# Retention
+RETENTION_READINGS = Counter(
+    "retention_readings_total",
+    "Raw meter readings archived or deleted by retention",
+    ["action"],
+)
+RETENTION_COMPACTED_BEFORE = Gauge(
+    "retention_compacted_before_timestamp_seconds",
+    "Time before which meter readings are compacted into rollups",
+)
+
+# Live events
+LIVE_SUBSCRIBERS = Gauge(
+    "live_event_subscribers",
+    "Dashboards subscribed to live events on this worker",
+)
+LIVE_EVENTS_PUBLISHED = Counter(
+    "live_events_published_total",
+    "Live events delivered to this worker by type",
+    ["event"],
+)
+LIVE_EVENTS_DROPPED = Counter(
+    "live_events_dropped_total",
+    "Live events dropped because a dashboard did not keep up",
+)
+
+# Payments
+PAYMENT_SIGN_DURATION = Histogram(
+    "payment_sign_duration_seconds",
+    "Duration of payment transaction signing",
+)
+PAYMENT_BROADCAST_DURATION = Histogram(
+    "payment_broadcast_duration_seconds",
+    "Duration of payment transaction broadcast, including batching delay",
+)
+
+
+# MongoCommandListener records the duration of every MongoDB command and traces it as a span
+class MongoCommandListener(monitoring.CommandListener):
+
+    def __init__(self):
+        # Collection and span of each running command, by request id
+        self._commands: dict[int, tuple] = {}
+
+    def started(self, event: monitoring.CommandStartedEvent) -> None:
+        collection = event.command.get(event.command_name)
+        collection = collection if isinstance(collection, str) else ""
+        span = tracer.start_span(
+            f"mongo {event.command_name} {collection}".rstrip(),
+            kind=SpanKind.CLIENT,
+            attributes={"db.system": "mongodb", "db.operation.name": event.command_name, "db.collection.name": collection},
+        )
+        self._commands[event.request_id] = (collection, span)
+        record_mongo_command(event.command_name, collection, event.command)
+
+    def succeeded(self, event: monitoring.CommandSucceededEvent) -> None:
+        collection, span = self._commands.pop(event.request_id, ("", None))
+        MONGO_COMMAND_DURATION.labels(event.command_name, collection).observe(event.duration_micros / 1e6)
+        if span is not None:
+            span.end()
+
+    def failed(self, event: monitoring.CommandFailedEvent) -> None:
+        collection, span = self._commands.pop(event.request_id, ("", None))
+        MONGO_COMMAND_DURATION.labels(event.command_name, collection).observe(event.duration_micros / 1e6)
+        MONGO_COMMAND_FAILURES.labels(event.command_name, collection).inc()
+        if span is not None:
+            span.set_status(Status(StatusCode.ERROR, str(event.failure.get("errmsg", ""))))
+            span.end()
+
+
+# Middleware recording latency and in-flight requests by route template
+async def metrics_middleware(request: Request, call_next):
+    method = request.method
+    route = _route_template(request)
+    in_flight = HTTP_REQUESTS_IN_FLIGHT.labels(method, route)
+    in_flight.inc()
+    start = time.perf_counter()
+    status = "500"
+    try:
+        response = await call_next(request)
+        status = str(response.status_code)
+        return response
+    finally:
+        HTTP_REQUEST_DURATION.labels(method, route, status).observe(time.perf_counter() - start)
+        in_flight.dec()
+
+
+# Helper function to get the route template of a request, so label values stay bounded
+def _route_template(request: Request) -> str:
+    return _match_route(request.app.router.routes, request.scope) or "unmatched"
+
+
+# Helper function to find the path of the route matching a request, looking inside included routers
+def _match_route(routes, scope) -> str | None:
+    for route in routes:
+        match, _ = route.matches(scope)
+        if match != Match.FULL:
+            continue
+        included = getattr(route, "original_router", None)
+        if included is not None:
+            return _match_route(included.routes, scope)
+        return getattr(route, "path", None)
+    return None
@@ -0,0 +1,88 @@
+import asyncio
+import hmac
+import os
+import re
+from datetime import datetime
+from typing import TYPE_CHECKING
+from fastapi import Request
+from fastapi.responses import JSONResponse
+
+# Import settings
+from app.config.settings import settings
+
+if TYPE_CHECKING:
+    from pyinstrument import Profiler
+
+# Supported output formats: pyinstrument renderer and file extension
+PROFILE_FORMATS = {
+    "html": ("HTMLRenderer", "html"),
+    "speedscope": ("SpeedscopeRenderer", "speedscope.json"),
+    "pstats": ("PstatsRenderer", "pstats"),
+}
+
+# Caps how many requests are profiled at the same time
+_profiling_slots = asyncio.Semaphore(settings.PROFILING_MAX_CONCURRENT)
+
+
+# Middleware profiling a single request when it carries the profiling token
+async def profiling_middleware(request: Request, call_next):
+    """
+    Opt-in profiling: send `X-Profile: <token>` (or `?profile=<token>`) to run a sampling
+    profiler for that request only. The profile is stored in PROFILING_OUTPUT_DIR and its
+    file name returned in the `X-Profile-File` header. `X-Profile-Format` (or `?profile_format=`)
+    selects html (default), speedscope (flame graph) or pstats.
+    """
+    token = request.headers.get("x-profile") or request.query_params.get("profile")
+    # Fast path: no profiling requested (the middleware is only installed with a profiling token)
+    if token is None or not settings.PROFILING_TOKEN:
+        return await call_next(request)
+
+    if not hmac.compare_digest(token.encode(), settings.PROFILING_TOKEN.encode()):
+        return JSONResponse({"detail": "Invalid profiling token"}, status_code=403)
+
+    profile_format = request.headers.get("x-profile-format") or request.query_params.get("profile_format") or "html"
+    if profile_format not in PROFILE_FORMATS:
+        return JSONResponse({"detail": f"Unknown profile format: {profile_format}"}, status_code=400)
+
+    # Serve the request without profiling when every slot is taken
+    if _profiling_slots.locked():
+        response = await call_next(request)
+        response.headers["X-Profile-Status"] = "busy"
+        return response
+
+    # Imported lazily, only profiled requests need the profiler
+    from pyinstrument import Profiler
+
+    async with _profiling_slots:
+        # Async mode only samples the context of this request, not concurrent ones
+        profiler = Profiler(interval=settings.PROFILING_INTERVAL_SECONDS, async_mode="enabled")
+        profiler.start()
+        try:
+            response = await call_next(request)
+        finally:
+            profiler.stop()
+        try:
+            response.headers["X-Profile-File"] = await asyncio.to_thread(_write_profile, profiler, request, profile_format)
+        except Exception as e:
+            # A failing profile must not fail the request itself
+            print(f"Error writing profile: {e}")
+            response.headers["X-Profile-Status"] = "failed"
+
+    return response
+
+
+# Helper function to render a profile and store it, returns the file name
+def _write_profile(profiler: "Profiler", request: Request, profile_format: str) -> str:
+    from pyinstrument import renderers
+
+    renderer_name, extension = PROFILE_FORMATS[profile_format]
+    renderer = getattr(renderers, renderer_name)
+    path = re.sub(r"[^A-Za-z0-9]+", "_", request.url.path).strip("_") or "root"
+    file_name = f"{datetime.now():%Y%m%dT%H%M%S%f}_{request.method}_{path}.{extension}"
+
+    os.makedirs(settings.PROFILING_OUTPUT_DIR, exist_ok=True)
+    # The pstats renderer returns binary data escaped in a str
+    output = profiler.output(renderer()).encode("utf-8", errors="surrogateescape")
+    with open(os.path.join(settings.PROFILING_OUTPUT_DIR, file_name), "wb") as f:
+        f.write(output)
+    return file_name
@@ -0,0 +1,130 @@
+import json
+import logging
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Iterator
+from fastapi import Request
+
+# Import settings
+from app.config.settings import settings
+
+# Logger of query shapes repeated within a request
+logger = logging.getLogger(__name__)
+
+
+# QueryCounter counts the MongoDB round-trips and external HTTP calls made while it is active
+class QueryCounter:
+
+    def __init__(self):
+        self.mongo = 0
+        self.http = 0
+        # Number of times each MongoDB query shape and HTTP endpoint was used
+        self.mongo_shapes: Counter[str] = Counter()
+        self.http_endpoints: Counter[str] = Counter()
+
+    # Query shapes issued at least `threshold` times, usually an N+1 pattern
+    def repeated_shapes(self, threshold: int) -> dict[str, int]:
+        return {shape: count for shape, count in self.mongo_shapes.items() if count >= threshold}
+
+    # Human readable summary, used in budget assertion errors
+    def summary(self) -> str:
+        lines = [f"{self.mongo} MongoDB commands, {self.http} HTTP calls"]
+        lines += [f"  {count}x {shape}" for shape, count in self.mongo_shapes.most_common()]
+        lines += [f"  {count}x HTTP {endpoint}" for endpoint, count in self.http_endpoints.most_common()]
+        return "\n".join(lines)
+
+
+# Active counters (nested blocks, e.g. a test budget around a counted request, all get every record)
+_active_counters: ContextVar[tuple[QueryCounter, ...]] = ContextVar("query_counters", default=())
+
+
+# Count the queries made inside the block (including tasks started from it)
+@contextmanager
+def count_queries() -> Iterator[QueryCounter]:
+    counter = QueryCounter()
+    token = _active_counters.set(_active_counters.get() + (counter,))
+    try:
+        yield counter
+    finally:
+        _active_counters.reset(token)
+
+
+# Record a MongoDB command, called by the MongoDB command listener
+def record_mongo_command(command_name: str, collection: str, command: dict) -> None:
+    counters = _active_counters.get()
+    if not counters:
+        return
+    shape = _command_shape(command_name, collection, command)
+    for counter in counters:
+        counter.mongo += 1
+        counter.mongo_shapes[shape] += 1
+
+
+# Record an external HTTP call (WhatsOnChain, CoinGecko)
+def record_http_call(endpoint: str) -> None:
+    for counter in _active_counters.get():
+        counter.http += 1
+        counter.http_endpoints[endpoint] += 1
+
+
+# Assert the queries made inside the block stay within a budget (for tests)
+@contextmanager
+def assert_query_budget(mongo: int | None = None, http: int | None = None) -> Iterator[QueryCounter]:
+    """
+    Usage in a test:
+
+        with assert_query_budget(mongo=4, http=0):
+            client.post("/meter", json=...)
+    """
+    with count_queries() as counter:
+        yield counter
+    if mongo is not None and counter.mongo > mongo:
+        raise AssertionError(f"MongoDB query budget exceeded ({counter.mongo} > {mongo}):\n{counter.summary()}")
+    if http is not None and counter.http > http:
+        raise AssertionError(f"HTTP call budget exceeded ({counter.http} > {http}):\n{counter.summary()}")
+
+
+# Middleware counting queries per request, exposed as response headers (installed in debug mode only)
+async def query_counter_middleware(request: Request, call_next):
+    with count_queries() as counter:
+        response = await call_next(request)
+
+    response.headers["X-Mongo-Queries"] = str(counter.mongo)
+    response.headers["X-HTTP-Calls"] = str(counter.http)
+
+    # Log query shapes repeated within the request (N+1 candidates)
+    for shape, count in counter.repeated_shapes(settings.QUERY_REPEAT_THRESHOLD).items():
+        logger.warning("Repeated query in %s %s: %dx %s", request.method, request.url.path, count, shape)
+
+    return response
+
+
+# Helper function to build the shape of a command: operation, collection and filter without values
+def _command_shape(command_name: str, collection: str, command: dict) -> str:
+    if "filter" in command:
+        query = command["filter"]
+    elif "pipeline" in command:
+        query = command["pipeline"]
+    elif "updates" in command:
+        query = [update.get("q") for update in command["updates"]]
+    elif "deletes" in command:
+        query = [delete.get("q") for delete in command["deletes"]]
+    else:
+        query = None
+    shape = f"{command_name} {collection}".rstrip()
+    if query is not None:
+        shape += " " + json.dumps(_strip_values(query), sort_keys=True)
+    return shape
+
+
+# Helper function to replace every value of a query with a placeholder, keeping its structure
+def _strip_values(value: Any) -> Any:
+    if isinstance(value, dict):
+        return {key: _strip_values(item) for key, item in value.items()}
+    if isinstance(value, list):
+        # Lists of operators or stages keep their structure, lists of values collapse to one placeholder
+        if value and all(isinstance(item, dict) for item in value):
+            return [_strip_values(item) for item in value]
+        return ["?"]
+    return "?"
@@ -0,0 +1,162 @@
+import asyncio
+import heapq
+import itertools
+import random
+import time
+from enum import IntEnum
+
+# Import rate limiter and circuit breaker metrics
+from app.utils.metrics_utils import CHAIN_CIRCUIT_STATE, CHAIN_QUEUE_DEPTH
+
+
+class Priority(IntEnum):
+    """Request priority, lower values are served first."""
+    HIGH = 0
+    NORMAL = 1
+    LOW = 2
+
+
+class RateLimitQueueFull(Exception):
+    """Raised when too many requests are already waiting for the rate limiter."""
+
+
+class CircuitOpenError(Exception):
+    """Raised when a request is rejected because the circuit breaker is open."""
+
+
+# PriorityRateLimiter is a token bucket: `rate` requests per second on average, up to `burst` at once.
+# Requests over the limit wait in a priority queue instead of being dropped, so bursts are smoothed.
+class PriorityRateLimiter:
+
+    def __init__(self, name: str, rate: float, burst: int, max_queue: int):
+        self.name = name
+        # A rate of 0 or less disables the limit
+        self.rate = rate
+        self.burst = max(burst, 1)
+        self.max_queue = max_queue
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        # Waiting requests: (priority, arrival order, future resolved when a token is granted)
+        self._waiters: list[tuple[int, int, asyncio.Future]] = []
+        self._order = itertools.count()
+        self._wakeup: asyncio.TimerHandle | None = None
+
+    # Wait for a token, requests with a higher priority are served first
+    async def acquire(self, priority: Priority = Priority.NORMAL) -> None:
+        if self.rate <= 0:
+            return
+
+        self._refill()
+        if not self._waiters and self._tokens >= 1:
+            self._tokens -= 1
+            return
+
+        if len(self._waiters) >= self.max_queue:
+            raise RateLimitQueueFull(f"{len(self._waiters)} requests already waiting for {self.name}")
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._order), future))
+        CHAIN_QUEUE_DEPTH.labels(self.name, priority.name.lower()).inc()
+        self._schedule()
+        try:
+            await future
+        except asyncio.CancelledError:
+            # Give back a token granted just before the cancellation
+            if future.done() and not future.cancelled():
+                self._tokens += 1
+                self._schedule()
+            raise
+        finally:
+            CHAIN_QUEUE_DEPTH.labels(self.name, priority.name.lower()).dec()
+
+    # Number of requests waiting for a token
+    @property
+    def queue_depth(self) -> int:
+        return sum(1 for _, _, future in self._waiters if not future.done())
+
+    # Helper function to add the tokens earned since the last refill
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    # Helper function to wake up the queue when the next token is available
+    def _schedule(self) -> None:
+        if self._wakeup is not None or not self._waiters:
+            return
+        delay = max(0.0, (1 - self._tokens) / self.rate)
+        self._wakeup = asyncio.get_running_loop().call_later(delay, self._dispatch)
+
+    # Helper function to grant the available tokens to the waiting requests, by priority
+    def _dispatch(self) -> None:
+        self._wakeup = None
+        self._refill()
+        while self._waiters and self._tokens >= 1:
+            _, _, future = heapq.heappop(self._waiters)
+            # Skip requests cancelled while waiting
+            if future.done():
+                continue
+            self._tokens -= 1
+            future.set_result(None)
+        self._schedule()
+
+
+# CircuitBreaker stops calling a failing API for a while, instead of piling up requests that will time out.
+# After `failure_threshold` consecutive failures it opens for `reset_seconds`, then lets a single trial
+# request through (half-open): a success closes it again, a failure opens it for another period.
+class CircuitBreaker:
+
+    CLOSED = "closed"
+    HALF_OPEN = "half_open"
+    OPEN = "open"
+
+    def __init__(self, name: str, failure_threshold: int, reset_seconds: float):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.state = CircuitBreaker.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_running = False
+        self._set_state(CircuitBreaker.CLOSED)
+
+    # Raise CircuitOpenError when requests are not allowed right now
+    def check(self) -> None:
+        if self.state == CircuitBreaker.OPEN and time.monotonic() - self._opened_at >= self.reset_seconds:
+            self._set_state(CircuitBreaker.HALF_OPEN)
+        if self.state == CircuitBreaker.OPEN or (self.state == CircuitBreaker.HALF_OPEN and self._trial_running):
+            raise CircuitOpenError(f"Circuit breaker for {self.name} is open")
+        if self.state == CircuitBreaker.HALF_OPEN:
+            self._trial_running = True
+
+    # Record a successful request
+    def record_success(self) -> None:
+        self._failures = 0
+        self._trial_running = False
+        if self.state != CircuitBreaker.CLOSED:
+            self._set_state(CircuitBreaker.CLOSED)
+
+    # Record a failed request (server error or unreachable API)
+    def record_failure(self) -> None:
+        self._failures += 1
+        self._trial_running = False
+        if self.state == CircuitBreaker.HALF_OPEN or self._failures >= self.failure_threshold:
+            self._opened_at = time.monotonic()
+            self._set_state(CircuitBreaker.OPEN)
+
+    # Record a request that tells nothing about the health of the API (client error, cancellation)
+    def record_neutral(self) -> None:
+        self._trial_running = False
+
+    # Helper function to change the state and export it
+    def _set_state(self, state: str) -> None:
+        self.state = state
+        for value in (CircuitBreaker.CLOSED, CircuitBreaker.HALF_OPEN, CircuitBreaker.OPEN):
+            CHAIN_CIRCUIT_STATE.labels(self.name, value).set(1 if value == state else 0)
+
+
+# Delay before a retry: exponential backoff with full jitter, or the delay asked by the server
+def backoff_delay(attempt: int, base_delay: float, max_delay: float, retry_after: float | None = None) -> float:
+    if retry_after is not None:
+        return min(retry_after, max_delay)
+    return random.uniform(0, min(max_delay, base_delay * 2 ** attempt))
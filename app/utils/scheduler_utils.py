@@ -0,0 +1,191 @@
+import asyncio
+import os
+import random
+import socket
+import time
+import uuid
+from typing import Awaitable, Callable
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+# Import settings
+from app.config.settings import settings
+# Import lease model used for leader election
+from app.models.scheduler_lease import SchedulerLease
+# Import scheduler metrics
+from app.utils.metrics_utils import SCHEDULER_JOB_DURATION, SCHEDULER_JOB_LAST_SUCCESS, SCHEDULER_LEADER
+
+
+# Job is a periodic task: every `interval_seconds`, or on a cron expression (UTC)
+class Job:
+
+    def __init__(
+        self,
+        name: str,
+        fn: Callable[[], Awaitable[object]],
+        interval_seconds: float | None,
+        cron: str | None,
+        leader_only: bool,
+        jitter_seconds: float,
+        max_runtime_seconds: float,
+    ):
+        self.name = name
+        self.fn = fn
+        self.interval_seconds = interval_seconds
+        self.leader_only = leader_only
+        self.jitter_seconds = jitter_seconds
+        self.max_runtime_seconds = max_runtime_seconds
+        self.cron = None
+        if cron is not None:
+            # Imported here, only needed for cron jobs
+            try:
+                from croniter import croniter
+            except ImportError:
+                raise ValueError(f"Job {name} has a cron schedule, install croniter")
+            if not croniter.is_valid(cron):
+                raise ValueError(f"Invalid cron expression for job {name}: {cron}")
+            self.cron = croniter(cron, time.time())
+
+    # Seconds until the next run, not counting jitter
+    def delay_until_next_run(self, first_run: bool) -> float:
+        if self.cron is not None:
+            return max(0.0, self.cron.get_next(float) - time.time())
+        # Interval jobs run once at startup, as soon as their jitter elapsed
+        return 0.0 if first_run else self.interval_seconds
+
+
+# Scheduler runs periodic jobs in the background of every worker. Leader-only jobs (fleet-wide work such as
+# reconciliation) run on a single worker: the one holding the lease in MongoDB. The leader renews its lease
+# while it is alive, another worker takes over once it expires. Lease times are MongoDB server times ($$NOW),
+# so clock skew between workers does not matter.
+class Scheduler:
+
+    LEASE_NAME = "scheduler"
+
+    def __init__(self, lease_seconds: float = settings.SCHEDULER_LEASE_SECONDS):
+        self.lease_seconds = lease_seconds
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.jobs: list[Job] = []
+        # Leadership is trusted until this (local monotonic) time, a bit before the lease expires in MongoDB
+        self._leader_until = 0.0
+        # Leader-only runs in progress, cancelled if the lease is lost
+        self._leader_runs: set[asyncio.Task] = set()
+
+    # Register a job; SCHEDULER_CRON can replace its interval by a cron expression
+    def add_job(
+        self,
+        name: str,
+        fn: Callable[[], Awaitable[object]],
+        interval_seconds: float | None = None,
+        cron: str | None = None,
+        leader_only: bool = True,
+        jitter_seconds: float = settings.SCHEDULER_JITTER_SECONDS,
+        max_runtime_seconds: float = settings.SCHEDULER_MAX_RUNTIME_SECONDS,
+    ) -> None:
+        cron = settings.SCHEDULER_CRON.get(name, cron)
+        if cron is None and interval_seconds is None:
+            raise ValueError(f"Job {name} needs an interval or a cron expression")
+        self.jobs.append(Job(name, fn, interval_seconds, cron, leader_only, jitter_seconds, max_runtime_seconds))
+
+    # Whether this worker currently holds the lease
+    @property
+    def is_leader(self) -> bool:
+        return time.monotonic() < self._leader_until
+
+    # Run the jobs until cancelled
+    async def run(self) -> None:
+        tasks = [self._run_job(job) for job in self.jobs]
+        if any(job.leader_only for job in self.jobs):
+            tasks.append(self._keep_lease())
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            SCHEDULER_LEADER.set(0)
+
+    # Give up the lease on shutdown, so another worker takes over without waiting for it to expire
+    async def release(self) -> None:
+        self._leader_until = 0.0
+        await SchedulerLease.get_pymongo_collection().delete_one({"name": self.LEASE_NAME, "owner": self.owner})
+
+    # Helper function to acquire or renew the lease periodically
+    async def _keep_lease(self) -> None:
+        was_leader = False
+        while True:
+            try:
+                await self._try_acquire()
+            except Exception as e:
+                # Leadership lapses on its own if the lease cannot be renewed in time
+                print(f"Error renewing scheduler lease: {e}")
+
+            leader = self.is_leader
+            if leader != was_leader:
+                print(f"Scheduler {self.owner} {'is now' if leader else 'is no longer'} the leader")
+                was_leader = leader
+            if not leader:
+                for task in self._leader_runs:
+                    task.cancel()
+            SCHEDULER_LEADER.set(1 if leader else 0)
+            await asyncio.sleep(self.lease_seconds / 3)
+
+    # Helper function to take the lease if it is free or expired, or extend it if already held
+    async def _try_acquire(self) -> None:
+        start = time.monotonic()
+        expires_at = {"$add": ["$$NOW", int(self.lease_seconds * 1000)]}
+        try:
+            await SchedulerLease.get_pymongo_collection().find_one_and_update(
+                {
+                    "name": self.LEASE_NAME,
+                    "$or": [{"owner": self.owner}, {"$expr": {"$lt": ["$expires_at", "$$NOW"]}}],
+                },
+                [{"$set": {"owner": self.owner, "expires_at": expires_at}}],
+                upsert=True,
+                return_document=ReturnDocument.AFTER,
+            )
+        except DuplicateKeyError:
+            # Held by another worker (the upsert collided with its lease)
+            self._leader_until = 0.0
+            return
+        # Counted from before the request, and stepping down a renewal period early
+        self._leader_until = start + self.lease_seconds * 2 / 3
+
+    # Helper function to run a job on its schedule until cancelled
+    async def _run_job(self, job: Job) -> None:
+        first_run = True
+        while True:
+            await asyncio.sleep(job.delay_until_next_run(first_run) + random.uniform(0, job.jitter_seconds))
+            first_run = False
+            if job.leader_only and not self.is_leader:
+                continue
+            await self._run_once(job)
+
+    # Helper function to run a job once, within its maximum runtime
+    async def _run_once(self, job: Job) -> None:
+        task = asyncio.ensure_future(asyncio.wait_for(job.fn(), job.max_runtime_seconds))
+        if job.leader_only:
+            self._leader_runs.add(task)
+            task.add_done_callback(self._leader_runs.discard)
+
+        start = time.perf_counter()
+        result = "success"
+        try:
+            await task
+        except asyncio.TimeoutError:
+            result = "timeout"
+            print(f"Job {job.name} cancelled after {job.max_runtime_seconds}s")
+        except asyncio.CancelledError:
+            # The scheduler is shutting down
+            if asyncio.current_task().cancelling():
+                raise
+            # Otherwise, the lease was lost during the run
+            result = "cancelled"
+            print(f"Job {job.name} cancelled, scheduler lease lost")
+        except Exception as e:
+            result = "error"
+            print(f"Error running job {job.name}: {e}")
+        SCHEDULER_JOB_DURATION.labels(job.name, result).observe(time.perf_counter() - start)
+        if result == "success":
+            SCHEDULER_JOB_LAST_SUCCESS.labels(job.name).set_to_current_time()
+
+
+# Shared scheduler instance for the application
+scheduler = Scheduler()
@@ -0,0 +1,54 @@
+import asyncio
+from typing import Awaitable, Callable, Hashable, TypeVar
+
+# Import single-flight metrics
+from app.utils.metrics_utils import SINGLE_FLIGHT_CALLS
+
+T = TypeVar("T")
+
+
+# In-flight call shared by every caller with the same key
+class _Call:
+
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+
+# SingleFlight coalesces identical concurrent calls: while a call for a key is running, other callers with
+# the same key await the same task and get its result (or exception) instead of running it again.
+# Only concurrent calls are shared, a call made after the previous one finished runs again.
+class SingleFlight:
+
+    def __init__(self, name: str):
+        self.name = name
+        self._calls: dict[Hashable, _Call] = {}
+
+    # Run `fn` for `key`, or join the call already running for it
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+        call = self._calls.get(key)
+        if call is None:
+            call = _Call(asyncio.ensure_future(fn()))
+            self._calls[key] = call
+            call.task.add_done_callback(lambda task: self._forget(key, call))
+            SINGLE_FLIGHT_CALLS.labels(self.name, "leader").inc()
+        else:
+            SINGLE_FLIGHT_CALLS.labels(self.name, "shared").inc()
+
+        call.waiters += 1
+        try:
+            # Shielded, so a caller cancelled (e.g. client disconnected) does not cancel the others
+            return await asyncio.shield(call.task)
+        finally:
+            call.waiters -= 1
+            # Nobody is waiting for the result anymore
+            if call.waiters == 0 and not call.task.done():
+                call.task.cancel()
+
+    # Helper function to drop a finished call
+    def _forget(self, key: Hashable, call: _Call) -> None:
+        if self._calls.get(key) is call:
+            del self._calls[key]
+        # Mark the exception as retrieved when every caller was cancelled
+        if not call.task.cancelled():
+            call.task.exception()
@@ -0,0 +1,63 @@
+from contextlib import contextmanager
+from typing import Iterator
+from opentelemetry import trace
+from opentelemetry.sdk.resources import Resource
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import BatchSpanProcessor, ConsoleSpanExporter, SimpleSpanProcessor
+from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+from opentelemetry.sdk.trace.sampling import ParentBased, TraceIdRatioBased
+from opentelemetry.trace import Span, SpanKind
+
+# Import settings
+from app.config.settings import settings
+
+# Tracer used for every application span (a no-op until tracing is set up)
+tracer = trace.get_tracer("hackaton-web3-backend")
+
+# In-memory exporter, used when TRACING_EXPORTER is "memory" so tests can assert on finished spans
+memory_exporter = InMemorySpanExporter()
+
+
+# Set up the global tracer provider from settings, returns None when tracing is disabled
+def setup_tracing(service_name: str | None = None) -> TracerProvider | None:
+    if not settings.TRACING_ENABLED:
+        return None
+
+    # Keep the sampling decision of the caller, sample new traces at the configured rate
+    provider = TracerProvider(
+        resource=Resource.create({"service.name": service_name or settings.TRACING_SERVICE_NAME}),
+        sampler=ParentBased(TraceIdRatioBased(settings.TRACING_SAMPLE_RATE)),
+    )
+
+    if settings.TRACING_EXPORTER == "memory":
+        provider.add_span_processor(SimpleSpanProcessor(memory_exporter))
+    elif settings.TRACING_EXPORTER == "console":
+        provider.add_span_processor(SimpleSpanProcessor(ConsoleSpanExporter()))
+    elif settings.TRACING_EXPORTER == "otlp":
+        # Optional dependency, only needed when exporting to a collector
+        from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+        provider.add_span_processor(BatchSpanProcessor(OTLPSpanExporter(endpoint=settings.TRACING_OTLP_ENDPOINT)))
+    else:
+        raise ValueError(f"Unknown tracing exporter: {settings.TRACING_EXPORTER}")
+
+    trace.set_tracer_provider(provider)
+    return provider
+
+
+# Flush and stop the tracer provider, if tracing was set up
+def shutdown_tracing() -> None:
+    provider = trace.get_tracer_provider()
+    if isinstance(provider, TracerProvider):
+        provider.shutdown()
+
+
+# Client span around a WhatsOnChain or CoinGecko request (exceptions are recorded by the span)
+@contextmanager
+def chain_span(endpoint: str, method: str, url: str) -> Iterator[Span]:
+    with tracer.start_as_current_span(
+        f"chain {endpoint}",
+        kind=SpanKind.CLIENT,
+        attributes={"http.request.method": method, "url.full": url},
+    ) as span:
+        yield span
+
@@ -0,0 +1,67 @@
+from datetime import datetime
+from typing import TYPE_CHECKING
+from cachetools import LRUCache
+from pymongo.errors import DuplicateKeyError
+
+from app.config.settings import settings
+from app.models.raw_transaction import RawTransaction
+
+if TYPE_CHECKING:
+    from bsv import Transaction
+
+
+# TransactionCache keeps parsed transactions keyed by txid.
+# Transactions are immutable, so entries never need to be invalidated.
+class TransactionCache:
+
+    def __init__(self, maxsize: int = settings.TX_CACHE_SIZE, persist: bool = settings.TX_CACHE_PERSIST):
+        self._memory: LRUCache = LRUCache(maxsize=maxsize)
+        self.persist = persist
+
+    # Get a parsed transaction from memory, then from Mongo if persistence is enabled
+    async def get(self, txid: str) -> "Transaction | None":
+        tx = self._memory.get(txid)
+        if tx is not None:
+            return tx
+
+        if not self.persist:
+            return None
+
+        stored = await RawTransaction.find_one({"tx_id": txid})
+        if stored is None:
+            return None
+
+        # Imported lazily, the BSV SDK is slow to import (serverless cold start)
+        from bsv import Transaction
+        tx = Transaction.from_hex(stored.raw_hex)
+        if tx is not None:
+            self._memory[txid] = tx
+        return tx
+
+    # Store a transaction under its txid
+    async def put(self, tx: "Transaction") -> None:
+        await self.put_hex(tx.txid(), tx.hex())
+
+    # Store a transaction available as raw hex and return the parsed transaction
+    async def put_hex(self, txid: str, raw_hex: str) -> "Transaction | None":
+        # Imported lazily, the BSV SDK is slow to import (serverless cold start)
+        from bsv import Transaction
+
+        # Keep a fresh parse so cached entries do not hold on to their source transaction chain
+        tx = Transaction.from_hex(raw_hex)
+        if tx is None:
+            return None
+        self._memory[txid] = tx
+
+        if self.persist:
+            try:
+                await RawTransaction(tx_id=txid, raw_hex=raw_hex, created_at=datetime.now()).insert()
+            except DuplicateKeyError:
+                # Already stored, content is the same for the same txid
+                pass
+
+        return tx
+
+
+# Shared transaction cache instance for the application
+transaction_cache = TransactionCache()
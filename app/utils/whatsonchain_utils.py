@@ -1,30 +1,74 @@
-from typing import Tuple
-from cachetools import cached, TTLCache
-from httpx import AsyncClient, Client
-from bsv import Transaction
+import asyncio
+import time
+from typing import TYPE_CHECKING, Tuple
+from httpx import AsyncClient, HTTPStatusError, Response, TransportError
 
-# Import settings and BSV Transaction class
+# Import settings
 from app.config.settings import settings
+# Import cache of parsed source transactions
+from app.utils.tx_cache_utils import transaction_cache
+# Import chain request and price cache metrics
+from app.utils.metrics_utils import CHAIN_REQUEST_DURATION, CHAIN_REQUEST_ERRORS, PRICE_CACHE_REQUESTS
+from app.utils.metrics_utils import CHAIN_REQUEST_REJECTIONS, CHAIN_REQUEST_RETRIES
+# Import rate limiter, circuit breaker and retry backoff for WhatsOnChain requests
+from app.utils.resilience_utils import CircuitBreaker, CircuitOpenError, Priority, PriorityRateLimiter
+from app.utils.resilience_utils import RateLimitQueueFull, backoff_delay
+# Import single-flight, identical concurrent balance lookups share one request
+from app.utils.single_flight_utils import SingleFlight
+# Import span helper, every chain and price request is traced as a client span
+from app.utils.tracing_utils import chain_span
+# Import per-request query counter
+from app.utils.query_counter_utils import record_http_call
+# Import cache backends, the price can be shared by every worker
+from app.utils.cache_utils import get_cache_backend
+
+if TYPE_CHECKING:
+    from bsv import Transaction
 
 
 # WhatsOnChainUtils class provides utilities for interacting with WhatsOnChain API for BSV blockchain operations
 class WhatsOnChainUtils:
 
     # Base URL for WhatsOnChain API
-    BASE_URL = "https://api.whatsonchain.com/v1"
+    BASE_URL = settings.WOC_BASE_URL
     # Base URL for Gecko API
-    BASE_URL_GECKO = "https://api.coingecko.com/api/v3"
+    BASE_URL_GECKO = settings.COINGECKO_BASE_URL
     # Blockchain chain identifier
     CHAIN = "bsv"
+    # Cache key of the BSV price in EUR
+    PRICE_CACHE_KEY = "price:bsv:eur"
+    # Priority of each endpoint: payments first, background refreshes and syncs last
+    PRIORITIES = {
+        "unspent": Priority.HIGH,
+        "tx_hex": Priority.HIGH,
+        "broadcast": Priority.HIGH,
+        "tx": Priority.NORMAL,
+        "balance": Priority.NORMAL,
+        "balances": Priority.LOW,
+        "tx_status": Priority.LOW,
+        "block_headers": Priority.LOW,
+        "block_header": Priority.LOW,
+    }
+    # Client-side rate limit of the API key, shared by every request of this process (not by other workers)
+    rate_limiter = PriorityRateLimiter(
+        "woc",
+        rate=settings.WOC_RATE_LIMIT_PER_SECOND,
+        burst=settings.WOC_RATE_LIMIT_BURST,
+        max_queue=settings.WOC_RATE_LIMIT_MAX_QUEUE,
+    )
+    circuit_breaker = CircuitBreaker(
+        "woc",
+        failure_threshold=settings.WOC_CIRCUIT_FAILURE_THRESHOLD,
+        reset_seconds=settings.WOC_CIRCUIT_RESET_SECONDS,
+    )
+    # In-flight balance lookups, by address
+    _balance_flight = SingleFlight("get_balance")
 
     # Retrieve all unspent transaction outputs (UTXOs) for a given address
     @staticmethod
     async def get_unspent_utxos(address: str) -> list[dict]:
         url = f"{WhatsOnChainUtils.BASE_URL}/{WhatsOnChainUtils.CHAIN}/main/address/{address}/unspent/all"
-
-        async with AsyncClient(timeout=10.0) as client:
-            resp = await client.get(url, headers=WhatsOnChainUtils._headers())
-            resp.raise_for_status()
+        resp = await WhatsOnChainUtils._request("unspent", "GET", url)
 
         data = resp.json()
         return data.get("result", [])
@@ -55,10 +99,7 @@ class WhatsOnChainUtils:
     @staticmethod
     async def get_raw_tx_hex(txid: str) -> str:
         url = f"{WhatsOnChainUtils.BASE_URL}/{WhatsOnChainUtils.CHAIN}/main/tx/{txid}/hex"
-
-        async with AsyncClient(timeout=10.0) as client:
-            resp = await client.get(url, headers=WhatsOnChainUtils._headers())
-            resp.raise_for_status()
+        resp = await WhatsOnChainUtils._request("tx_hex", "GET", url)
 
         return resp.text.strip()
 
@@ -67,66 +108,114 @@ class WhatsOnChainUtils:
     async def get_source_tx_and_index_for_payment(
         address: str,
         amount_satoshis: int,
-    ) -> Tuple[Transaction, int]:
+    ) -> Tuple["Transaction", int]:
 
         # Select a suitable UTXO
         utxo = await WhatsOnChainUtils.select_single_utxo_for_amount(address, amount_satoshis)
         txid = utxo["tx_hash"]
         tx_pos = utxo["tx_pos"]
 
-        # Fetch raw transaction hex
+        # Use the cached transaction when available (usually the change of our previous payment)
+        source_tx = await transaction_cache.get(txid)
+        if source_tx is not None:
+            return source_tx, tx_pos
+
+        # Fetch raw transaction hex, parse it into a Transaction object and cache it
         raw_hex = await WhatsOnChainUtils.get_raw_tx_hex(txid)
-        # Parse into Transaction object
-        source_tx = Transaction.from_hex(raw_hex)
+        source_tx = await transaction_cache.put_hex(txid, raw_hex)
         if source_tx is None:
             raise ValueError(f"Invalid transaction hex for txid {txid}")
 
         return source_tx, tx_pos
     
-    # Get the total balance (confirmed + unconfirmed) for an address
+    # Get the total balance (confirmed + unconfirmed) for an address (identical concurrent calls are coalesced)
     @staticmethod
     async def get_balance(address: str) -> int:
+        return await WhatsOnChainUtils._balance_flight.do(address, lambda: WhatsOnChainUtils._get_balance(address))
+
+    # Helper function to get the balance of an address
+    @staticmethod
+    async def _get_balance(address: str) -> int:
         url = f"{WhatsOnChainUtils.BASE_URL}/{WhatsOnChainUtils.CHAIN}/main/address/{address}/balance"
-        async with AsyncClient(timeout=10.0) as client:
-            resp = await client.get(url, headers=WhatsOnChainUtils._headers())
-            resp.raise_for_status()
+        resp = await WhatsOnChainUtils._request("balance", "GET", url)
         data = resp.json()
         return data.get("confirmed", 0) + data.get("unconfirmed", 0)
 
+    # Get the total balance (confirmed + unconfirmed) of several addresses in a single request (max 20)
+    @staticmethod
+    async def get_balances(addresses: list[str]) -> dict[str, int]:
+        url = f"{WhatsOnChainUtils.BASE_URL}/{WhatsOnChainUtils.CHAIN}/main/addresses/balance"
+        resp = await WhatsOnChainUtils._request("balances", "POST", url, json={"addresses": addresses})
+        balances = {}
+        for item in resp.json():
+            if item.get("error"):
+                continue
+            balance = item.get("balance", {})
+            balances[item["address"]] = balance.get("confirmed", 0) + balance.get("unconfirmed", 0)
+        return balances
+
     # Convert satoshis to euros using current BSV price
     @staticmethod
     async def convert_satoshis_to_euro(satoshis: int) -> float:
         # Convert satoshis to BSV (1 BSV = 100,000,000 satoshis)
         bsv_amount = satoshis / 100000000 
         # Get current BSV price in EUR
-        bsv_price_eur = WhatsOnChainUtils.get_bsv_price_eur()
+        bsv_price_eur = await WhatsOnChainUtils.get_bsv_price_eur()
         # Calculate total value in EUR
         return bsv_amount * bsv_price_eur
 
-    # Get BSV price in EUR from CoinGecko, cached for 5 minutes to reduce 429 errors
-    @cached(cache=TTLCache(maxsize=1, ttl=300))
+    # Get BSV price in EUR from CoinGecko, cached (5 minutes by default) to reduce 429 errors
     @staticmethod
-    def get_bsv_price_eur() -> float:
+    async def get_bsv_price_eur() -> float:
+        cache = get_cache_backend(settings.PRICE_CACHE_BACKEND)
+        price = await cache.get(WhatsOnChainUtils.PRICE_CACHE_KEY)
+        if price is not None:
+            PRICE_CACHE_REQUESTS.labels("hit").inc()
+            return price
+        PRICE_CACHE_REQUESTS.labels("miss").inc()
+
         url = f"{WhatsOnChainUtils.BASE_URL_GECKO}/simple/price?ids=bitcoin-cash-sv&vs_currencies=eur"
-        with Client(timeout=10.0) as client:
-            resp = client.get(url)
-            resp.raise_for_status()
+        record_http_call("price")
+        start = time.perf_counter()
+        try:
+            with chain_span("price", "GET", url):
+                async with AsyncClient(timeout=10.0) as client:
+                    resp = await client.get(url)
+                    resp.raise_for_status()
+        except Exception as e:
+            CHAIN_REQUEST_ERRORS.labels("price", WhatsOnChainUtils._error_reason(e)).inc()
+            raise
+        finally:
+            CHAIN_REQUEST_DURATION.labels("price").observe(time.perf_counter() - start)
         data = resp.json()
-        return data.get("bitcoin-cash-sv", {}).get("eur", 0.0)
+        price = data.get("bitcoin-cash-sv", {}).get("eur", 0.0)
+        await cache.set(WhatsOnChainUtils.PRICE_CACHE_KEY, price, settings.PRICE_CACHE_TTL_SECONDS)
+        return price
 
     # Validate if a transaction is confirmed and matches the expected payment
     @staticmethod
-    async def validate_transaction(txid: str, pay_to: str, expected_satoshis: int) -> bool:
+    async def validate_transaction(
+        txid: str,
+        pay_to: str,
+        expected_satoshis: int,
+        max_age_seconds: int | None = None,
+    ) -> bool:
         url = f"{WhatsOnChainUtils.BASE_URL}/{WhatsOnChainUtils.CHAIN}/main/tx/{txid}"
-        async with AsyncClient(timeout=10.0) as client:
-            resp = await client.get(url, headers=WhatsOnChainUtils._headers())
-            if resp.status_code != 200:
-                return False
+        try:
+            resp = await WhatsOnChainUtils._request("tx", "GET", url)
+        except HTTPStatusError:
+            return False
         tx_data = resp.json()
         
         # Check if transaction is confirmed (blockheight != -1)
         if tx_data.get("blockheight", -1) == -1:
             return False  # Not confirmed
+
+        # Check that the transaction is recent enough to be accepted
+        if max_age_seconds is not None:
+            block_time = tx_data.get("blocktime") or tx_data.get("time") or 0
+            if time.time() - block_time > max_age_seconds:
+                return False  # Too old
         
         # Check transaction outputs for matching address and amount
         for output in tx_data.get("vout", []):
@@ -138,10 +227,142 @@ class WhatsOnChainUtils:
         
         return False
 
+    # Broadcast several raw transactions in a single request using the bulk broadcast endpoint
+    @staticmethod
+    async def broadcast_transactions(raw_hexes: list[str]) -> list[dict]:
+        url = f"{WhatsOnChainUtils.BASE_URL}/{WhatsOnChainUtils.CHAIN}/main/tx/broadcast?feedback=true"
+        resp = await WhatsOnChainUtils._request("broadcast", "POST", url, json=raw_hexes, timeout=30.0)
+        data = resp.json()
+        # Feedback is returned as a list of {"txid", "error"} entries, one per transaction
+        if isinstance(data, dict):
+            data = data.get("result", [])
+        return data
+
+    # Get the confirmation status of several transactions in a single request (max 20 txids)
+    @staticmethod
+    async def get_transactions_status(txids: list[str]) -> list[dict]:
+        url = f"{WhatsOnChainUtils.BASE_URL}/{WhatsOnChainUtils.CHAIN}/main/txs/status"
+        resp = await WhatsOnChainUtils._request("tx_status", "POST", url, json={"txids": txids})
+        return resp.json()
+
+    # Get the latest block headers (last 10 blocks)
+    @staticmethod
+    async def get_latest_block_headers() -> list[dict]:
+        url = f"{WhatsOnChainUtils.BASE_URL}/{WhatsOnChainUtils.CHAIN}/main/block/headers"
+        resp = await WhatsOnChainUtils._request("block_headers", "GET", url)
+        return resp.json()
+
+    # Get the block header at a given height
+    @staticmethod
+    async def get_block_header(height: int, priority: Priority | None = None) -> dict:
+        url = f"{WhatsOnChainUtils.BASE_URL}/{WhatsOnChainUtils.CHAIN}/main/block/{height}/header"
+        resp = await WhatsOnChainUtils._request("block_header", "GET", url, priority=priority)
+        return resp.json()
+
+    # Send a request to the WhatsOnChain API, recording its latency and errors per endpoint.
+    # Rate limited by priority, retried with exponential backoff on 429, 5xx and network errors.
+    @staticmethod
+    async def _request(
+        endpoint: str,
+        method: str,
+        url: str,
+        timeout: float = 10.0,
+        priority: Priority | None = None,
+        **kwargs,
+    ) -> Response:
+        if priority is None:
+            priority = WhatsOnChainUtils.PRIORITIES.get(endpoint, Priority.NORMAL)
+        record_http_call(endpoint)
+        start = time.perf_counter()
+        try:
+            with chain_span(endpoint, method, url) as span:
+                attempt = 0
+                while True:
+                    try:
+                        return await WhatsOnChainUtils._send(endpoint, method, url, timeout, priority, **kwargs)
+                    except Exception as e:
+                        if attempt >= settings.WOC_MAX_RETRIES or not WhatsOnChainUtils._is_retryable(e):
+                            raise
+                        reason = WhatsOnChainUtils._error_reason(e)
+                        CHAIN_REQUEST_RETRIES.labels(endpoint, reason).inc()
+                        span.add_event("retry", {"attempt": attempt + 1, "reason": reason})
+                        await asyncio.sleep(backoff_delay(
+                            attempt,
+                            settings.WOC_RETRY_BASE_DELAY_SECONDS,
+                            settings.WOC_RETRY_MAX_DELAY_SECONDS,
+                            WhatsOnChainUtils._retry_after(e),
+                        ))
+                        attempt += 1
+        except Exception as e:
+            CHAIN_REQUEST_ERRORS.labels(endpoint, WhatsOnChainUtils._error_reason(e)).inc()
+            raise
+        finally:
+            CHAIN_REQUEST_DURATION.labels(endpoint).observe(time.perf_counter() - start)
+
+    # Send a single attempt of a request, through the circuit breaker and the rate limiter
+    @staticmethod
+    async def _send(endpoint: str, method: str, url: str, timeout: float, priority: Priority, **kwargs) -> Response:
+        breaker = WhatsOnChainUtils.circuit_breaker
+        try:
+            breaker.check()
+        except CircuitOpenError:
+            CHAIN_REQUEST_REJECTIONS.labels(endpoint, "circuit_open").inc()
+            raise
+
+        try:
+            await WhatsOnChainUtils.rate_limiter.acquire(priority)
+            async with AsyncClient(timeout=timeout) as client:
+                resp = await client.request(method, url, headers=WhatsOnChainUtils._headers(), **kwargs)
+                resp.raise_for_status()
+        except RateLimitQueueFull:
+            breaker.record_neutral()
+            CHAIN_REQUEST_REJECTIONS.labels(endpoint, "queue_full").inc()
+            raise
+        except HTTPStatusError as e:
+            # Only server errors count as failures, a 404 or a 429 says the API is up
+            if e.response.status_code >= 500:
+                breaker.record_failure()
+            else:
+                breaker.record_neutral()
+            raise
+        except TransportError:
+            breaker.record_failure()
+            raise
+        except BaseException:
+            breaker.record_neutral()
+            raise
+
+        breaker.record_success()
+        return resp
+
+    # Check whether a failed request is worth retrying (rate limited, server error or network error)
+    @staticmethod
+    def _is_retryable(error: Exception) -> bool:
+        if isinstance(error, HTTPStatusError):
+            return error.response.status_code == 429 or error.response.status_code >= 500
+        return isinstance(error, TransportError)
+
+    # Get the delay asked by a 429 or 503 response (Retry-After in seconds), if any
+    @staticmethod
+    def _retry_after(error: Exception) -> float | None:
+        if not isinstance(error, HTTPStatusError):
+            return None
+        try:
+            return float(error.response.headers["retry-after"])
+        except (KeyError, ValueError):
+            return None
+
+    # Classify a request error for metrics (HTTP status code or exception name)
+    @staticmethod
+    def _error_reason(error: Exception) -> str:
+        if isinstance(error, HTTPStatusError):
+            return str(error.response.status_code)
+        return type(error).__name__
+
     # Generate headers for WhatsOnChain API requests, including API key if available
     @staticmethod
     def _headers() -> dict:
-        api_key = getattr(settings, "WOC_API_KEY", None)
+        api_key = settings.WOC_API_KEY
         if api_key:
             return {"woc-api-key": api_key}
         return {}
\ No newline at end of file
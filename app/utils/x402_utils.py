@@ -0,0 +1,299 @@
+import asyncio
+import json
+import math
+from datetime import datetime, timedelta
+from typing import TYPE_CHECKING
+from cachetools import TTLCache
+from fastapi import Request
+from fastapi.responses import JSONResponse
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+from bson import ObjectId
+from x402.encoding import safe_base64_decode
+
+from app.config.settings import settings
+from app.models.consumed_payment import ConsumedPayment
+from app.models.spent_outpoint import SpentOutpoint
+
+# Import WhatsOnChain utilities for BSV operations
+from app.utils.whatsonchain_utils import WhatsOnChainUtils
+# Import shared broadcaster to relay SPV-verified payments
+from app.services.broadcast_service import broadcaster
+
+if TYPE_CHECKING:
+    from bsv import Transaction
+
+
+# Exception raised when a request must pay (again) before accessing a resource
+class PaymentRequiredException(Exception):
+
+    def __init__(self, payment_requirements: dict, error: str):
+        self.payment_requirements = payment_requirements
+        self.error = error
+
+
+# Exception handler returning the x402 payment requirements with a 402 status
+async def payment_required_handler(request: Request, exc: PaymentRequiredException) -> JSONResponse:
+    return JSONResponse(
+        content={
+            "x402Version": 1,
+            "accepts": [exc.payment_requirements],
+            "error": exc.error,
+        },
+        status_code=402,
+    )
+
+
+# X402Paywall is a reusable FastAPI dependency protecting a route with an x402 BSV payment
+class X402Paywall:
+
+    # Verified payments shared by every paywall: txid -> (resource it paid for, end of access window)
+    _verified: TTLCache = TTLCache(
+        maxsize=settings.X402_VERIFIED_CACHE_SIZE,
+        ttl=settings.X402_PAYMENT_MAX_AGE_SECONDS,
+    )
+    # SPV payments being relayed in the background, kept until they finish
+    _relays: set[asyncio.Task] = set()
+
+    def __init__(
+        self,
+        price_satoshis: int,
+        pay_to: str,
+        description: str = "",
+        max_timeout_seconds: int = 60,
+    ):
+        self.price_satoshis = price_satoshis
+        self.pay_to = pay_to
+        self.description = description
+        # A verified payment gives access to its resource during this window
+        self.max_timeout_seconds = max_timeout_seconds
+
+    # Validate the X-PAYMENT header and return the txid of the accepted payment
+    async def __call__(self, request: Request) -> str:
+        payment_requirements = self._payment_requirements(request)
+
+        # Check for X-PAYMENT header
+        payment_header = request.headers.get("X-PAYMENT", "")
+        if payment_header == "":
+            raise PaymentRequiredException(payment_requirements, "X-PAYMENT header not provided")
+
+        # Decode payment header, either a txid or a raw transaction with merkle proofs (BEEF)
+        tx = None
+        try:
+            payment_data = json.loads(safe_base64_decode(payment_header))
+            if payment_data.get("beef"):
+                # Imported lazily, the BSV SDK is slow to import (serverless cold start)
+                from bsv import Transaction
+                tx = Transaction.from_beef(payment_data["beef"])
+                txid = tx.txid()
+            else:
+                txid = payment_data.get("txid")
+            if not txid:
+                raise ValueError("No txid in payment data")
+        except Exception:
+            raise PaymentRequiredException(payment_requirements, "Invalid payment header format")
+
+        resource = self._resource_key(request)
+
+        # Payment already verified by this worker, no database or chain access needed
+        cached = X402Paywall._verified.get(txid)
+        if cached is not None:
+            self._check_access(*cached, resource, payment_requirements)
+            return txid
+
+        # Payment already consumed, possibly by another worker
+        consumed = await ConsumedPayment.find_one({"tx_id": txid})
+        if consumed is not None:
+            self._accept_consumed(consumed, resource, payment_requirements)
+            return txid
+
+        # Validate the BSV transaction, locally when a BEEF was provided
+        if tx is not None:
+            # Spent outpoints are kept after the consumed payment expired, so an old BEEF cannot be replayed
+            if await SpentOutpoint.get_pymongo_collection().find_one({"tx_id": txid}) is not None:
+                raise PaymentRequiredException(payment_requirements, "Payment already used")
+            valid = await self._verify_spv(tx)
+        else:
+            valid = await WhatsOnChainUtils.validate_transaction(
+                txid,
+                self.pay_to,
+                self.price_satoshis,
+                max_age_seconds=settings.X402_PAYMENT_MAX_AGE_SECONDS,
+            )
+        if not valid:
+            raise PaymentRequiredException(payment_requirements, "Invalid or unconfirmed transaction")
+
+        # Claim the txid, the unique index makes concurrent claims of the same txid fail
+        now = datetime.now()
+        consumed = ConsumedPayment(
+            tx_id=txid,
+            resource=resource,
+            consumed_at=now,
+            access_expires_at=now + timedelta(seconds=self.max_timeout_seconds),
+            # An unmined SPV payment is pending until the network accepts it
+            relayed=tx is None or tx.merkle_path is not None,
+        )
+        try:
+            await consumed.insert()
+        except DuplicateKeyError:
+            consumed = await ConsumedPayment.find_one({"tx_id": txid})
+            if consumed is None:
+                raise PaymentRequiredException(payment_requirements, "Payment already used")
+            self._accept_consumed(consumed, resource, payment_requirements)
+            return txid
+
+        if tx is not None:
+            try:
+                await X402Paywall._claim_outpoints(tx)
+            except ValueError as e:
+                await X402Paywall._revoke(txid)
+                raise PaymentRequiredException(payment_requirements, f"Payment rejected: {e}")
+            # Access is granted on the local checks, the network hears of the payment in the background
+            if not consumed.relayed:
+                X402Paywall._start_relay(tx)
+
+        X402Paywall._verified[txid] = (consumed.resource, consumed.access_expires_at)
+        return txid
+
+    # Verify a BEEF transaction against the local header store and check it pays this paywall
+    async def _verify_spv(self, tx: "Transaction") -> bool:
+        # Imported lazily, the BSV SDK is slow to import (serverless cold start)
+        from bsv import P2PKH
+        from app.utils.header_store_utils import header_store
+
+        locking_script = P2PKH().lock(self.pay_to).hex()
+        pays = any(
+            output.satoshis == self.price_satoshis and output.locking_script.hex() == locking_script
+            for output in tx.outputs
+        )
+        if not pays:
+            return False
+
+        # Check the fee, ancestor merkle proofs against stored headers, then every input script
+        try:
+            return (
+                X402Paywall._pays_fee(tx)
+                and await X402Paywall._is_anchored(tx)
+                and await tx.verify(header_store)
+            )
+        except Exception:
+            return False
+
+    # A transaction pays a fee when its inputs cover its outputs plus the minimum fee (mined ones are valid)
+    @staticmethod
+    def _pays_fee(tx: "Transaction") -> bool:
+        if tx.merkle_path is not None:
+            return True
+        total_in = 0
+        for tx_input in tx.inputs:
+            if tx_input.source_transaction is None:
+                return False
+            total_in += tx_input.source_transaction.outputs[tx_input.source_output_index].satoshis
+        fee = total_in - sum(output.satoshis for output in tx.outputs)
+        return fee >= math.ceil(tx.byte_length() * settings.X402_MIN_FEE_SATOSHIS_PER_KB / 1000)
+
+    # A transaction is anchored when it has a valid merkle proof or all its inputs are anchored
+    @staticmethod
+    async def _is_anchored(tx: "Transaction") -> bool:
+        from app.utils.header_store_utils import header_store
+
+        if tx.merkle_path is not None:
+            return await tx.merkle_path.verify(tx.txid(), header_store)
+        if not tx.inputs:
+            return False
+        for tx_input in tx.inputs:
+            if tx_input.source_transaction is None:
+                return False
+            if not await X402Paywall._is_anchored(tx_input.source_transaction):
+                return False
+        return True
+
+    # Record the outputs spent by an SPV payment, an output already spent by another payment is rejected
+    # (SPV does not check that inputs are unspent, the same output could be signed into many transactions)
+    @staticmethod
+    async def _claim_outpoints(tx: "Transaction") -> None:
+        now = datetime.now()
+        txid = tx.txid()
+        documents = [
+            {
+                "_id": ObjectId(),
+                "outpoint": f"{tx_input.source_txid}:{tx_input.source_output_index}",
+                "tx_id": txid,
+                "spent_at": now,
+            }
+            for tx_input in tx.inputs
+        ]
+        collection = SpentOutpoint.get_pymongo_collection()
+        try:
+            await collection.insert_many(documents, ordered=False)
+        except BulkWriteError:
+            # Release the outpoints this call did claim, the others belong to the earlier payment
+            await collection.delete_many({"_id": {"$in": [document["_id"] for document in documents]}})
+            raise ValueError("Transaction spends outputs already used by another payment")
+
+    # Relay an SPV-verified payment in the background
+    @staticmethod
+    def _start_relay(tx: "Transaction") -> None:
+        task = asyncio.create_task(X402Paywall._relay(tx))
+        X402Paywall._relays.add(task)
+        task.add_done_callback(X402Paywall._relays.discard)
+
+    # Broadcast a pending SPV payment, it is revoked if the network does not accept it. Its outputs stay
+    # claimed, access was already granted once and the same BEEF must not be replayed
+    @staticmethod
+    async def _relay(tx: "Transaction") -> None:
+        txid = tx.txid()
+        try:
+            await broadcaster.broadcast(tx)
+        except Exception as e:
+            print(f"Error relaying x402 payment {txid}, access revoked: {e}")
+            await X402Paywall._revoke(txid)
+            return
+        await ConsumedPayment.get_pymongo_collection().update_one({"tx_id": txid}, {"$set": {"relayed": True}})
+
+    # Wait for the payments being relayed (their batches are flushed by the broadcaster on shutdown)
+    @staticmethod
+    async def close() -> None:
+        if X402Paywall._relays:
+            await asyncio.gather(*X402Paywall._relays, return_exceptions=True)
+
+    # Revoke a payment rejected after its txid was claimed (the outputs it claimed stay spent)
+    @staticmethod
+    async def _revoke(txid: str) -> None:
+        await ConsumedPayment.get_pymongo_collection().delete_one({"tx_id": txid})
+        X402Paywall._verified.pop(txid, None)
+
+    # Accept a payment consumed by any worker and remember it in the verified cache
+    def _accept_consumed(self, consumed: ConsumedPayment, resource: str, payment_requirements: dict) -> None:
+        # A payment still being relayed is not cached, this worker would not see it revoked
+        if consumed.relayed:
+            X402Paywall._verified[consumed.tx_id] = (consumed.resource, consumed.access_expires_at)
+        self._check_access(consumed.resource, consumed.access_expires_at, resource, payment_requirements)
+
+    # A payment is only valid for the resource it paid and while its access window is open
+    @staticmethod
+    def _check_access(
+        paid_resource: str,
+        access_expires_at: datetime,
+        resource: str,
+        payment_requirements: dict,
+    ) -> None:
+        if paid_resource != resource or access_expires_at < datetime.now():
+            raise PaymentRequiredException(payment_requirements, "Payment already used")
+
+    # Build the x402 payment requirements for this paywall
+    def _payment_requirements(self, request: Request) -> dict:
+        return {
+            "scheme": "exact",
+            "network": "bsv",  # Custom for BSV
+            "asset": "BSV",
+            "maxAmountRequired": f"{self.price_satoshis} satoshis",
+            "resource": str(request.url),
+            "description": self.description,
+            "mimeType": "",
+            "payTo": self.pay_to,
+            "maxTimeoutSeconds": self.max_timeout_seconds,
+        }
+
+    # Identify the paid resource, a payment is only valid for the route it was made for
+    def _resource_key(self, request: Request) -> str:
+        return f"{request.method} {request.url.path} {self.pay_to} {self.price_satoshis}"
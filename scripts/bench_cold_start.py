@@ -0,0 +1,125 @@
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+import httpx
+
+# Project root, the app is imported and served from there
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Code run in a fresh interpreter to time the import of the application
+IMPORT_SNIPPET = (
+    "import time; start = time.perf_counter(); import app.main; "
+    "print((time.perf_counter() - start) * 1000)"
+)
+
+
+# Time the import of app.main in a fresh interpreter, in milliseconds
+def time_import(env: dict) -> float:
+    output = subprocess.check_output([sys.executable, "-c", IMPORT_SNIPPET], cwd=ROOT, env=env, text=True)
+    return float(output.strip().splitlines()[-1])
+
+
+# Start a server, return the time until its first response and the latency of the first and second requests
+def time_first_request(env: dict, path: str, timeout: float) -> dict:
+    port = _free_port()
+    started = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=ROOT,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        url = f"http://127.0.0.1:{port}{path}"
+        with httpx.Client(timeout=timeout) as client:
+            # Wait until the server accepts connections
+            while True:
+                if server.poll() is not None:
+                    raise RuntimeError("Server exited before serving (is MongoDB reachable?)")
+                if time.perf_counter() - started > timeout:
+                    raise TimeoutError("Server did not start in time")
+                try:
+                    request_started = time.perf_counter()
+                    response = client.get(url)
+                    break
+                except httpx.TransportError:
+                    time.sleep(0.01)
+            ready_ms = (time.perf_counter() - started) * 1000
+            first_ms = (time.perf_counter() - request_started) * 1000
+
+            request_started = time.perf_counter()
+            client.get(url)
+            second_ms = (time.perf_counter() - request_started) * 1000
+    finally:
+        server.terminate()
+        server.wait()
+
+    return {"status": response.status_code, "ready_ms": ready_ms, "first_request_ms": first_ms, "second_request_ms": second_ms}
+
+
+# Run every measurement for one startup mode
+def bench_mode(fast_startup: bool, runs: int, path: str, timeout: float, imports_only: bool) -> dict:
+    env = {**os.environ, "FAST_STARTUP": str(fast_startup).lower()}
+    imports = [time_import(env) for _ in range(runs)]
+    result = {"fast_startup": fast_startup, "import_ms": statistics.median(imports)}
+    if imports_only:
+        return result
+
+    requests = [time_first_request(env, path, timeout) for _ in range(runs)]
+    for key in ("ready_ms", "first_request_ms", "second_request_ms"):
+        result[key] = statistics.median(r[key] for r in requests)
+    result["status"] = requests[-1]["status"]
+    return result
+
+
+# Helper function to get a free local port
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+# Helper function to get the current git commit
+def _git_commit() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, text=True).strip()
+    except Exception:
+        return "unknown"
+
+
+# Main function to run the cold start benchmark from the command line
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark import time and first-request latency of the app.")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--path", default="/metrics", help="Path requested once the server is up")
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--imports-only", action="store_true", help="Only time the import (no MongoDB needed)")
+    parser.add_argument("--output", help="Write the JSON results to this file")
+    args = parser.parse_args()
+
+    results = [bench_mode(fast, args.runs, args.path, args.timeout, args.imports_only) for fast in (False, True)]
+
+    print(f"{'mode':<10}{'import ms':>11}{'ready ms':>11}{'1st req ms':>12}{'2nd req ms':>12}")
+    for r in results:
+        print(
+            f"{'fast' if r['fast_startup'] else 'default':<10}{r['import_ms']:>11.0f}"
+            f"{r.get('ready_ms', float('nan')):>11.0f}{r.get('first_request_ms', float('nan')):>12.1f}"
+            f"{r.get('second_request_ms', float('nan')):>12.1f}"
+        )
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"commit": _git_commit(), "created_at": datetime.now().isoformat(), "results": results}, f, indent=2)
+
+
+# Entry point to run the script
+if __name__ == "__main__":
+    main()
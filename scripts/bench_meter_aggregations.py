@@ -0,0 +1,219 @@
+import argparse
+import asyncio
+import json
+import statistics
+import subprocess
+import sys
+import os
+import time
+from datetime import datetime, timedelta
+
+# Add the project root to the Python path to enable imports from the app directory
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+from app.config.mongo import MongoDbClient
+from app.config.settings import settings
+from app.dtos.meter.meter_request import StepEnum
+from app.models.meter_reading import MeterReading
+from app.services.meter_service import STEP_DURATIONS, MeterService
+from scripts.generate_dataset import DatasetGenerator
+
+# Dataset sizes: name -> (users, days of hourly readings per user)
+DATASETS = {
+    "1k": (1, 42),
+    "100k": (10, 417),
+    "10m": (1000, 417),
+}
+
+# Date ranges benchmarked for every step, relative to the end of the dataset
+RANGES = {
+    "24h": timedelta(hours=24),
+    "30d": timedelta(days=30),
+    "365d": timedelta(days=365),
+}
+
+
+# AggregationBenchmark seeds a dataset once and times every chart step and range on it
+class AggregationBenchmark:
+
+    def __init__(self, dataset: str, repeat: int = 5, reseed: bool = False, seed: int = 0):
+        self.dataset = dataset
+        self.repeat = repeat
+        self.reseed = reseed
+        self.seed = seed
+        self.client = MongoDbClient(database_name=f"bench_meter_{dataset}")
+        self.db = self.client.client[self.client.database_name]
+
+    # Seed (or reuse) the dataset, run every case and return the results
+    async def run(self) -> list[dict]:
+        await self.client.init()
+        user_id, end = await self._seed()
+
+        results = []
+        for step in StepEnum:
+            for range_name, period in RANGES.items():
+                # Ranges the API rejects (more than CHART_MAX_POINTS points) are not benchmarked
+                if period / STEP_DURATIONS[step] > settings.CHART_MAX_POINTS:
+                    print(f"Skipping {step.value} over {range_name}: more than {settings.CHART_MAX_POINTS} points")
+                    continue
+                start = end - period
+                pipeline = MeterService.build_chart_pipeline(user_id, start.isoformat(), end.isoformat(), step)
+                timings = await self._time(lambda: self._aggregate(pipeline))
+                results.append(self._result(f"generate_chart:{step.value}", range_name, timings, await self._explain(pipeline)))
+
+        pipeline = MeterService.build_monthly_usage_pipeline(user_id)
+        timings = await self._time(lambda: self._aggregate(pipeline))
+        results.append(self._result("get_monthly_usage_kwh", "month", timings, await self._explain(pipeline)))
+
+        await self.client.close()
+        return results
+
+    # Seed the dataset unless it is already there, return the benchmarked user and the dataset end
+    async def _seed(self) -> tuple[str, datetime]:
+        users, days = DATASETS[self.dataset]
+        readings = self.db[MeterReading.Settings.name]
+        meta = self.db["bench_meta"]
+
+        existing = await meta.find_one({"_id": "dataset"})
+        if existing and not self.reseed and existing.get("seed") == self.seed:
+            return existing["user_id"], existing["end"]
+
+        await readings.drop()
+        await self.db["users"].drop()
+        await self.client.init()
+
+        end = datetime.now().replace(minute=0, second=0, microsecond=0)
+        generator = DatasetGenerator(self.db, seed=self.seed)
+        created = await generator.create_users(users)
+        await generator.generate_readings(created, end - timedelta(days=days), end)
+
+        user_id = str(created[0][0])
+        await meta.replace_one(
+            {"_id": "dataset"},
+            {"user_id": user_id, "end": end, "seed": self.seed, "readings": await readings.estimated_document_count()},
+            upsert=True,
+        )
+        return user_id, end
+
+    # Run an aggregation pipeline on the readings. Pipelines are run directly, the chart cache of
+    # MeterService would answer every sample after the warm-up run
+    async def _aggregate(self, pipeline: list[dict]) -> list[dict]:
+        cursor = await self.db[MeterReading.Settings.name].aggregate(pipeline)
+        return await cursor.to_list()
+
+    # Run a call several times and return the durations in milliseconds
+    async def _time(self, call) -> list[float]:
+        # Warm-up run so connections and the working set do not skew the first sample
+        await call()
+        timings = []
+        for _ in range(self.repeat):
+            start = time.perf_counter()
+            await call()
+            timings.append((time.perf_counter() - start) * 1000)
+        return timings
+
+    # Get the execution stats of an aggregation pipeline
+    async def _explain(self, pipeline: list[dict]) -> dict:
+        explain = await self.db.command(
+            "explain",
+            {"aggregate": MeterReading.Settings.name, "pipeline": pipeline, "cursor": {}},
+            verbosity="executionStats",
+        )
+        stats = _find_key(explain, "executionStats") or {}
+        return {
+            "docs_examined": stats.get("totalDocsExamined"),
+            "keys_examined": stats.get("totalKeysExamined"),
+            "n_returned": stats.get("nReturned"),
+            "index_used": _find_key(explain, "indexName"),
+            "collection_scan": "COLLSCAN" in json.dumps(explain, default=str),
+        }
+
+    # Build a result entry
+    def _result(self, operation: str, range_name: str, timings: list[float], explain: dict) -> dict:
+        return {
+            "dataset": self.dataset,
+            "operation": operation,
+            "range": range_name,
+            "min_ms": min(timings),
+            "median_ms": statistics.median(timings),
+            "max_ms": max(timings),
+            **explain,
+        }
+
+
+# Helper function to find the first value of a key in a nested explain document
+def _find_key(document, key: str):
+    if isinstance(document, dict):
+        if key in document:
+            return document[key]
+        values = document.values()
+    elif isinstance(document, list):
+        values = document
+    else:
+        return None
+    for value in values:
+        found = _find_key(value, key)
+        if found is not None:
+            return found
+    return None
+
+
+# Helper function to get the current git commit
+def _git_commit() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True).strip()
+    except Exception:
+        return "unknown"
+
+
+# Print the results, with the relative change against a previous run when given
+def print_results(results: list[dict], baseline: dict | None = None) -> None:
+    previous = {}
+    if baseline:
+        previous = {(r["dataset"], r["operation"], r["range"]): r for r in baseline["results"]}
+
+    print(f"{'dataset':<8}{'operation':<32}{'range':<7}{'median ms':>11}{'docs':>11}{'index':>22}{'change':>9}")
+    for r in results:
+        change = ""
+        before = previous.get((r["dataset"], r["operation"], r["range"]))
+        if before and before["median_ms"]:
+            change = f"{(r['median_ms'] / before['median_ms'] - 1) * 100:+.0f}%"
+        print(
+            f"{r['dataset']:<8}{r['operation']:<32}{r['range']:<7}{r['median_ms']:>11.2f}"
+            f"{str(r['docs_examined']):>11}{str(r['index_used'] or 'COLLSCAN'):>22}{change:>9}"
+        )
+
+
+# Main asynchronous function to run the benchmark suite from the command line
+async def main():
+    parser = argparse.ArgumentParser(description="Benchmark MeterService aggregations across data volumes.")
+    parser.add_argument("--datasets", nargs="+", choices=list(DATASETS), default=["1k", "100k"])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--reseed", action="store_true", help="Drop and regenerate the datasets")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Write the JSON results to this file")
+    parser.add_argument("--compare", help="JSON results of a previous run to compare against")
+    args = parser.parse_args()
+
+    results = []
+    for dataset in args.datasets:
+        results += await AggregationBenchmark(dataset, args.repeat, args.reseed, args.seed).run()
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+    print_results(results, baseline)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({
+                "commit": _git_commit(),
+                "created_at": datetime.now().isoformat(),
+                "results": results,
+            }, f, indent=2, default=str)
+
+
+# Entry point to run the script
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,75 @@
+import argparse
+import asyncio
+import json
+import sys
+import os
+import time
+
+# Add the project root to the Python path to enable imports from the app directory
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+from bsv import PrivateKey
+
+from app.services.payment_service import PaymentService
+from app.utils.whatsonchain_utils import WhatsOnChainUtils
+from scripts.chain_stand_in import ChainStandIn, run_chain_stand_in
+from scripts.load_generator import EndpointStats
+
+
+# Run payment chains for several wallets against the chain stand-in and time each payment
+async def bench_payments(stand_in: ChainStandIn, wallets: int, payments_per_wallet: int, amount_satoshis: int) -> dict:
+    keys = [PrivateKey() for _ in range(wallets)]
+    for key in keys:
+        stand_in.fund(key.address(), 10 * payments_per_wallet * (amount_satoshis + 100))
+
+    recipient = PrivateKey().address()
+    stats = EndpointStats()
+
+    # Each wallet pays sequentially (every payment spends the previous change), wallets run concurrently
+    async def run_wallet(key: PrivateKey) -> None:
+        for _ in range(payments_per_wallet):
+            start = time.perf_counter()
+            error = None
+            try:
+                await PaymentService.send_payment(key, recipient, amount_satoshis)
+            except Exception as e:
+                error = type(e).__name__
+            stats.record((time.perf_counter() - start) * 1000, error)
+
+    started = time.perf_counter()
+    await asyncio.gather(*[run_wallet(key) for key in keys])
+    return stats.summary(time.perf_counter() - started)
+
+
+# Main function to run the payment path benchmark from the command line
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the payment path against a local chain stand-in.")
+    parser.add_argument("--wallets", type=int, default=20)
+    parser.add_argument("--payments", type=int, default=10, help="Payments per wallet")
+    parser.add_argument("--amount", type=int, default=100, help="Satoshis per payment")
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--rate-limit", type=float, default=0.0, help="WhatsOnChain requests per second (0: no limit)")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--output", help="Write the JSON result to this file")
+    args = parser.parse_args()
+
+    stand_in = ChainStandIn(latency_ms=args.latency_ms, error_rate=args.error_rate, seed=args.seed)
+    with run_chain_stand_in(stand_in, port=args.port) as base_url:
+        # Point the chain and price utilities to the stand-in
+        WhatsOnChainUtils.BASE_URL = f"{base_url}/v1"
+        WhatsOnChainUtils.BASE_URL_GECKO = f"{base_url}/api/v3"
+        # The stand-in has no rate limit, only apply the client-side one when asked to
+        WhatsOnChainUtils.rate_limiter.rate = args.rate_limit
+        result = asyncio.run(bench_payments(stand_in, args.wallets, args.payments, args.amount))
+
+    print(json.dumps(result, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(result, f, indent=2)
+
+
+# Entry point to run the script
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,317 @@
+import argparse
+import asyncio
+import hashlib
+import random
+import sys
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Iterator
+
+# Add the project root to the Python path to enable imports from the app directory
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+import uvicorn
+from bsv import (
+    ADDRESS_MAINNET_PREFIX,
+    P2PKH,
+    OpReturn,
+    Transaction,
+    TransactionOutput,
+    base58check_encode,
+)
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, PlainTextResponse
+
+
+# ChainStandIn is a deterministic in-memory stand-in for the WhatsOnChain and CoinGecko APIs
+class ChainStandIn:
+    """
+    Keeps an in-memory UTXO set, accepts broadcasts, mines blocks on demand and serves
+    a fixed BSV price, with configurable latency and error injection.
+    """
+
+    def __init__(
+        self,
+        latency_ms: float = 0.0,
+        error_rate: float = 0.0,
+        seed: int = 0,
+        price_eur: float = 50.0,
+        start_height: int = 800000,
+    ):
+        self.latency_ms = latency_ms
+        self.error_rate = error_rate
+        self.price_eur = price_eur
+        self._random = random.Random(seed)
+        # Raw transactions and their block height (-1 while in mempool), by txid
+        self.transactions: dict[str, str] = {}
+        self.heights: dict[str, int] = {}
+        # Unspent outputs: (txid, vout) -> (locking script hex, satoshis)
+        self.utxos: dict[tuple[str, int], tuple[str, int]] = {}
+        self.mempool: list[str] = []
+        self.headers: list[dict] = []
+        self.height = start_height
+        self._faucet_counter = 0
+        self._lock = threading.Lock()
+
+    # Create a funding transaction paying the given satoshis to an address
+    def fund(self, address: str, satoshis: int) -> str:
+        with self._lock:
+            self._faucet_counter += 1
+            counter = self._faucet_counter
+        tx = Transaction(
+            tx_inputs=[],
+            tx_outputs=[
+                TransactionOutput(locking_script=P2PKH().lock(address), satoshis=satoshis),
+                # Makes every funding transaction unique
+                TransactionOutput(locking_script=OpReturn().lock([f"faucet-{counter}"]), satoshis=0),
+            ],
+            version=1,
+        )
+        self._accept(tx, check_inputs=False)
+        return tx.txid()
+
+    # Accept a raw transaction, returns an error message when rejected
+    def broadcast(self, raw_hex: str) -> tuple[str | None, str | None]:
+        tx = Transaction.from_hex(raw_hex)
+        if tx is None:
+            return None, "invalid transaction hex"
+        return tx.txid(), self._accept(tx, check_inputs=True)
+
+    # Mine every mempool transaction into a new block
+    def mine(self) -> dict:
+        with self._lock:
+            self.height += 1
+            txids = list(self.mempool)
+            self.mempool.clear()
+            for txid in txids:
+                self.heights[txid] = self.height
+            previous = self.headers[-1]["hash"] if self.headers else "00" * 32
+            header = {
+                "height": self.height,
+                "hash": hashlib.sha256(f"{previous}{self.height}".encode()).hexdigest(),
+                "merkleroot": _merkle_root(txids),
+                "previousblockhash": previous,
+                "time": int(time.time()),
+            }
+            self.headers.append(header)
+        return header
+
+    # List unspent outputs of an address
+    def unspent(self, address: str) -> list[dict]:
+        locking_script = P2PKH().lock(address).hex()
+        with self._lock:
+            return [
+                {"tx_hash": txid, "tx_pos": vout, "value": value, "height": self.heights.get(txid, -1)}
+                for (txid, vout), (script, value) in self.utxos.items()
+                if script == locking_script
+            ]
+
+    # Split the balance of an address between confirmed and unconfirmed outputs
+    def balance(self, address: str) -> dict:
+        confirmed = unconfirmed = 0
+        for utxo in self.unspent(address):
+            if utxo["height"] > 0:
+                confirmed += utxo["value"]
+            else:
+                unconfirmed += utxo["value"]
+        return {"confirmed": confirmed, "unconfirmed": unconfirmed}
+
+    # Describe a transaction the way WhatsOnChain does
+    def tx_info(self, txid: str) -> dict | None:
+        raw_hex = self.transactions.get(txid)
+        if raw_hex is None:
+            return None
+        tx = Transaction.from_hex(raw_hex)
+        height = self.heights.get(txid, -1)
+        header = next((h for h in self.headers if h["height"] == height), None)
+        return {
+            "txid": txid,
+            "blockheight": height,
+            "blocktime": header["time"] if header else None,
+            "time": header["time"] if header else int(time.time()),
+            "confirmations": self.height - height + 1 if height > 0 else 0,
+            "vout": [
+                {
+                    "n": n,
+                    "value": output.satoshis / 100000000,
+                    "scriptPubKey": {"hex": output.locking_script.hex(), "addresses": _addresses(output)},
+                }
+                for n, output in enumerate(tx.outputs)
+            ],
+        }
+
+    # Add a transaction to the mempool and update the UTXO set
+    def _accept(self, tx: Transaction, check_inputs: bool) -> str | None:
+        txid = tx.txid()
+        with self._lock:
+            if txid in self.transactions:
+                # Already known, broadcasting again is not an error
+                return None
+            spent = [(tx_input.source_txid, tx_input.source_output_index) for tx_input in tx.inputs]
+            if check_inputs and any(outpoint not in self.utxos for outpoint in spent):
+                return "Missing inputs"
+            for outpoint in spent:
+                self.utxos.pop(outpoint, None)
+            for vout, output in enumerate(tx.outputs):
+                if output.satoshis:
+                    self.utxos[(txid, vout)] = (output.locking_script.hex(), output.satoshis)
+            self.transactions[txid] = tx.hex()
+            self.heights[txid] = -1
+            self.mempool.append(txid)
+        return None
+
+    # Build the FastAPI application serving this stand-in
+    def create_app(self) -> FastAPI:
+        app = FastAPI()
+        chain = "/v1/bsv/main"
+
+        # Inject latency and errors on every request
+        @app.middleware("http")
+        async def inject_faults(request: Request, call_next):
+            if self.latency_ms:
+                await asyncio.sleep(self.latency_ms / 1000)
+            if self.error_rate and self._random.random() < self.error_rate:
+                return JSONResponse({"error": "injected failure"}, status_code=503)
+            return await call_next(request)
+
+        @app.get(chain + "/address/{address}/unspent/all")
+        async def unspent(address: str):
+            return {"address": address, "result": self.unspent(address)}
+
+        @app.get(chain + "/address/{address}/balance")
+        async def balance(address: str):
+            return self.balance(address)
+
+        @app.post(chain + "/addresses/balance")
+        async def balances(body: dict):
+            return [{"address": address, "balance": self.balance(address)} for address in body.get("addresses", [])]
+
+        @app.get(chain + "/tx/{txid}/hex")
+        async def tx_hex(txid: str):
+            raw_hex = self.transactions.get(txid)
+            if raw_hex is None:
+                return PlainTextResponse("not found", status_code=404)
+            return PlainTextResponse(raw_hex)
+
+        @app.get(chain + "/tx/{txid}")
+        async def tx(txid: str):
+            info = self.tx_info(txid)
+            if info is None:
+                return JSONResponse({"error": "unknown"}, status_code=404)
+            return info
+
+        @app.post(chain + "/tx/broadcast")
+        async def broadcast(raw_hexes: list[str]):
+            results = []
+            for raw_hex in raw_hexes:
+                txid, error = self.broadcast(raw_hex)
+                results.append({"txid": txid, "error": error or ""})
+            return results
+
+        @app.post(chain + "/txs/status")
+        async def txs_status(body: dict):
+            results = []
+            for txid in body.get("txids", []):
+                if txid not in self.transactions:
+                    results.append({"txid": txid, "error": "unknown"})
+                    continue
+                height = self.heights[txid]
+                results.append({
+                    "txid": txid,
+                    "blockheight": height if height > 0 else None,
+                    "confirmations": self.height - height + 1 if height > 0 else 0,
+                })
+            return results
+
+        @app.get(chain + "/block/headers")
+        async def block_headers():
+            return list(reversed(self.headers[-10:]))
+
+        @app.get(chain + "/block/{height}/header")
+        async def block_header(height: int):
+            header = next((h for h in self.headers if h["height"] == height), None)
+            if header is None:
+                return JSONResponse({"error": "unknown"}, status_code=404)
+            return header
+
+        @app.get("/api/v3/simple/price")
+        async def price():
+            return {"bitcoin-cash-sv": {"eur": self.price_eur}}
+
+        # Stand-in only endpoints to fund addresses and mine blocks
+        @app.post("/faucet")
+        async def faucet(body: dict):
+            return {"txid": self.fund(body["address"], int(body["satoshis"]))}
+
+        @app.post("/mine")
+        async def mine():
+            return self.mine()
+
+        return app
+
+
+# Run a stand-in server in a background thread, usable as a test or benchmark fixture
+@contextmanager
+def run_chain_stand_in(stand_in: ChainStandIn, host: str = "127.0.0.1", port: int = 8765) -> Iterator[str]:
+    server = uvicorn.Server(uvicorn.Config(stand_in.create_app(), host=host, port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.01)
+    try:
+        yield f"http://{host}:{port}"
+    finally:
+        server.should_exit = True
+        thread.join()
+
+
+# Helper function to compute the merkle root of a block from its txids
+def _merkle_root(txids: list[str]) -> str:
+    if not txids:
+        return "00" * 32
+    level = [bytes.fromhex(txid)[::-1] for txid in txids]
+    while len(level) > 1:
+        if len(level) % 2:
+            level.append(level[-1])
+        level = [
+            hashlib.sha256(hashlib.sha256(level[i] + level[i + 1]).digest()).digest()
+            for i in range(0, len(level), 2)
+        ]
+    return level[0][::-1].hex()
+
+
+# Helper function to get the P2PKH address paid by an output
+def _addresses(output: TransactionOutput) -> list[str]:
+    script = output.locking_script.hex()
+    if len(script) == 50 and script.startswith("76a914") and script.endswith("88ac"):
+        return [base58check_encode(ADDRESS_MAINNET_PREFIX + bytes.fromhex(script[6:46]))]
+    return []
+
+
+# Main function to run the stand-in server from the command line
+def main():
+    parser = argparse.ArgumentParser(description="Run a local WhatsOnChain/CoinGecko stand-in server.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--price-eur", type=float, default=50.0)
+    args = parser.parse_args()
+
+    stand_in = ChainStandIn(
+        latency_ms=args.latency_ms,
+        error_rate=args.error_rate,
+        seed=args.seed,
+        price_eur=args.price_eur,
+    )
+    print(f"⛓️  Chain stand-in on http://{args.host}:{args.port} "
+          f"(set WOC_BASE_URL=http://{args.host}:{args.port}/v1 and COINGECKO_BASE_URL=http://{args.host}:{args.port}/api/v3)")
+    uvicorn.run(stand_in.create_app(), host=args.host, port=args.port, log_level="warning")
+
+
+# Entry point to run the script
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+import argparse
+import asyncio
+import sys
+import os
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+from bson import ObjectId
+
+# Add the project root to the Python path to enable imports from the app directory
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+from app.config.mongo import MongoDbClient
+from app.models.meter_reading import MeterReading
+from app.models.user import User
+from app.services.wallet_service import WalletService
+
+# Hourly consumption factor for each hour of the day (same profile as SimulateMeter)
+HOUR_FACTORS = np.array([0.3] * 6 + [1.2] * 3 + [0.7] * 8 + [1.7] * 5 + [0.9] * 2)
+# Seasonal factor for each month, index 0 is January
+SEASON_FACTORS = np.array([1.3, 1.3, 1.0, 1.0, 1.0, 0.8, 0.8, 0.8, 1.0, 1.0, 1.0, 1.3])
+
+
+# Simulate hourly kWh for many timestamps at once
+def simulate_hourly_kwh(
+    hours: np.ndarray,
+    months: np.ndarray,
+    base_hourly_kwh: float,
+    rng: np.random.Generator,
+) -> np.ndarray:
+    """
+    Vectorised version of the hourly profile:
+    - More consumption 18:00–22:00, secondary peak 7:00–9:00, less at night.
+    - Winter consumes a bit more, summer a bit less.
+    - Random noise ±20%, and never below 10% of the base load.
+    """
+    noise = rng.uniform(0.8, 1.2, size=hours.shape[0])
+    kw = base_hourly_kwh * HOUR_FACTORS[hours] * SEASON_FACTORS[months] * noise
+    return np.round(np.maximum(kw, base_hourly_kwh * 0.1), 3)
+
+
+# DatasetGenerator writes production-scale meter readings with chunked, concurrent bulk inserts
+class DatasetGenerator:
+
+    def __init__(
+        self,
+        db,
+        chunk_size: int = 10000,
+        concurrency: int = 8,
+        with_cost: bool = True,
+        seed: int = 0,
+    ):
+        self.db = db
+        self.chunk_size = chunk_size
+        self.with_cost = with_cost
+        self.rng = np.random.default_rng(seed)
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._tasks: list[asyncio.Task] = []
+        self.inserted = 0
+
+    # Insert synthetic users and return their (id, tariff) pairs
+    async def create_users(self, count: int, real_wallets: bool = False) -> list[tuple[ObjectId, float]]:
+        tariffs = np.round(self.rng.uniform(0.10, 0.30, size=count), 4).tolist()
+        now = datetime.now()
+        users = []
+        for i, tariff in enumerate(tariffs):
+            if real_wallets:
+                wallet = WalletService.create_wallet().model_dump()
+            else:
+                # Empty wallet, the app skips balance lookups for users without address
+                wallet = {"bsv_address": "", "bsv_public_key": "", "encrypted_wif": ""}
+            users.append({
+                "_id": ObjectId(),
+                "name": f"Dataset User {i}",
+                "email": f"dataset.user.{i}@example.com",
+                "created_at": now,
+                "user_wallet": wallet,
+                "tariff": tariff,
+                "preferred_currency": "EUR",
+            })
+
+        collection = self.db[User.Settings.name]
+        for start in range(0, len(users), self.chunk_size):
+            await collection.insert_many(users[start:start + self.chunk_size], ordered=False)
+        return [(user["_id"], user["tariff"]) for user in users]
+
+    # Generate hourly readings for every user between two dates
+    async def generate_readings(
+        self,
+        users: list[tuple[ObjectId, float]],
+        start: datetime,
+        end: datetime,
+        avg_daily_kwh: tuple[float, float] = (8.0, 25.0),
+    ) -> int:
+        # Timestamps and their hour/month indices are shared by every user
+        timestamps = np.arange(
+            np.datetime64(start.replace(minute=0, second=0, microsecond=0), "h"),
+            np.datetime64(end, "h") + 1,
+            dtype="datetime64[h]",
+        )
+        hours = (timestamps.astype(np.int64) % 24).astype(np.intp)
+        months = (timestamps.astype("datetime64[M]").astype(np.int64) % 12).astype(np.intp)
+        timestamp_list = timestamps.astype("datetime64[us]").tolist()
+
+        base_loads = self.rng.uniform(*avg_daily_kwh, size=len(users)) / 24.0
+        for (user_id, tariff), base_hourly_kwh in zip(users, base_loads):
+            kw = simulate_hourly_kwh(hours, months, float(base_hourly_kwh), self.rng)
+            await self._write_user(user_id, tariff, timestamp_list, kw)
+
+        await asyncio.gather(*self._tasks)
+        self._tasks.clear()
+        return self.inserted
+
+    # Build the documents of a user and queue their chunks for insertion
+    async def _write_user(self, user_id: ObjectId, tariff: float, timestamps: list, kw: np.ndarray) -> None:
+        meter_id = f"meter_{user_id}"
+        kw_list = kw.tolist()
+        if self.with_cost:
+            cost_list = np.round(kw * tariff, 4).tolist()
+            documents = [
+                {"user_id": user_id, "meter_id": meter_id, "kw_consumed": k, "cost_euro": c, "timestamp": t}
+                for t, k, c in zip(timestamps, kw_list, cost_list)
+            ]
+        else:
+            documents = [
+                {"user_id": user_id, "meter_id": meter_id, "kw_consumed": k, "timestamp": t}
+                for t, k in zip(timestamps, kw_list)
+            ]
+
+        for start in range(0, len(documents), self.chunk_size):
+            # Wait for a free slot, so at most `concurrency` chunks are in memory and in flight
+            await self._semaphore.acquire()
+            self._tasks.append(asyncio.create_task(self._insert_chunk(documents[start:start + self.chunk_size])))
+
+    # Insert a chunk with an unordered raw bulk insert
+    async def _insert_chunk(self, documents: list[dict]) -> None:
+        try:
+            result = await self.db[MeterReading.Settings.name].insert_many(documents, ordered=False)
+            self.inserted += len(result.inserted_ids)
+        finally:
+            self._semaphore.release()
+
+
+# Main asynchronous function to run the generator from the command line
+async def main():
+    parser = argparse.ArgumentParser(description="Generate production-scale users and hourly meter readings.")
+    parser.add_argument("--users", type=int, default=1000, help="Number of synthetic users to create")
+    parser.add_argument("--real-wallets", action="store_true", help="Create real encrypted BSV wallets")
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--chunk-size", type=int, default=10000)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--no-cost", action="store_true", help="Do not compute cost_euro from the tariff")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--database", default="hackaton_web3_db")
+    args = parser.parse_args()
+
+    client = MongoDbClient(database_name=args.database)
+    generator = DatasetGenerator(
+        client.client[client.database_name],
+        chunk_size=args.chunk_size,
+        concurrency=args.concurrency,
+        with_cost=not args.no_cost,
+        seed=args.seed,
+    )
+
+    end = datetime.now().replace(minute=0, second=0, microsecond=0)
+    started = time.perf_counter()
+    users = await generator.create_users(args.users, real_wallets=args.real_wallets)
+    inserted = await generator.generate_readings(users, end - timedelta(days=args.days), end)
+    elapsed = time.perf_counter() - started
+    print(f"Inserted {len(users)} users and {inserted} readings in {elapsed:.1f}s ({inserted / elapsed:.0f} docs/s).")
+
+    await client.close()
+
+
+# Entry point to run the script
+if __name__ == "__main__":
+    asyncio.run(main())
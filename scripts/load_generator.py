@@ -0,0 +1,252 @@
+import argparse
+import asyncio
+import json
+import random
+import sys
+import os
+import time
+from datetime import datetime, timedelta
+import httpx
+
+# Add the project root to the Python path to enable imports from the scripts directory
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+from scripts.simulate_meter import SimulateMeter
+
+
+# EndpointStats collects latencies and errors for a single endpoint
+class EndpointStats:
+
+    def __init__(self):
+        self.latencies_ms: list[float] = []
+        self.errors: dict[str, int] = {}
+
+    # Record the outcome of a request
+    def record(self, latency_ms: float, error: str | None = None) -> None:
+        self.latencies_ms.append(latency_ms)
+        if error is not None:
+            self.errors[error] = self.errors.get(error, 0) + 1
+
+    # Summarise latency percentiles, error rate and throughput
+    def summary(self, duration_seconds: float) -> dict:
+        latencies = sorted(self.latencies_ms)
+        count = len(latencies)
+        error_count = sum(self.errors.values())
+        return {
+            "requests": count,
+            "errors": error_count,
+            "error_rate": error_count / count if count else 0.0,
+            "throughput_rps": count / duration_seconds if duration_seconds else 0.0,
+            "p50_ms": _percentile(latencies, 50),
+            "p90_ms": _percentile(latencies, 90),
+            "p95_ms": _percentile(latencies, 95),
+            "p99_ms": _percentile(latencies, 99),
+            "max_ms": latencies[-1] if latencies else 0.0,
+            "errors_by_kind": self.errors,
+        }
+
+
+# LoadGenerator simulates a fleet of meters posting readings plus users reading their dashboards
+class LoadGenerator:
+
+    def __init__(
+        self,
+        base_url: str,
+        user_ids: list[str],
+        meters: int,
+        pattern: str = "herd",
+        interval_seconds: float = 60.0,
+        herd_window_seconds: float = 2.0,
+        read_ratio: float = 0.1,
+        concurrency: int = 500,
+        timeout_seconds: float = 30.0,
+    ):
+        self.base_url = base_url.rstrip("/")
+        self.pattern = pattern
+        # One simulated hour of consumption per interval
+        self.interval_seconds = interval_seconds
+        self.herd_window_seconds = herd_window_seconds
+        self.read_ratio = read_ratio
+        self.timeout_seconds = timeout_seconds
+        self.stats: dict[str, EndpointStats] = {}
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+        # Each meter reuses the SimulateMeter consumption profile with its own base load
+        self.meters: list[tuple[str, SimulateMeter]] = []
+        for i in range(meters):
+            meter = SimulateMeter()
+            meter.meter_id = f"meter_{i:06d}"
+            meter.base_hourly_kwh = random.uniform(0.3, 1.2)
+            self.meters.append((user_ids[i % len(user_ids)], meter))
+
+    # Run the load for the given duration and return the per-endpoint summary
+    async def run(self, duration_seconds: float) -> dict:
+        started = time.perf_counter()
+        deadline = started + duration_seconds
+        async with httpx.AsyncClient(timeout=self.timeout_seconds, limits=self._limits) as client:
+            await asyncio.gather(*[
+                self._run_meter(client, index, user_id, meter, started, deadline)
+                for index, (user_id, meter) in enumerate(self.meters)
+            ])
+        elapsed = time.perf_counter() - started
+        return {endpoint: stats.summary(elapsed) for endpoint, stats in sorted(self.stats.items())}
+
+    # Post readings for a single meter following the arrival pattern
+    async def _run_meter(
+        self,
+        client: httpx.AsyncClient,
+        index: int,
+        user_id: str,
+        meter: SimulateMeter,
+        started: float,
+        deadline: float,
+    ) -> None:
+        simulated_hour = datetime.now().replace(minute=0, second=0, microsecond=0)
+        round_number = 0
+        send_at = started
+        while True:
+            send_at = self._next_send_at(index, round_number, started, send_at)
+            if send_at >= deadline:
+                return
+            await asyncio.sleep(max(send_at - time.perf_counter(), 0))
+
+            kw = meter.simulate_hourly_kwh(simulated_hour + timedelta(hours=round_number))
+            await self._request(client, "POST /meter", "POST", "/meter", json={
+                "user_id": user_id,
+                "meter_id": meter.meter_id,
+                "reading": round(kw, 3),
+            })
+
+            # Some users look at their dashboard after a new reading
+            if random.random() < self.read_ratio:
+                await self._request(client, "GET /user/{user_id}", "GET", f"/user/{user_id}")
+                await self._request(client, "GET /meter/chart", "GET", "/meter/chart", params={
+                    "user_id": user_id,
+                    "step": "daily",
+                })
+            round_number += 1
+
+    # Time at which a meter sends its reading for a round
+    def _next_send_at(self, index: int, round_number: int, started: float, previous: float) -> float:
+        if self.pattern == "poisson":
+            # Independent random arrivals, one reading per interval on average
+            return previous + random.expovariate(1.0 / self.interval_seconds)
+        round_start = started + round_number * self.interval_seconds
+        if self.pattern == "herd":
+            # Every meter fires right after the top of the (simulated) hour
+            return round_start + random.uniform(0, self.herd_window_seconds)
+        # Uniform: meters evenly spread over the interval
+        return round_start + self.interval_seconds * index / len(self.meters)
+
+    # Send a request and record its latency and outcome
+    async def _request(self, client: httpx.AsyncClient, endpoint: str, method: str, path: str, **kwargs) -> None:
+        stats = self.stats.setdefault(endpoint, EndpointStats())
+        async with self._semaphore:
+            start = time.perf_counter()
+            try:
+                response = await client.request(method, f"{self.base_url}{path}", **kwargs)
+                error = str(response.status_code) if response.status_code >= 400 else None
+            except httpx.HTTPError as e:
+                error = type(e).__name__
+            stats.record((time.perf_counter() - start) * 1000, error)
+
+
+# Helper function to compute a percentile of sorted values
+def _percentile(sorted_values: list[float], percentile: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(int(round(percentile / 100 * (len(sorted_values) - 1))), len(sorted_values) - 1)
+    return sorted_values[index]
+
+
+# Create users through the API so meters have valid user IDs, at most `concurrency` at a time.
+# Failed creations are counted and reported, the load runs with the users that were created
+async def create_users(base_url: str, count: int, concurrency: int = 20) -> list[str]:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def create_user(client: httpx.AsyncClient, i: int) -> httpx.Response:
+        async with semaphore:
+            return await client.post(f"{base_url.rstrip('/')}/user", json={
+                "name": f"Load User {i}",
+                "email": f"load.user.{i}@example.com",
+            })
+
+    async with httpx.AsyncClient(timeout=30.0) as client:
+        responses = await asyncio.gather(*[create_user(client, i) for i in range(count)], return_exceptions=True)
+
+    user_ids = []
+    failures: dict[str, int] = {}
+    for response in responses:
+        if isinstance(response, Exception):
+            error = type(response).__name__
+        elif response.status_code >= 400:
+            error = str(response.status_code)
+        else:
+            user_ids.append(response.json()["id"])
+            continue
+        failures[error] = failures.get(error, 0) + 1
+    if failures:
+        print(f"⚠️ Failed to create {sum(failures.values())} of {count} users: {failures}")
+    return user_ids
+
+
+# Print the summary as a table
+def print_report(report: dict) -> None:
+    print(f"{'endpoint':<22}{'reqs':>8}{'err%':>8}{'rps':>9}{'p50':>9}{'p95':>9}{'p99':>9}{'max':>9}")
+    for endpoint, summary in report.items():
+        print(
+            f"{endpoint:<22}{summary['requests']:>8}{summary['error_rate'] * 100:>7.1f}%"
+            f"{summary['throughput_rps']:>9.1f}{summary['p50_ms']:>9.1f}{summary['p95_ms']:>9.1f}"
+            f"{summary['p99_ms']:>9.1f}{summary['max_ms']:>9.1f}"
+        )
+
+
+# Main asynchronous function to run the load generator from the command line
+async def main():
+    parser = argparse.ArgumentParser(description="Simulate a fleet of meters and users against the API.")
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--meters", type=int, default=1000)
+    parser.add_argument("--user-ids", help="File with one user ID per line")
+    parser.add_argument("--create-users", type=int, default=0, help="Create this many users before starting")
+    parser.add_argument("--create-concurrency", type=int, default=20, help="User creations in flight at once")
+    parser.add_argument("--pattern", choices=["herd", "uniform", "poisson"], default="herd")
+    parser.add_argument("--interval", type=float, default=60.0, help="Seconds per simulated hour")
+    parser.add_argument("--herd-window", type=float, default=2.0, help="Spread of the top-of-the-hour burst")
+    parser.add_argument("--read-ratio", type=float, default=0.1, help="Dashboard reads per reading")
+    parser.add_argument("--concurrency", type=int, default=500)
+    parser.add_argument("--duration", type=float, default=300.0)
+    parser.add_argument("--output", help="Write the JSON report to this file")
+    args = parser.parse_args()
+
+    user_ids: list[str] = []
+    if args.user_ids:
+        with open(args.user_ids) as f:
+            user_ids = [line.strip() for line in f if line.strip()]
+    if args.create_users:
+        user_ids += await create_users(args.base_url, args.create_users, args.create_concurrency)
+    if not user_ids:
+        parser.error("Provide --user-ids or --create-users")
+
+    generator = LoadGenerator(
+        base_url=args.base_url,
+        user_ids=user_ids,
+        meters=args.meters,
+        pattern=args.pattern,
+        interval_seconds=args.interval,
+        herd_window_seconds=args.herd_window,
+        read_ratio=args.read_ratio,
+        concurrency=args.concurrency,
+    )
+    print(f"🚀 Simulating {args.meters} meters for {len(user_ids)} users ({args.pattern}) against {args.base_url}")
+    report = await generator.run(args.duration)
+    print_report(report)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+# Entry point to run the script
+if __name__ == "__main__":
+    asyncio.run(main())
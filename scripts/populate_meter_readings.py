@@ -1,4 +1,5 @@
 import asyncio
+import random
 from datetime import datetime, timedelta
 from typing import Optional
 import sys
@@ -95,8 +96,6 @@ def _simulate_hourly_kwh(ts: datetime, base_hourly_kwh: float) -> float:
     - Winter consumes a bit more, summer a bit less.
     - A bit of random noise.
     """
-    import random
-
     hour = ts.hour
     month = ts.month
 
@@ -8,6 +8,11 @@ import httpx
 sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
 
 import asyncio
+from opentelemetry import propagate
+from opentelemetry.trace import SpanKind
+
+# Import tracing setup, readings start a trace the backend continues (traceparent header)
+from app.utils.tracing_utils import setup_tracing, tracer
 
 # SimulateMeter class: Manages meter properties, simulates hourly energy consumption, and posts readings to the backend API
 class SimulateMeter:
@@ -20,8 +25,8 @@ class SimulateMeter:
     meter_id = "meter_001"
     base_hourly_kwh = 0.75
 
-    # Post meter readings to the backend via HTTP
-    async def post_meter_reading(self, kw: float):
+    # Post meter readings to the backend via HTTP, reusing the given client when provided
+    async def post_meter_reading(self, kw: float, client: httpx.AsyncClient | None = None):
         url = "https://hackaton-web3-backend.vercel.app/meter"
         data = {
             "user_id": "692b9e2c0c45d7f4031812c4",
@@ -29,14 +34,21 @@ class SimulateMeter:
             "reading": kw,
         }
         try:
-            # Send POST request with 30-second timeout to handle potential cold starts
-            async with httpx.AsyncClient(timeout=30.0) as client:
-                response = await client.post(url, json=data)
-                print(f"📡 HTTP Response: {response.status_code}")
-                # Log response body for error debugging
-                if response.status_code >= 400:
-                    print(f"❌ Response body: {response.text}")
-                response.raise_for_status()
+            with tracer.start_as_current_span("meter.post_reading", kind=SpanKind.CLIENT):
+                # Propagate the trace context to the backend
+                headers = {}
+                propagate.inject(headers)
+                if client is None:
+                    # Send POST request with 30-second timeout to handle potential cold starts
+                    async with httpx.AsyncClient(timeout=30.0) as own_client:
+                        response = await own_client.post(url, json=data, headers=headers)
+                else:
+                    response = await client.post(url, json=data, headers=headers)
+            print(f"📡 HTTP Response: {response.status_code}")
+            # Log response body for error debugging
+            if response.status_code >= 400:
+                print(f"❌ Response body: {response.text}")
+            response.raise_for_status()
         except Exception as e:
             print(f"❌ Error posting meter reading: {type(e).__name__}: {e}")
             raise
@@ -84,22 +96,25 @@ class SimulateMeter:
 
 # Main asynchronous function: Runs the continuous meter simulation loop
 async def main():
+    setup_tracing(service_name="meter-simulator")
     simulator = SimulateMeter()
     print("🚀 Starting meter simulation in background...")
     print("📊 Simulating hourly readings.\n")
 
     try:
-        # Infinite loop to simulate continuous meter readings
-        while True:
-            now = datetime.now()
-            # Generate simulated kWh for current hour
-            kw = simulator.simulate_hourly_kwh(now)
-            # Post the reading to the backend API
-            await simulator.post_meter_reading(kw)
-            print(f"✅ [{now.strftime('%Y-%m-%d %H:%M:%S')}] Reading sent: {kw:.2f} kWh (hour: {now.hour})")
-            print("⏳ Waiting 1 hour for next simulation...\n")
-            # Sleep for 20 seconds (for testing; in production, use 3600 for 1 hour)
-            await asyncio.sleep(20)
+        # Keep a single connection open across readings (30-second timeout for cold starts)
+        async with httpx.AsyncClient(timeout=30.0) as client:
+            # Infinite loop to simulate continuous meter readings
+            while True:
+                now = datetime.now()
+                # Generate simulated kWh for current hour
+                kw = simulator.simulate_hourly_kwh(now)
+                # Post the reading to the backend API
+                await simulator.post_meter_reading(kw, client)
+                print(f"✅ [{now.strftime('%Y-%m-%d %H:%M:%S')}] Reading sent: {kw:.2f} kWh (hour: {now.hour})")
+                print("⏳ Waiting 1 hour for next simulation...\n")
+                # Sleep for 20 seconds (for testing; in production, use 3600 for 1 hour)
+                await asyncio.sleep(20)
     except Exception as e:
         print(f"❌ Simulation error: {e}")
 
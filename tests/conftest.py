@@ -0,0 +1,96 @@
+import os
+import socket
+import sys
+
+# Add the project root to the Python path to enable imports from the app and scripts directories
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+# Trace into memory before the app is imported, so tests can assert on finished spans
+os.environ.setdefault("TRACING_ENABLED", "true")
+os.environ.setdefault("TRACING_EXPORTER", "memory")
+
+from contextlib import asynccontextmanager
+import pytest
+from fastapi.testclient import TestClient
+from pymongo import MongoClient
+
+# Import settings and database client
+from app.config.settings import settings
+from app.config.mongo import MongoDbClient
+# Import application and in-memory span exporter (the application sets up tracing on import)
+from app.main import app
+from app.utils.tracing_utils import memory_exporter
+# Import WhatsOnChain utilities, pointed at the chain stand-in
+from app.utils.whatsonchain_utils import WhatsOnChainUtils
+# Import chain stand-in (in-memory WhatsOnChain and CoinGecko server)
+from scripts.chain_stand_in import ChainStandIn, run_chain_stand_in
+
+# Database used by the tests, dropped before and after the session
+TEST_DATABASE = "test_hackaton_web3_db"
+
+
+# Spans finished during a test
+@pytest.fixture
+def spans():
+    memory_exporter.clear()
+    yield memory_exporter
+    memory_exporter.clear()
+
+
+# Test database (synchronous client, to seed data), tests using it are skipped without MongoDB
+@pytest.fixture(scope="session")
+def database():
+    client = MongoClient(settings.MONGODB_URL, serverSelectionTimeoutMS=1000)
+    try:
+        client.admin.command("ping")
+    except Exception:
+        client.close()
+        pytest.skip(f"MongoDB not reachable at {settings.MONGODB_URL}")
+    client.drop_database(TEST_DATABASE)
+    yield client[TEST_DATABASE]
+    client.drop_database(TEST_DATABASE)
+    client.close()
+
+
+# Lifespan initializing Beanie on the test database, for test apps (or around a test body)
+@pytest.fixture(scope="session")
+def test_lifespan(database):
+    @asynccontextmanager
+    async def lifespan(_app=None):
+        mongo_client = MongoDbClient(database_name=TEST_DATABASE)
+        await mongo_client.init()
+        try:
+            yield
+        finally:
+            await mongo_client.close()
+
+    return lifespan
+
+
+# API client on the test database, without the background services of the application lifespan
+@pytest.fixture(scope="session")
+def client(test_lifespan):
+    original_lifespan = app.router.lifespan_context
+    app.router.lifespan_context = test_lifespan
+    try:
+        with TestClient(app) as client:
+            yield client
+    finally:
+        app.router.lifespan_context = original_lifespan
+
+
+# Chain stand-in served on a free local port, with the WhatsOnChain and CoinGecko utilities pointed at it
+@pytest.fixture(scope="session")
+def chain():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    stand_in = ChainStandIn()
+    original_urls = WhatsOnChainUtils.BASE_URL, WhatsOnChainUtils.BASE_URL_GECKO
+    with run_chain_stand_in(stand_in, port=port) as base_url:
+        WhatsOnChainUtils.BASE_URL = f"{base_url}/v1"
+        WhatsOnChainUtils.BASE_URL_GECKO = f"{base_url}/api/v3"
+        try:
+            yield stand_in
+        finally:
+            WhatsOnChainUtils.BASE_URL, WhatsOnChainUtils.BASE_URL_GECKO = original_urls
@@ -0,0 +1,109 @@
+import asyncio
+from bsv import P2PKH, PrivateKey, Transaction, TransactionInput, TransactionOutput
+
+# Import broadcaster
+from app.services.broadcast_service import TransactionBroadcaster
+
+
+# Helper function to sign a transaction spending a new funding output of the stand-in
+def _signed_transaction(chain, satoshis: int = 1000) -> Transaction:
+    key = PrivateKey()
+    funding_txid = chain.fund(key.address(), satoshis)
+    tx = Transaction(
+        tx_inputs=[TransactionInput(
+            source_transaction=Transaction.from_hex(chain.transactions[funding_txid]),
+            source_txid=funding_txid,
+            source_output_index=0,
+            unlocking_script_template=P2PKH().unlock(key),
+        )],
+        tx_outputs=[TransactionOutput(locking_script=P2PKH().lock(PrivateKey().address()), satoshis=satoshis - 100)],
+        version=1,
+    )
+    tx.sign()
+    return tx
+
+
+# Signed transaction stand-in the chain cannot parse, the broadcaster only reads its txid and hex
+class _UnparsableTransaction:
+
+    def txid(self) -> str:
+        return "ab" * 32
+
+    def hex(self) -> str:
+        return "00"
+
+
+# A broadcast transaction is accepted by the chain and its txid returned
+def test_broadcast_reaches_chain(chain):
+    tx = _signed_transaction(chain)
+
+    async def broadcast() -> str:
+        return await TransactionBroadcaster(batch_size=10, max_delay_seconds=0.01).broadcast(tx)
+
+    assert asyncio.run(broadcast()) == tx.txid()
+    assert tx.txid() in chain.mempool
+
+
+# Transactions queued within the window are sent in one batch, a transaction queued twice is sent once
+def test_broadcast_batches_and_dedupes(chain, spans):
+    txs = [_signed_transaction(chain) for _ in range(3)]
+
+    async def broadcast() -> list[str]:
+        broadcaster = TransactionBroadcaster(batch_size=10, max_delay_seconds=0.05)
+        return await asyncio.gather(*[broadcaster.broadcast(tx) for tx in [*txs, txs[0]]])
+
+    assert asyncio.run(broadcast()) == [tx.txid() for tx in [*txs, txs[0]]]
+    batches = [span for span in spans.get_finished_spans() if span.name == "broadcast.send_batch"]
+    assert [span.attributes["bsv.batch_size"] for span in batches] == [3]
+    assert all(tx.txid() in chain.mempool for tx in txs)
+
+
+# A full batch is sent before the window closes
+def test_broadcast_sends_full_batch_early(chain):
+    txs = [_signed_transaction(chain) for _ in range(2)]
+
+    async def broadcast() -> list[str]:
+        broadcaster = TransactionBroadcaster(batch_size=2, max_delay_seconds=30.0)
+        return await asyncio.wait_for(asyncio.gather(*[broadcaster.broadcast(tx) for tx in txs]), timeout=5.0)
+
+    assert asyncio.run(broadcast()) == [tx.txid() for tx in txs]
+
+
+# Each caller gets the outcome of its own transaction: rejected, missing from the feedback or accepted
+def test_broadcast_failures(chain):
+    accepted = _signed_transaction(chain)
+    double_spend = _signed_transaction(chain)
+    # Spends the funding output of the first transaction again
+    double_spend.inputs = accepted.inputs
+    double_spend.outputs[0].satoshis -= 1
+    double_spend.sign()
+
+    async def broadcast() -> list:
+        broadcaster = TransactionBroadcaster(batch_size=10, max_delay_seconds=0.05)
+        first = await broadcaster.broadcast(accepted)
+        return [first, *await asyncio.gather(
+            broadcaster.broadcast(double_spend), broadcaster.broadcast(_UnparsableTransaction()), return_exceptions=True,
+        )]
+
+    first, rejected, unknown = asyncio.run(broadcast())
+    assert first == accepted.txid()
+    assert "Missing inputs" in str(rejected)
+    assert "status unknown" in str(unknown)
+
+
+# Cancelling the caller that filled a batch does not interrupt the batch of the other callers
+def test_broadcast_survives_cancelled_caller(chain):
+    txs = [_signed_transaction(chain) for _ in range(2)]
+
+    async def broadcast() -> str:
+        broadcaster = TransactionBroadcaster(batch_size=2, max_delay_seconds=30.0)
+        waiting = asyncio.create_task(broadcaster.broadcast(txs[0]))
+        filling = asyncio.create_task(broadcaster.broadcast(txs[1]))
+        # Let the batch be sent, then cancel the caller that filled it
+        for _ in range(3):
+            await asyncio.sleep(0)
+        filling.cancel()
+        return await asyncio.wait_for(waiting, timeout=5.0)
+
+    assert asyncio.run(broadcast()) == txs[0].txid()
+    assert all(tx.txid() in chain.mempool for tx in txs)
@@ -0,0 +1,49 @@
+import asyncio
+from datetime import datetime
+from bson import ObjectId
+
+# Import chart step
+from app.dtos.meter.meter_request import StepEnum
+# Import chart pipeline, the chart points of live readings must match its points
+from app.models.meter_reading import MeterReading
+from app.services.meter_service import MeterService
+# Import live event hub
+from app.utils.live_events_utils import LiveEventHub
+
+
+# A reading reaches each dashboard as the delta of its chart point, for the step of that dashboard
+def test_reading_is_published_as_chart_point_delta():
+    hub = LiveEventHub()
+
+    async def publish() -> list:
+        with hub.subscribe("user", StepEnum.HOURLY) as hourly, hub.subscribe("user", StepEnum.WEEKLY) as weekly:
+            hub.publish_reading("user", datetime(2026, 1, 7, 10, 40), 2.0, 0.3)
+            return [hourly.get_nowait(), weekly.get_nowait()]
+
+    (hourly_event, hourly_item), (weekly_event, weekly_item) = asyncio.run(publish())
+    assert hourly_event == weekly_event == "reading"
+    assert (hourly_item.timestamp, hourly_item.kw, hourly_item.price) == (datetime(2026, 1, 7, 10), 2.0, 0.3)
+    # Week 1 of 2026 counted from Sunday 4 January, placed on the Monday of ISO week 1
+    assert weekly_item.timestamp == datetime(2025, 12, 29)
+
+
+# Live chart points are the points the chart aggregation returns for the same readings
+def test_chart_points_match_chart_aggregation(test_lifespan, database):
+    user_id = ObjectId()
+    timestamps = [datetime(2026, 1, 1, 9, 30), datetime(2026, 1, 4, 0, 5), datetime(2026, 3, 15, 23, 59), datetime(2026, 12, 31, 12)]
+    database["meter_readings"].insert_many([
+        {"user_id": user_id, "meter_id": "m", "timestamp": timestamp, "kw_consumed": 1.0} for timestamp in timestamps
+    ])
+
+    async def chart_points(timestamp: datetime, step: StepEnum) -> list[datetime]:
+        pipeline = MeterService.build_chart_pipeline(str(user_id), timestamp.isoformat(), timestamp.isoformat(), step)
+        cursor = await MeterReading.get_pymongo_collection().aggregate(pipeline)
+        return [result["timestamp"] for result in await cursor.to_list()]
+
+    async def check() -> None:
+        async with test_lifespan():
+            for timestamp in timestamps:
+                for step in StepEnum:
+                    assert await chart_points(timestamp, step) == [LiveEventHub.chart_point(timestamp, step)]
+
+    asyncio.run(check())
@@ -0,0 +1,31 @@
+import asyncio
+from datetime import datetime
+from bson import ObjectId
+
+# Import usage counter consumer
+from app.services.meter_consumers_service import UsageCounterConsumer
+
+
+# A reading delivered twice (redelivered after a crash before the checkpoint) is counted once
+def test_usage_counter_counts_redelivered_reading_once(test_lifespan, database):
+    reading = {
+        "_id": ObjectId(),
+        "user_id": ObjectId(),
+        "timestamp": datetime(2026, 3, 14, 10),
+        "kw_consumed": 1.5,
+        "cost_euro": 0.3,
+    }
+
+    async def handle() -> None:
+        async with test_lifespan():
+            consumer = UsageCounterConsumer()
+            await consumer.handle(reading)
+            await consumer.handle(reading)
+            await consumer.handle({**reading, "_id": ObjectId(), "kw_consumed": 2.0})
+
+    asyncio.run(handle())
+
+    counter = database["usage_counters"].find_one({"user_id": reading["user_id"]})
+    assert counter["month"] == datetime(2026, 3, 1)
+    assert counter["kw_consumed"] == 3.5
+    assert counter["readings"] == 2
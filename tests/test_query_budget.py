@@ -0,0 +1,103 @@
+import base64
+import json
+import logging
+import os
+from datetime import datetime
+from bson import ObjectId
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+# Import balance service, stale balances are queued for a background refresh
+from app.services.balance_service import BalanceService
+# Import WhatsOnChain utilities, the payment check is replaced by the test
+from app.utils.whatsonchain_utils import WhatsOnChainUtils
+# Import query budget assertion, query counting middleware and the recorder fed by the MongoDB listener
+from app.utils.query_counter_utils import assert_query_budget, query_counter_middleware, record_mongo_command
+
+
+# GET /user/{id} reads the profile and the monthly usage, the balance is served from the stored one
+def test_get_user_query_budget(client, database):
+    user_id = database["users"].insert_one({
+        "name": "Budget User",
+        "email": "budget@example.com",
+        "created_at": datetime.now(),
+        "tariff": 0.15,
+        "user_wallet": {
+            "bsv_address": "1BudgetAddress",
+            "bsv_public_key": "",
+            "encrypted_wif": "",
+            "balance_satoshis": 1000,
+            "balance_euro": 0.5,
+            "balance_updated_at": None,
+        },
+    }).inserted_id
+    database["meter_readings"].insert_many([
+        {
+            "user_id": user_id,
+            "meter_id": "meter-1",
+            "kw_consumed": kw,
+            "cost_euro": kw * 0.15,
+            "payment_id": ObjectId(),
+            "timestamp": datetime.now(),
+        }
+        for kw in (1.5, 2.5)
+    ])
+
+    with assert_query_budget(mongo=2, http=0):
+        response = client.get(f"/user/{user_id}")
+
+    assert response.status_code == 200
+    assert response.json()["monthly_usage_kwh"] == 4.0
+    assert response.json()["balance_satoshis"] == 1000
+
+
+# The query counting middleware exposes the counts and logs query shapes repeated within a request
+def test_query_counter_middleware_logs_repeated_queries(caplog):
+    app = FastAPI()
+    app.middleware("http")(query_counter_middleware)
+
+    @app.get("/items")
+    async def items():
+        for item_id in range(3):
+            record_mongo_command("find", "items", {"filter": {"_id": item_id}})
+        return {}
+
+    with caplog.at_level(logging.WARNING, logger="app.utils.query_counter_utils"), TestClient(app) as client:
+        response = client.get("/items")
+
+    assert response.headers["X-Mongo-Queries"] == "3"
+    assert response.headers["X-HTTP-Calls"] == "0"
+    assert [record.getMessage() for record in caplog.records] == [
+        'Repeated query in GET /items: 3x find items {"_id": "?"}',
+    ]
+
+
+# GET /meter/chart/users adds up the stored balances, stale ones are refreshed in background
+def test_users_chart_uses_stored_balances(client, database, monkeypatch):
+    async def validate_transaction(*args, **kwargs):
+        return True
+
+    monkeypatch.setattr(WhatsOnChainUtils, "validate_transaction", staticmethod(validate_transaction))
+    database["users"].delete_many({})
+    user_id = database["users"].insert_one({
+        "name": "Stale Balance User",
+        "email": "stale@example.com",
+        "created_at": datetime.now(),
+        "tariff": 0.15,
+        "user_wallet": {
+            "bsv_address": "1StaleAddress",
+            "bsv_public_key": "",
+            "encrypted_wif": "",
+            "balance_satoshis": 2000,
+            "balance_euro": 1.25,
+            "balance_updated_at": None,
+        },
+    }).inserted_id
+    payment = base64.b64encode(json.dumps({"txid": os.urandom(32).hex()}).encode()).decode()
+
+    with assert_query_budget(http=0):
+        response = client.get("/meter/chart/users", headers={"X-PAYMENT": payment})
+
+    assert response.status_code == 200
+    assert response.json()["total_balance_euro"] == 1.25
+    assert user_id in BalanceService._pending
@@ -0,0 +1,76 @@
+import asyncio
+import pytest
+
+# Import rate limiter and circuit breaker used for WhatsOnChain requests
+from app.utils import resilience_utils
+from app.utils.resilience_utils import CircuitBreaker, CircuitOpenError, Priority, PriorityRateLimiter
+from app.utils.resilience_utils import RateLimitQueueFull
+
+
+# Requests waiting for a token are served by priority, then in arrival order
+def test_rate_limiter_serves_by_priority():
+    async def run() -> list[str]:
+        limiter = PriorityRateLimiter("test", rate=20.0, burst=1, max_queue=10)
+        # Take the only token, every request below has to wait
+        await limiter.acquire()
+        served = []
+
+        async def request(name: str, priority: Priority) -> None:
+            await limiter.acquire(priority)
+            served.append(name)
+
+        await asyncio.gather(
+            request("low", Priority.LOW),
+            request("normal-1", Priority.NORMAL),
+            request("high", Priority.HIGH),
+            request("normal-2", Priority.NORMAL),
+        )
+        return served
+
+    assert asyncio.run(run()) == ["high", "normal-1", "normal-2", "low"]
+
+
+# Requests beyond the queue size are rejected instead of waiting
+def test_rate_limiter_rejects_when_queue_full():
+    async def run() -> None:
+        limiter = PriorityRateLimiter("test", rate=1.0, burst=1, max_queue=1)
+        await limiter.acquire()
+        waiting = asyncio.create_task(limiter.acquire())
+        await asyncio.sleep(0)
+        with pytest.raises(RateLimitQueueFull):
+            await limiter.acquire()
+        waiting.cancel()
+
+    asyncio.run(run())
+
+
+# Closed until the failure threshold, open for the reset period, then a single half-open trial
+def test_circuit_breaker_transitions(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(resilience_utils.time, "monotonic", lambda: now[0])
+    breaker = CircuitBreaker("test", failure_threshold=2, reset_seconds=10.0)
+
+    breaker.check()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.CLOSED
+    breaker.check()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.check()
+
+    # After the reset period, one trial request goes through and the others are still rejected
+    now[0] += 10.0
+    breaker.check()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.check()
+
+    # A failed trial opens it again, a successful one closes it
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    now[0] += 10.0
+    breaker.check()
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+    breaker.check()
@@ -0,0 +1,109 @@
+import asyncio
+import os
+from datetime import datetime, timedelta
+from bson import ObjectId
+
+# Import settings
+from app.config.settings import settings
+# Import chart pipeline and step
+from app.models.meter_reading import MeterReading
+from app.dtos.meter.meter_request import StepEnum
+from app.services.meter_service import MeterService
+# Import retention service
+from app.services.retention_service import RetentionService
+
+
+# A reading backfilled into a compacted month is archived and added to the rollups before it is deleted
+def test_compaction_keeps_late_readings(test_lifespan, database, tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "RETENTION_RAW_MONTHS", 1)
+    monkeypatch.setattr(settings, "RETENTION_ARCHIVE_DIR", str(tmp_path))
+    database["meter_readings"].delete_many({})
+    database["meter_rollups"].delete_many({})
+    database["retention_watermarks"].delete_many({})
+    user_id = ObjectId()
+    database["meter_readings"].insert_many([
+        {"user_id": user_id, "meter_id": "m", "timestamp": datetime(2026, 1, 5, hour), "kw_consumed": 1.0, "cost_euro": 0.2}
+        for hour in range(3)
+    ])
+
+    def age_watermark() -> None:
+        database["retention_watermarks"].update_one({}, {"$set": {"updated_at": datetime.now() - timedelta(days=1)}})
+
+    async def compact() -> int:
+        async with test_lifespan():
+            return await RetentionService.compact_readings(now=datetime(2026, 3, 10))
+
+    assert asyncio.run(compact()) == 0
+    # Backfilled once January is archived, before and after its archived readings are deleted
+    database["meter_readings"].insert_one(
+        {"user_id": user_id, "meter_id": "m", "timestamp": datetime(2026, 1, 5, 1, 30), "kw_consumed": 2.0, "cost_euro": 0.4}
+    )
+    age_watermark()
+    assert asyncio.run(compact()) == 4
+    database["meter_readings"].insert_one(
+        {"user_id": user_id, "meter_id": "m", "timestamp": datetime(2026, 1, 6, 8), "kw_consumed": 5.0, "cost_euro": 1.0}
+    )
+    age_watermark()
+    assert asyncio.run(compact()) == 1
+    age_watermark()
+    assert asyncio.run(compact()) == 0
+
+    assert database["meter_readings"].count_documents({"user_id": user_id}) == 0
+    first_day = database["meter_rollups"].find_one({"user_id": user_id, "day": datetime(2026, 1, 5)})
+    assert first_day["kw_consumed"] == 5.0
+    assert first_day["readings"] == 4
+    assert first_day["hourly_kw"][:3] == [1.0, 3.0, 1.0]
+    assert first_day["hourly_at"][1] == datetime(2026, 1, 5, 1)
+    second_day = database["meter_rollups"].find_one({"user_id": user_id, "day": datetime(2026, 1, 6)})
+    assert second_day["kw_consumed"] == 5.0
+    assert second_day["hourly_at"][8] == datetime(2026, 1, 6, 8)
+    archived = os.listdir(os.path.join(tmp_path, "meter_readings", "2026-01"))
+    assert len([name for name in archived if name.startswith("late-")]) == 2
+
+
+# Charts return the same points from rollups as from raw readings, with range bounds inside an hour
+def test_chart_from_rollups_matches_raw_readings(test_lifespan, database):
+    user_id = ObjectId()
+    database["meter_readings"].insert_many([
+        {"user_id": user_id, "meter_id": "m", "timestamp": timestamp, "kw_consumed": kw}
+        for timestamp, kw in [
+            (datetime(2026, 1, 4, 23, 50), 0.5),
+            (datetime(2026, 1, 5, 10), 1.0),
+            (datetime(2026, 1, 5, 10, 20), 2.0),
+            (datetime(2026, 1, 5, 10, 40), 4.0),
+            (datetime(2026, 1, 5, 11, 10), 8.0),
+            (datetime(2026, 1, 5, 12), 16.0),
+            (datetime(2026, 1, 5, 12, 45), 32.0),
+        ]
+    ])
+    ranges = [
+        ("2026-01-05T10:30:00", "2026-01-05T12:00:00"),
+        ("2026-01-05T10:15:00", "2026-01-05T10:30:00"),
+        ("2026-01-04T23:55:00", "2026-01-05T12:30:00"),
+        ("2026-01-04T00:00:00", "2026-01-06T00:00:00"),
+    ]
+
+    async def charts(compacted_before: datetime | None) -> list:
+        async with test_lifespan():
+            results = []
+            for start_date, end_date in ranges:
+                for step in (StepEnum.HOURLY, StepEnum.DAILY):
+                    pipeline = MeterService.build_chart_pipeline(str(user_id), start_date, end_date, step, compacted_before)
+                    cursor = await MeterReading.get_pymongo_collection().aggregate(pipeline)
+                    results.append(await cursor.to_list())
+            return results
+
+    async def compact() -> None:
+        async with test_lifespan():
+            await RetentionService.rollup({"user_id": user_id})
+
+    raw = asyncio.run(charts(None))
+    asyncio.run(compact())
+    database["meter_readings"].delete_many({"user_id": user_id})
+
+    assert asyncio.run(charts(datetime(2026, 2, 1))) == raw
+    assert raw[0] == [
+        {"_id": "2026-01-05 10", "kw": 4.0, "timestamp": datetime(2026, 1, 5, 10)},
+        {"_id": "2026-01-05 11", "kw": 8.0, "timestamp": datetime(2026, 1, 5, 11)},
+        {"_id": "2026-01-05 12", "kw": 16.0, "timestamp": datetime(2026, 1, 5, 12)},
+    ]
@@ -0,0 +1,43 @@
+import asyncio
+import time
+
+# Import scheduler
+from app.utils.scheduler_utils import Scheduler
+
+
+# A leader-only job still running when the lease is lost is cancelled, the scheduler keeps running
+def test_lease_loss_cancels_leader_jobs(monkeypatch):
+    async def run() -> None:
+        scheduler = Scheduler(lease_seconds=0.3)
+        leader = True
+
+        # Lease held in MongoDB until the test takes it away
+        async def try_acquire() -> None:
+            scheduler._leader_until = time.monotonic() + 10.0 if leader else 0.0
+
+        monkeypatch.setattr(scheduler, "_try_acquire", try_acquire)
+        started = asyncio.Event()
+        cancelled = asyncio.Event()
+
+        async def job() -> None:
+            started.set()
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+
+        scheduler.add_job("long", job, interval_seconds=60, jitter_seconds=0)
+        await try_acquire()
+        runner = asyncio.create_task(scheduler.run())
+        await asyncio.wait_for(started.wait(), 1)
+
+        leader = False
+        await asyncio.wait_for(cancelled.wait(), 1)
+        assert not scheduler.is_leader
+        assert not runner.done()
+
+        runner.cancel()
+        await asyncio.gather(runner, return_exceptions=True)
+
+    asyncio.run(run())
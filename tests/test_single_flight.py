@@ -0,0 +1,55 @@
+import asyncio
+
+# Import single-flight
+from app.utils.single_flight_utils import SingleFlight
+
+
+# Concurrent calls share one run, and a cancelled caller does not cancel the call of the others
+def test_single_flight_survives_cancelled_caller():
+    async def run() -> None:
+        flight = SingleFlight("test")
+        release = asyncio.Event()
+        runs = 0
+
+        async def fn() -> int:
+            nonlocal runs
+            runs += 1
+            await release.wait()
+            return runs
+
+        first = asyncio.create_task(flight.do("key", fn))
+        second = asyncio.create_task(flight.do("key", fn))
+        await asyncio.sleep(0)
+        first.cancel()
+        await asyncio.sleep(0)
+        release.set()
+
+        assert await second == 1
+        assert first.cancelled()
+        # Only concurrent calls are shared, a new call runs again
+        assert await flight.do("key", fn) == 2
+
+    asyncio.run(run())
+
+
+# A call is cancelled once every caller waiting for it was cancelled
+def test_single_flight_cancels_abandoned_call():
+    async def run() -> None:
+        flight = SingleFlight("test")
+        cancelled = asyncio.Event()
+
+        async def fn() -> None:
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+
+        caller = asyncio.create_task(flight.do("key", fn))
+        await asyncio.sleep(0)
+        caller.cancel()
+        await asyncio.wait_for(cancelled.wait(), 1)
+        await asyncio.sleep(0)
+        assert "key" not in flight._calls
+
+    asyncio.run(run())
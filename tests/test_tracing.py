@@ -0,0 +1,83 @@
+import asyncio
+from functools import partial
+import httpx
+from bson import ObjectId
+from opentelemetry.trace import SpanKind
+
+# Import alarm service and alarm projection
+from app.models.alarm import AlarmType, AlarmView
+from app.services.alarm_service import AlarmService
+# Import broadcaster, each batch it sends is traced
+from app.services.broadcast_service import TransactionBroadcaster
+# Import WhatsOnChain utilities module, its HTTP client is pointed at a mock transport
+from app.utils import whatsonchain_utils
+# Import application tracer
+from app.utils.tracing_utils import tracer
+
+
+# Signed transaction stand-in, the broadcaster only reads its txid and hex
+class _Transaction:
+
+    def __init__(self, txid: str):
+        self._txid = txid
+
+    def txid(self) -> str:
+        return self._txid
+
+    def hex(self) -> str:
+        return self._txid
+
+
+# A batch broadcast is a span with the size of the batch, around the client span of the chain request
+def test_broadcast_batch_spans(spans, monkeypatch):
+    def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(200, json=[{"txid": "a"}, {"txid": "b"}])
+
+    monkeypatch.setattr(
+        whatsonchain_utils, "AsyncClient", partial(httpx.AsyncClient, transport=httpx.MockTransport(handler))
+    )
+
+    async def broadcast():
+        broadcaster = TransactionBroadcaster(batch_size=2, max_delay_seconds=1.0)
+        return await asyncio.gather(broadcaster.broadcast(_Transaction("a")), broadcaster.broadcast(_Transaction("b")))
+
+    assert asyncio.run(broadcast()) == ["a", "b"]
+
+    finished = {span.name: span for span in spans.get_finished_spans()}
+    batch = finished["broadcast.send_batch"]
+    request = finished["chain broadcast"]
+    assert batch.attributes["bsv.batch_size"] == 2
+    assert request.parent.span_id == batch.context.span_id
+    assert request.kind == SpanKind.CLIENT
+    assert request.attributes["http.request.method"] == "POST"
+
+
+# Alarm checks record how many alarms were checked, and every history write is a child span
+def test_check_alarms_spans(spans, monkeypatch):
+    alarms = [
+        AlarmView(id=ObjectId(), threshold=1.0, type=AlarmType.ENERGY, active=True),
+        AlarmView(id=ObjectId(), threshold=10.0, type=AlarmType.ENERGY, active=True),
+    ]
+    logged = []
+
+    async def get_active_alarm_views_by_user(user_id):
+        return alarms
+
+    async def log_alarm_history(**kwargs):
+        logged.append(kwargs["alarm_id"])
+
+    monkeypatch.setattr(AlarmService, "get_active_alarm_views_by_user", staticmethod(get_active_alarm_views_by_user))
+    monkeypatch.setattr(AlarmService, "log_alarm_history", staticmethod(log_alarm_history))
+
+    async def check_alarms():
+        with tracer.start_as_current_span("meter.check_alarms"):
+            await AlarmService.check_reading(str(ObjectId()), str(ObjectId()), kw=5.0, price=0.75)
+
+    asyncio.run(check_alarms())
+
+    finished = spans.get_finished_spans()
+    parent = next(span for span in finished if span.name == "meter.check_alarms")
+    children = [span for span in finished if span.parent and span.parent.span_id == parent.context.span_id]
+    assert parent.attributes["alarm.count"] == 2
+    assert [span.name for span in children] == ["alarm.log_history"]
+    assert logged == [str(alarms[0].id)]
@@ -0,0 +1,149 @@
+import asyncio
+import base64
+import json
+import os
+import time
+from bsv import MerklePath, P2PKH, PrivateKey, Transaction, TransactionInput, TransactionOutput
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+
+# Import header store, proofs are checked against the headers it holds
+from app.utils.header_store_utils import header_store
+# Import paywall dependency and its 402 handler
+from app.utils.x402_utils import PaymentRequiredException, X402Paywall, payment_required_handler
+# Import WhatsOnChain utilities, the chain check is replaced by the tests
+from app.utils.whatsonchain_utils import WhatsOnChainUtils
+
+PAY_TO = "1BgGZ9tcN4rm9KBzDn7KprQz87SZ26SAMH"
+
+
+# Helper function to build an app with two routes, each behind its own paywall
+def _paywalled_app(lifespan) -> FastAPI:
+    app = FastAPI(lifespan=lifespan)
+    app.add_exception_handler(PaymentRequiredException, payment_required_handler)
+
+    @app.get("/first")
+    async def first(txid: str = Depends(X402Paywall(price_satoshis=100, pay_to=PAY_TO))):
+        return {"txid": txid}
+
+    @app.get("/second")
+    async def second(txid: str = Depends(X402Paywall(price_satoshis=100, pay_to=PAY_TO))):
+        return {"txid": txid}
+
+    return app
+
+
+# Helper function to build the X-PAYMENT header of a payment made with a txid or a BEEF transaction
+def _payment_header(txid: str | None = None, tx: Transaction | None = None) -> dict:
+    payment = {"txid": txid} if tx is None else {"beef": tx.to_beef().hex()}
+    return {"X-PAYMENT": base64.b64encode(json.dumps(payment).encode()).decode()}
+
+
+# Helper function to sign a payment to the paywall spending an output mined by the stand-in, with its proof
+def _beef_payment(chain) -> Transaction:
+    # Mine what other tests left in the mempool, the proof block holds the funding and one other transaction
+    chain.mine()
+    key = PrivateKey()
+    funding_txid = chain.fund(key.address(), 1000)
+    other_txid = chain.fund(PrivateKey().address(), 1000)
+    header = chain.mine()
+    header_store._remember(header["height"], header["merkleroot"])
+    funding = Transaction.from_hex(chain.transactions[funding_txid])
+    funding.merkle_path = MerklePath(header["height"], [[
+        {"offset": 0, "hash_str": funding_txid, "txid": True},
+        {"offset": 1, "hash_str": other_txid},
+    ]])
+    tx = Transaction(
+        tx_inputs=[TransactionInput(
+            source_transaction=funding,
+            source_txid=funding_txid,
+            source_output_index=0,
+            unlocking_script_template=P2PKH().unlock(key),
+        )],
+        tx_outputs=[
+            TransactionOutput(locking_script=P2PKH().lock(PAY_TO), satoshis=100),
+            TransactionOutput(locking_script=P2PKH().lock(key.address()), satoshis=800),
+        ],
+        version=1,
+    )
+    tx.sign()
+    return tx
+
+
+# Helper function to wait for a condition on data updated in the background
+def _eventually(condition) -> bool:
+    deadline = time.monotonic() + 5
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.02)
+    return True
+
+
+# A payment unlocks the route it paid for, and is rejected when replayed on another route
+def test_payment_replay_is_rejected(test_lifespan, monkeypatch):
+    validated = []
+
+    async def validate_transaction(txid, *args, **kwargs):
+        validated.append(txid)
+        return True
+
+    monkeypatch.setattr(WhatsOnChainUtils, "validate_transaction", staticmethod(validate_transaction))
+    txid = os.urandom(32).hex()
+
+    with TestClient(_paywalled_app(test_lifespan)) as client:
+        assert client.get("/first", headers=_payment_header(txid)).status_code == 200
+
+        # Another worker only knows the payment from its claim in MongoDB
+        X402Paywall._verified.clear()
+        assert client.get("/first", headers=_payment_header(txid)).status_code == 200
+
+        response = client.get("/second", headers=_payment_header(txid))
+        assert response.status_code == 402
+        assert response.json()["error"] == "Payment already used"
+
+    # The chain was asked once, replays are answered from the claim
+    assert validated == [txid]
+
+
+# A BEEF payment is verified against the stored headers only, the chain API is never called
+def test_spv_payment_is_verified_locally(chain, monkeypatch):
+    async def get_block_header(*args, **kwargs):
+        raise AssertionError("chain API called during verification")
+
+    monkeypatch.setattr(WhatsOnChainUtils, "get_block_header", staticmethod(get_block_header))
+    tx = _beef_payment(chain)
+    paywall = X402Paywall(price_satoshis=100, pay_to=PAY_TO)
+
+    assert asyncio.run(paywall._verify_spv(Transaction.from_beef(tx.to_beef().hex())))
+    assert not asyncio.run(X402Paywall(price_satoshis=200, pay_to=PAY_TO)._verify_spv(tx))
+
+
+# A BEEF payment unlocks its route before it is relayed, and is marked relayed once the chain accepted it
+def test_spv_payment_is_relayed_in_background(test_lifespan, database, chain):
+    tx = _beef_payment(chain)
+
+    with TestClient(_paywalled_app(test_lifespan)) as client:
+        assert client.get("/first", headers=_payment_header(tx=tx)).status_code == 200
+        assert _eventually(lambda: database["consumed_payments"].find_one({"tx_id": tx.txid(), "relayed": True}))
+
+    assert tx.txid() in chain.mempool
+
+
+# A BEEF payment the chain rejects loses its access, and cannot be replayed
+def test_spv_payment_rejected_by_chain_is_revoked(test_lifespan, database, chain):
+    tx = _beef_payment(chain)
+    # The funding output is spent on chain by another transaction first
+    chain.broadcast(Transaction(
+        tx_inputs=tx.inputs,
+        tx_outputs=[TransactionOutput(locking_script=P2PKH().lock(PrivateKey().address()), satoshis=900)],
+        version=1,
+    ).hex())
+
+    with TestClient(_paywalled_app(test_lifespan)) as client:
+        assert client.get("/first", headers=_payment_header(tx=tx)).status_code == 200
+        assert _eventually(lambda: database["consumed_payments"].find_one({"tx_id": tx.txid()}) is None)
+
+        response = client.get("/first", headers=_payment_header(tx=tx))
+        assert response.status_code == 402
+        assert response.json()["error"] == "Payment already used"